@@ -0,0 +1,249 @@
+from datetime import date, datetime, timedelta
+
+import sqlalchemy as sa
+from flask import abort, request
+
+from models import db, Product, Order, SalesDaily
+
+STATUS_COLUMNS = {
+    'Pending': 'pending', 'Approved': 'approved',
+    'Shipped': 'shipped', 'Completed': 'completed',
+}
+COUNTERS = (
+    'orders', 'units', 'revenue', 'pending', 'approved', 'shipped', 'completed',
+    'completed_revenue',
+)
+DEFAULT_RANGE_DAYS = 30
+
+_rollups = SalesDaily.__table__
+
+
+# -- maintenance --------------------------------------------------------------
+
+def _upsert_statement():
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(_rollups)
+    return stmt.on_conflict_do_update(
+        index_elements=['product_id', 'day'],
+        set_={name: _rollups.c[name] + stmt.excluded[name] for name in COUNTERS},
+    )
+
+
+def record_orders(lines, placed_at):
+    """Add freshly placed (Pending) orders to the rollups.
+
+    ``lines`` are ``(product_id, seller_id, quantity, total_price)``, one per
+    order. Call inside the checkout transaction.
+    """
+    rows = {}
+    for product_id, seller_id, quantity, total in lines:
+        row = rows.get(product_id)
+        if row is None:
+            row = rows[product_id] = dict.fromkeys(COUNTERS, 0)
+            row.update(product_id=product_id, seller_id=seller_id, day=placed_at.date())
+        row['orders'] += 1
+        row['units'] += quantity
+        row['revenue'] += total
+        row['pending'] += 1
+    if rows:
+        db.session.execute(_upsert_statement(), list(rows.values()))
+
+
+def record_status_change(order_ids, previous, status):
+    """Move orders between status counters. Call in the same transaction."""
+    changed = {}
+    for product_id, created_at, total in db.session.execute(
+        sa.select(Order.product_id, Order.created_at, Order.total_price)
+        .where(Order.id.in_(order_ids), Order.created_at.isnot(None))
+    ):
+        key = (product_id, created_at.date())
+        count, revenue = changed.get(key, (0, 0.0))
+        changed[key] = (count + 1, revenue + total)
+    if not changed:
+        return
+
+    old, new = _rollups.c[STATUS_COLUMNS[previous]], _rollups.c[STATUS_COLUMNS[status]]
+    values = {old: old - sa.bindparam('b_count'), new: new + sa.bindparam('b_count')}
+    if status == 'Completed':
+        values[_rollups.c.completed_revenue] = (
+            _rollups.c.completed_revenue + sa.bindparam('b_revenue')
+        )
+    db.session.execute(
+        _rollups.update()
+        .where(_rollups.c.product_id == sa.bindparam('b_product_id'),
+               _rollups.c.day == sa.bindparam('b_day'))
+        .values(values),
+        [
+            {'b_product_id': product_id, 'b_day': day, 'b_count': count, 'b_revenue': revenue}
+            for (product_id, day), (count, revenue) in changed.items()
+        ],
+    )
+
+
+def _from_orders(start=None, end=None, sellers=None):
+    """The rollup rows, aggregated straight from ``orders``.
+
+    Orders outlive their product when a seller deletes it, so the seller
+    comes from ``products`` if the row is still there and otherwise from
+    ``sellers``, ``{product_id: seller_id}``; it is NULL if neither knows.
+    """
+    day = sa.func.date(Order.created_at)
+    seller_id = Product.seller_id
+    if sellers:
+        seller_id = sa.func.coalesce(Product.seller_id,
+                                     sa.case(sellers, value=Order.product_id))
+
+    def when(status, value=1):
+        return sa.func.sum(sa.case((Order.status == status, value), else_=0))
+
+    stmt = (
+        sa.select(
+            Order.product_id, day.label('day'), seller_id.label('seller_id'),
+            sa.func.count().label('orders'),
+            sa.func.sum(Order.quantity).label('units'),
+            sa.func.sum(Order.total_price).label('revenue'),
+            when('Pending').label('pending'),
+            when('Approved').label('approved'),
+            when('Shipped').label('shipped'),
+            when('Completed').label('completed'),
+            when('Completed', Order.total_price).label('completed_revenue'),
+        )
+        .outerjoin(Product, Product.id == Order.product_id)
+        .where(Order.created_at.isnot(None))
+        .group_by(Order.product_id, day, seller_id)
+    )
+    if start:
+        stmt = stmt.where(Order.created_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        stmt = stmt.where(Order.created_at < datetime.combine(end + timedelta(days=1),
+                                                              datetime.min.time()))
+    return stmt
+
+
+def _deleted_product_sellers():
+    """``{product_id: seller_id}`` for rollup rows whose product is gone."""
+    return dict(db.session.execute(
+        sa.select(_rollups.c.product_id, sa.func.max(_rollups.c.seller_id))
+        .where(~sa.exists().where(Product.id == _rollups.c.product_id))
+        .group_by(_rollups.c.product_id)
+    ).all())
+
+
+def rebuild_rollups(start=None, end=None):
+    """Recompute the rollups (for a day range, or all of them) from ``orders``.
+
+    Deleted products keep the seller their rollups already had; orders of
+    a deleted product that never made it into the rollups can't be
+    attributed to anyone and are left out.
+    """
+    sellers = _deleted_product_sellers()
+    delete = _rollups.delete()
+    if start:
+        delete = delete.where(_rollups.c.day >= start)
+    if end:
+        delete = delete.where(_rollups.c.day <= end)
+    db.session.execute(delete)
+    columns = ['product_id', 'day', 'seller_id', *COUNTERS]
+    rows = _from_orders(start, end, sellers).subquery()
+    db.session.execute(_rollups.insert().from_select(
+        columns, sa.select(*[rows.c[name] for name in columns]).where(rows.c.seller_id.isnot(None))
+    ))
+    db.session.commit()
+
+
+def check_rollups(start=None, end=None):
+    """Compare rollups with the raw orders; returns ``(key, expected, actual)`` mismatches."""
+    def keyed(rows):
+        return {(row.product_id, str(row.day)): row for row in rows}
+
+    expected = keyed(db.session.execute(_from_orders(start, end)))
+    stored = sa.select(_rollups)
+    if start:
+        stored = stored.where(_rollups.c.day >= start)
+    if end:
+        stored = stored.where(_rollups.c.day <= end)
+    actual = keyed(db.session.execute(stored))
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        want, got = expected.get(key), actual.get(key)
+        want_values = {name: getattr(want, name) or 0 for name in COUNTERS} if want else None
+        got_values = {name: getattr(got, name) for name in COUNTERS} if got else None
+        if not want_values and got_values and not any(got_values.values()):
+            continue  # an emptied row is harmless
+        if (want_values is None or got_values is None
+                or any(abs(want_values[n] - got_values[n]) > 0.005 for n in COUNTERS)):
+            mismatches.append((key, want_values, got_values))
+    return mismatches
+
+
+# -- dashboard queries ----------------------------------------------------------
+
+def date_range():
+    """``from``/``to`` request args as dates, defaulting to the last 30 days."""
+    def parse(name, default):
+        value = request.args.get(name)
+        if not value:
+            return default
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            abort(400, f'{name} must be a date like 2025-01-31')
+
+    end = parse('to', datetime.utcnow().date())
+    start = parse('from', end - timedelta(days=DEFAULT_RANGE_DAYS - 1))
+    if start > end:
+        abort(400, 'from must not be after to')
+    return start, end
+
+
+def _scoped(stmt, seller_id, start, end):
+    stmt = stmt.where(SalesDaily.day >= start, SalesDaily.day <= end)
+    if seller_id is not None:
+        stmt = stmt.where(SalesDaily.seller_id == seller_id)
+    return stmt
+
+
+def _sums():
+    return [sa.func.coalesce(sa.func.sum(getattr(SalesDaily, name)), 0).label(name)
+            for name in COUNTERS]
+
+
+def summary(seller_id, start, end):
+    row = db.session.execute(_scoped(sa.select(*_sums()), seller_id, start, end)).one()
+    return dict(row._mapping)
+
+
+def daily(seller_id, start, end):
+    rows = db.session.execute(
+        _scoped(sa.select(SalesDaily.day, *_sums()), seller_id, start, end)
+        .group_by(SalesDaily.day)
+        .order_by(SalesDaily.day)
+    )
+    return [dict(row._mapping, day=_as_date(row.day).isoformat()) for row in rows]
+
+
+def top_products(seller_id, start, end, by='revenue', limit=10):
+    if by not in ('revenue', 'units', 'orders'):
+        abort(400, 'by must be revenue, units or orders')
+    # Rank on the rollups alone; only the winners are joined to products.
+    ranked = (
+        _scoped(sa.select(SalesDaily.product_id, *_sums()), seller_id, start, end)
+        .group_by(SalesDaily.product_id)
+        .order_by(sa.desc(by), SalesDaily.product_id)
+        .limit(limit)
+        .subquery()
+    )
+    rows = db.session.execute(
+        sa.select(ranked, Product.name, Product.seller_id)
+        .join(Product, Product.id == ranked.c.product_id)
+        .order_by(ranked.c[by].desc(), ranked.c.product_id)
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
@@ -1,25 +1,114 @@
+import json
 import os
-from flask import Flask, render_template, redirect, url_for, flash, request
+import time
+import click
+from flask import (
+    Flask, render_template, redirect, url_for, flash, request, abort, make_response,
+    send_from_directory, jsonify, Response, stream_with_context
+)
 from flask_login import (
     LoginManager, login_user, logout_user, login_required, current_user
 )
-from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, User, Product, Order, CartItem
-from forms import RegisterForm, LoginForm, ProfileForm, ProductForm
+from sqlalchemy.orm import contains_eager, joinedload
+from models import db, User, Product, Order, CartItem, Message
+from search import ensure_search_index, rebuild_search_index, search_products
+from pagination import Page, paginate, cursor_url
+from querycount import init_query_budgets, query_budget
+from checkout import place_order
+from reservations import (
+    OutOfStock, cart_item, reserve, release, release_expired, held_by_product,
+    listing_changed
+)
+from cart import CartRejected, apply_operations, cart_json, cart_rows
+from facets import (
+    ensure_facet_counts, rebuild_facet_counts, selected_facets, filter_products,
+    facet_counts, facet_cache_key, facet_url, normalize_region
+)
+from queryplans import check_query_plans
+from catalog_cache import (
+    init_cache, require_shared_cache, cached_read, invalidate_catalog, product_row, seller_row,
+    product_from_row, seller_from_row, viewer_etag, not_modified, conditional
+)
+from images import ingest_image, PRODUCT_VARIANTS
+from jobs import start_workers, work
+from order_status import change_order_status, StatusChangeRejected
+from analytics import (
+    rebuild_rollups, check_rollups, date_range, summary, daily, top_products
+)
+from metrics import init_metrics
+from dbengine import init_database, read_replica
+from export import (
+    export_response, seller_orders_query, buyer_orders_query, SELLER_COLUMNS, BUYER_COLUMNS
+)
+from product_import import COLUMNS, import_format, import_products
+from usercache import init_user_cache, load_session_user, forget_user
+from chat import (
+    init_chat, recent_messages, messages_after, stream_messages, mark_read, message_json, inbox
+)
+from forms import RegisterForm, LoginForm, ProfileForm, ProductForm, ProductImportForm
 from flask_mail import Mail
+from jinja2 import FileSystemBytecodeCache
 from datetime import datetime
 
-import forms
-from importlib import reload
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
 
-reload(forms)
-print("🔁 Reloaded ProductForm definition:", hasattr(forms.ProductForm, "quantity"))
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg', 'gif'}
 
 
+def init_migrations(app):
+    # Flask-Migrate pulls in alembic (~100 ms); web workers never need it.
+    from flask_migrate import Migrate
+    if 'migrate' not in app.extensions:
+        Migrate(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
+
+
+class MigrateCommands(click.Group):
+    """``flask db ...``: Flask-Migrate's commands, imported when first used."""
+
+    def __init__(self, app):
+        super().__init__('db', help='Perform database migrations.')
+        self.app = app
+
+    def _commands(self):
+        init_migrations(self.app)
+        from flask_migrate.cli import db as commands
+        return commands
+
+    def list_commands(self, ctx):
+        return self._commands().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._commands().get_command(ctx, name)
+
+
+def init_schema(app):
+    """Run the migrations, then install the search index and facet triggers.
+
+    A deploy step (``flask init-db``), not part of create_app(): workers
+    booting in parallel would race on it and every boot would pay for it.
+    """
+    from flask_migrate import upgrade
+    init_migrations(app)
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+        ensure_search_index()
+        ensure_facet_counts()
+
+
+def precompile_templates(app):
+    """Compile every template into the environment's cache.
+
+    With ``gunicorn --preload`` this runs once in the master and forked
+    workers inherit the result; otherwise each worker loads the compiled
+    code from TEMPLATE_CACHE_DIR instead of parsing the sources again.
+    """
+    for name in app.jinja_env.list_templates(extensions=('html',)):
+        app.jinja_env.get_template(name)
+
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object('config.Config')
@@ -28,48 +117,203 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
         'DATABASE_URL', 'sqlite:///agrimarket.db'
     )
+    app.config['DATABASE_REPLICA_URL'] = os.environ.get('DATABASE_REPLICA_URL')
+    app.config['DB_PROFILE'] = os.environ.get('DB_PROFILE')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['UPLOAD_FOLDER'] = 'static/uploads'
+    app.config['UPLOAD_FOLDER'] = os.environ.get(
+        'UPLOAD_FOLDER', os.path.join(app.root_path, 'static', 'uploads')
+    )
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-    app.config['MAIL_PORT'] = 587
-    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+    app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+    app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', '1') == '1'
     app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
     app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
     app.config['MAIL_DEFAULT_SENDER'] = (
-        'AgriMarket PH', os.environ.get('MAIL_USERNAME')
+        'AgriMarket PH', os.environ.get('MAIL_USERNAME') or 'no-reply@agrimarket.ph'
     )
 
-    db.init_app(app)
+    init_database(app, db)
+    app.cli.add_command(MigrateCommands(app))
     mail = Mail(app)
 
+    app.add_template_global(cursor_url)
+    app.add_template_global(facet_url)
+    init_query_budgets(app)
+    init_cache(app)
+    init_user_cache(app)
+    init_chat(app)
+    init_metrics(app)
+
     login_manager = LoginManager(app)
     login_manager.login_view = 'login'
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return load_session_user(int(user_id))
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        init_schema(app)
+        print('Database is up to date.')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        rebuild_search_index()
+        print('Search index rebuilt.')
+
+    @app.cli.command('rebuild-facet-counts')
+    def rebuild_facet_counts_command():
+        rebuild_facet_counts()
+        invalidate_catalog()
+        print('Facet counts rebuilt.')
+
+    @app.cli.command('jobs-worker')
+    @click.option('--processes', default=1, help='Number of worker processes.')
+    @click.option('--drain', is_flag=True, help='Exit once the queue is empty.')
+    def jobs_worker_command(processes, drain):
+        if drain:
+            work(app, stop_when_idle=True)
+        else:
+            start_workers(app, processes)
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        failed = False
+        try:
+            results = check_query_plans()
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        for name, ok, plan in results:
+            print(f"{'ok  ' if ok else 'SCAN'} {name}")
+            for line in plan:
+                print(f'       {line}')
+            failed = failed or not ok
+        if failed:
+            raise SystemExit(1)
+
+    @app.cli.command('sweep-reservations')
+    @click.option('--once', is_flag=True, help='Sweep once and exit.')
+    def sweep_reservations_command(once):
+        while True:
+            try:
+                released = release_expired()
+                changed = listing_changed()
+            finally:
+                db.session.remove()
+            if changed:
+                # Needs the shared cache (CATALOG_CACHE_URL) to reach the web workers.
+                invalidate_catalog()
+            if released:
+                print(f'Released {released} expired cart holds.')
+            if once:
+                return
+            time.sleep(app.config['RESERVATION_SWEEP_INTERVAL'])
+
+    @app.cli.command('rebuild-sales-rollups')
+    @click.option('--from', 'start', type=click.DateTime(['%Y-%m-%d']), help='First day to rebuild.')
+    @click.option('--to', 'end', type=click.DateTime(['%Y-%m-%d']), help='Last day to rebuild.')
+    def rebuild_sales_rollups_command(start, end):
+        rebuild_rollups(start and start.date(), end and end.date())
+        print('Sales rollups rebuilt.')
+
+    @app.cli.command('check-sales-rollups')
+    @click.option('--from', 'start', type=click.DateTime(['%Y-%m-%d']))
+    @click.option('--to', 'end', type=click.DateTime(['%Y-%m-%d']))
+    def check_sales_rollups_command(start, end):
+        mismatches = check_rollups(start and start.date(), end and end.date())
+        for (product_id, day), expected, actual in mismatches:
+            print(f'product {product_id} on {day}: orders say {expected}, rollup has {actual}')
+        if mismatches:
+            print(f'{len(mismatches)} mismatched rows; run rebuild-sales-rollups to repair.')
+            raise SystemExit(1)
+        print('Sales rollups match the orders.')
+
+    @app.cli.command('import-products')
+    @click.argument('seller_email')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+                  help='Defaults to the file extension.')
+    def import_products_command(seller_email, path, fmt):
+        seller = User.query.filter_by(email=seller_email, role='seller').first()
+        if seller is None:
+            raise click.ClickException(f'no seller with email {seller_email}')
+        fmt = fmt or import_format(path)
+        if fmt is None:
+            raise click.ClickException('unknown file type, pass --format')
+        with open(path, 'rb') as f:
+            report = import_products(seller.id, f, fmt)
+        if report.changed:
+            invalidate_catalog()
+        print(f'{report.inserted} inserted, {report.updated} updated, {report.failed} failed')
+        for error in report.errors:
+            print(f"  line {error['line']}: {'; '.join(error['errors'])}")
+        if report.failed > len(report.errors):
+            print(f'  ... {report.failed - len(report.errors)} more')
 
-    with app.app_context():
-        db.create_all()
-        
     @app.route('/')
+    @query_budget(3)
+    @read_replica
     def home():
         query = request.args.get('q', '')
         price_min = request.args.get('min', 0, type=float)
         price_max = request.args.get('max', 999999, type=float)
-        
-        products = Product.query
+        selected = selected_facets(request.args)
+
+        # Sold-out products can't be added to a cart, so the catalog and its
+        # facet counts only cover what is in stock. quantity is what carts
+        # haven't held, so a product whose last units sit in carts drops out
+        # too, and comes back if those holds are released or expire.
+        products = filter_products(Product.query.filter(Product.quantity > 0), selected)
+        rank = None
         if query:
-            products = products.filter(Product.name.ilike(f'%{query}%'))
+            products, rank = search_products(products, query)
         if price_min:
             products = products.filter(Product.price >= price_min)
         if price_max:
             products = products.filter(Product.price <= price_max)
-        
-        products = products.all()
-        return render_template('index.html', products=products, query=query)
+
+        if rank is not None:
+            keys = [(rank, False), (Product.id, False)]
+        else:
+            keys = [(Product.created_at, True), (Product.id, True)]
+
+        facet_key = facet_cache_key(selected)
+        # The facet table already knows how many products match the facets
+        # alone; only a text search or a custom price range needs COUNT(*).
+        counted = query or 'min' in request.args or 'max' in request.args
+
+        def load():
+            facets, facet_total = facet_counts(selected)
+            page = paginate(
+                products, keys,
+                count_key=('home', query, price_min, price_max, facet_key) if counted else None,
+            )
+            return {
+                'items': [product_row(p) for p in page.items],
+                'next_cursor': page.next_cursor,
+                'prev_cursor': page.prev_cursor,
+                'total': page.total if counted else facet_total,
+                'facets': facets,
+            }
+
+        cache_key = (f"home:{query!r}:{price_min}:{price_max}:{facet_key}:"
+                     f"{request.args.get('cursor', '')}")
+        data, digest, last_modified = cached_read(cache_key, load)
+        etag = viewer_etag(digest)
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+
+        page = Page(
+            [product_from_row(row) for row in data['items']],
+            data['next_cursor'], data['prev_cursor'], data['total'],
+        )
+        response = make_response(render_template(
+            'index.html', products=page, query=query, facets=data['facets'],
+        ))
+        return conditional(response, etag, last_modified)
 
 
     @app.route('/register', methods=['GET', 'POST'])
@@ -120,72 +364,156 @@ def create_app():
     @login_required
     def profile():
         form = ProfileForm()
+        user = db.session.get(User, current_user.id)
 
-        show_address = current_user.role == 'buyer'
+        show_address = user.role == 'buyer'
 
         if form.validate_on_submit():
             if form.display_name.data:
-                current_user.username = form.display_name.data
-            current_user.location = form.location.data
+                user.username = form.display_name.data
+            region_changed = normalize_region(user.location) != normalize_region(form.location.data)
+            user.location = form.location.data
+            if user.role == 'seller' and region_changed:
+                Product.query.filter_by(seller_id=user.id).update(
+                    {'region': normalize_region(user.location)}, synchronize_session=False
+                )
 
             if show_address:
-                current_user.delivery_address = form.delivery_address.data
+                user.delivery_address = form.delivery_address.data
 
             if 'profile_image' in request.files:
                 f = request.files['profile_image']
                 if f and allowed_file(f.filename):
-                    filename = secure_filename(f.filename)
-                    path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    f.save(path)
-                    current_user.profile_image = f'/static/uploads/{filename}'
+                    user.profile_image = ingest_image(f, ['avatar'])
 
             if 'background_image' in request.files:
                 f = request.files['background_image']
                 if f and allowed_file(f.filename):
-                    filename = secure_filename(f.filename)
-                    path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    f.save(path)
-                    current_user.background_image = f'/static/uploads/{filename}'
+                    user.background_image = ingest_image(f, ['background'])
 
             db.session.commit()
+            forget_user(user.id)
+            if user.role == 'seller':
+                invalidate_catalog()
             flash('Profile updated successfully!', 'success')
             return redirect(url_for('profile'))
 
-        form.display_name.data = current_user.username
-        form.location.data = current_user.location
+        form.display_name.data = user.username
+        form.location.data = user.location
         if show_address:
-            form.delivery_address.data = current_user.delivery_address
+            form.delivery_address.data = user.delivery_address
 
-        return render_template('profile.html', form=form, user=current_user, show_address=show_address)
+        return render_template('profile.html', form=form, user=user, show_address=show_address)
     
     @app.route('/messages/<int:user_id>', methods=['GET', 'POST'])
     @login_required
     def messages(user_id):
         other_user = User.query.get_or_404(user_id)
         if request.method == 'POST':
-            content = request.form.get('content')
-            if content.strip():
+            content = (request.form.get('content') or '').strip()
+            if content:
                 msg = Message(sender_id=current_user.id, receiver_id=other_user.id, content=content)
                 db.session.add(msg)
                 db.session.commit()
-        messages = Message.query.filter(
-            ((Message.sender_id == current_user.id) & (Message.receiver_id == other_user.id)) |
-            ((Message.sender_id == other_user.id) & (Message.receiver_id == current_user.id))
-        ).order_by(Message.timestamp).all()
-        return render_template('messages.html', messages=messages, other_user=other_user)
+        me = current_user.id
+        messages = recent_messages(me, other_user.id, app.config['CHAT_PAGE_SIZE'])
+        unread = any(m.receiver_id == me and m.read_at is None for m in messages)
+        html = render_template('messages.html', messages=messages, other_user=other_user,
+                               poll_interval=app.config['CHAT_POLL_INTERVAL'])
+        if unread:
+            mark_read(me, other_user.id)
+        return html
+
+    @app.route('/api/messages/<int:user_id>', methods=['GET', 'POST'])
+    @login_required
+    def messages_api(user_id):
+        me = current_user.id
+        other_user = User.query.get_or_404(user_id)
+
+        if request.method == 'POST':
+            content = ((request.get_json(silent=True) or {}).get('content') or '').strip()
+            if not content:
+                return jsonify(error='Message is empty.'), 400
+            msg = Message(sender_id=me, receiver_id=other_user.id, content=content)
+            db.session.add(msg)
+            db.session.commit()
+            return jsonify(message=message_json(msg)), 201
+
+        rows = messages_after(me, other_user.id, request.args.get('after', 0, type=int))
+        payload = [message_json(m) for m in rows]
+        if any(m.receiver_id == me and m.read_at is None for m in rows):
+            mark_read(me, other_user.id)
+        return jsonify(messages=payload)
+
+    @app.route('/api/messages/<int:user_id>/stream')
+    @login_required
+    def messages_stream(user_id):
+        """Server-sent events: new messages in the conversation as they are sent.
+
+        Ends after CHAT_STREAM_SECONDS; the browser's EventSource reconnects
+        with Last-Event-ID and carries on from the last message it got.
+        """
+        me = current_user.id
+        other_user = User.query.get_or_404(user_id)
+        after = request.headers.get('Last-Event-ID', type=int)
+        if after is None:
+            after = request.args.get('after', 0, type=int)
+        streams = app.extensions['chat_streams']
+        if not streams.acquire(blocking=False):
+            return jsonify(error='Too many open chats, poll instead.'), 503
+
+        def events():
+            yield f"retry: {app.config['CHAT_POLL_INTERVAL'] * 1000}\n\n"
+            for batch in stream_messages(me, other_user.id, after,
+                                         app.config['CHAT_STREAM_SECONDS'],
+                                         app.config['CHAT_STREAM_RECHECK']):
+                if not batch:
+                    yield ': keep-alive\n\n'  # also notices clients that went away
+                for m in batch:
+                    yield f"id: {m['id']}\ndata: {json.dumps(m)}\n\n"
+
+        response = Response(stream_with_context(events()), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        response.call_on_close(streams.release)
+        return response
+
+    @app.route('/api/inbox')
+    @login_required
+    def inbox_api():
+        return jsonify(conversations=inbox(current_user.id))
 
 
     @app.route('/cart')
+    @query_budget(2)
     @login_required
     def view_cart():
         if current_user.role != 'buyer':
             flash('Only buyers can access the cart.', 'danger')
             return redirect(url_for('home'))
 
-        items = CartItem.query.filter_by(user_id=current_user.id).all()
-        total = sum((item.product.price or 0) * item.quantity for item in items)
+        items = cart_rows(current_user.id)
+        total = items[0].total if items else 0
         return render_template('cart.html', items=items, total=total)
 
+    @app.route('/api/cart', methods=['GET', 'POST'])
+    @login_required
+    def cart_api():
+        """GET the cart, or POST {"operations": [{"op": "set", "product_id": 3, "quantity": 2}, ...]}."""
+        if current_user.role != 'buyer':
+            abort(403)
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            try:
+                apply_operations(current_user.id, data.get('operations'))
+            except CartRejected as e:
+                return jsonify(error=str(e), cart=cart_json(current_user.id)), e.status
+            except OutOfStock as e:
+                return jsonify(error=str(e), product=e.product_name,
+                               cart=cart_json(current_user.id)), 409
+            if listing_changed():
+                invalidate_catalog()
+        return jsonify(cart_json(current_user.id))
+
     @app.route('/cart/add/<int:product_id>', methods=['POST'])
     @login_required
     def add_to_cart(product_id):
@@ -204,18 +532,14 @@ def create_app():
             flash("Invalid quantity selected.", "warning")
             return redirect(request.referrer or url_for('home'))
 
-        existing = CartItem.query.filter_by(
-            user_id=current_user.id, product_id=product.id
-        ).first()
-
-        if existing:
-            existing.quantity += quantity
-        else:
-            db.session.add(
-                CartItem(user_id=current_user.id, product_id=product.id, quantity=quantity)
-            )
+        try:
+            reserve(cart_item(current_user.id, product), delta=quantity)
+        except OutOfStock as e:
+            flash(f'{e}; some of it may be held in other carts.', 'danger')
+            return redirect(request.referrer or url_for('home'))
+        if listing_changed():
+            invalidate_catalog()
 
-        db.session.commit()
         flash(f'{quantity} × {product.name} added to cart!', 'success')
         return redirect(request.referrer or url_for('home'))
 
@@ -230,8 +554,9 @@ def create_app():
         if item.user_id != current_user.id:
             flash('Unauthorized action.', 'danger')
             return redirect(url_for('view_cart'))
-        db.session.delete(item)
-        db.session.commit()
+        release(item)
+        if listing_changed():
+            invalidate_catalog()
         flash('Item removed from cart.', 'info')
         return redirect(url_for('view_cart'))
     
@@ -245,12 +570,21 @@ def create_app():
             return redirect(url_for('view_cart'))
 
         action = request.form.get('action')
-        if action == 'increase':
-            item.quantity += 1
-        elif action == 'decrease' and item.quantity > 1:
-            item.quantity -= 1
-
-        db.session.commit()
+        try:
+            if action == 'increase':
+                reserve(item, delta=1)
+            elif action == 'decrease' and item.quantity > 1:
+                reserve(item, delta=-1)
+            else:
+                return redirect(url_for('view_cart'))
+        except (OutOfStock, ValueError) as e:
+            flash(str(e), 'danger')
+        except LookupError:
+            flash('That item is no longer in your cart.', 'warning')
+            abort(404)
+        else:
+            if listing_changed():
+                invalidate_catalog()
         return redirect(url_for('view_cart'))
 
     @app.route('/cart/checkout', methods=['POST'])
@@ -264,30 +598,17 @@ def create_app():
             flash('Please add a delivery address in your profile before checking out.', 'warning')
             return redirect(url_for('profile'))
 
-        items = CartItem.query.filter_by(user_id=current_user.id).all()
-        if not items:
-            flash('Your cart is empty.', 'warning')
+        try:
+            placed = place_order(current_user.id, current_user.address)
+        except OutOfStock as e:
+            flash(str(e), 'danger')
             return redirect(url_for('view_cart'))
 
-        for item in items:
-            if item.product.quantity < item.quantity:
-                flash(f'Not enough stock for {item.product.name}', 'danger')
-                return redirect(url_for('view_cart'))
-
-        for item in items:
-            total_price = item.product.price * item.quantity
-            order = Order(
-                buyer_id=current_user.id,
-                product_id=item.product.id,
-                quantity=item.quantity,
-                total_price=total_price,
-                status='Pending',
-            )
-            item.product.quantity -= item.quantity
-            db.session.add(order)
-            db.session.delete(item)
+        if not placed:
+            flash('Your cart is empty.', 'warning')
+            return redirect(url_for('view_cart'))
+        invalidate_catalog()
 
-        db.session.commit()
         flash('Checkout complete! Thank you for your order.', 'success')
         return render_template('checkout_success.html', address=current_user.address)
 
@@ -300,35 +621,61 @@ def create_app():
 
         form = ProductForm()
         if form.validate_on_submit():
-            filename = None
+            image = None
             if form.image.data and allowed_file(form.image.data.filename):
-                filename = secure_filename(form.image.data.filename)
-                form.image.data.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+                image = ingest_image(form.image.data, PRODUCT_VARIANTS)
 
             new_product = Product(
                 name=form.name.data,
                 description=form.description.data,
                 price=form.price.data,
                 quantity=form.quantity.data,
-                image=f'static/uploads/{filename}' if filename else None,
+                category=form.category.data,
+                region=normalize_region(current_user.location),
+                image=image,
                 seller_id=current_user.id
             )
             db.session.add(new_product)
             db.session.commit()
+            invalidate_catalog()
             flash('Product added successfully!', 'success')
             return redirect(url_for('my_products'))
 
         return render_template('add_product.html', form=form)
 
+    @app.route('/seller/import-products', methods=['GET', 'POST'])
+    @login_required
+    def bulk_import():
+        if current_user.role != 'seller':
+            flash('Access denied. Only sellers can import products.', 'danger')
+            return redirect(url_for('home'))
+
+        form = ProductImportForm()
+        report = None
+        if form.validate_on_submit():
+            upload = form.file.data
+            report = import_products(current_user.id, upload.stream, import_format(upload.filename))
+            if report.changed:
+                invalidate_catalog()
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify(report.as_dict())
+        return render_template('import_products.html', form=form, report=report, columns=COLUMNS)
+
     @app.route('/seller/my-products')
+    @query_budget(4)
     @login_required
     def my_products():
         if current_user.role != 'seller':
             flash('Access denied.', 'danger')
             return redirect(url_for('home'))
 
-        products = Product.query.filter_by(seller_id=current_user.id).all()
-        return render_template('my_products.html', products=products)
+        products = paginate(
+            Product.query.filter_by(seller_id=current_user.id),
+            [(Product.created_at, True), (Product.id, True)],
+            count_key=('my_products', current_user.id),
+        )
+        held = held_by_product([p.id for p in products.items])
+        return render_template('my_products.html', products=products, held=held)
     
     @app.route('/seller/delete-product/<int:pid>', methods=['POST'])
     @login_required
@@ -344,41 +691,145 @@ def create_app():
 
         db.session.delete(product)
         db.session.commit()
+        invalidate_catalog()
         flash('Product deleted successfully!', 'success')
         return redirect(url_for('my_products'))
 
     @app.route('/product/<int:pid>')
+    @query_budget(3)
+    @read_replica
     def product_view(pid):
-        product = Product.query.get_or_404(pid)
-        seller = User.query.get(product.seller_id)
-        return render_template('product_view.html', product=product, seller=seller)
+        def load():
+            product = Product.query.get(pid)
+            if product is None:
+                return None
+            return {
+                'product': product_row(product),
+                'seller': seller_row(User.query.get(product.seller_id)),
+            }
+
+        # Carts move stock all the time; read it live rather than from the cache.
+        stock = db.session.query(Product.quantity).filter_by(id=pid).scalar()
+        if stock is None:
+            abort(404)
+        data, digest, last_modified = cached_read(f'product:{pid}', load)
+        if data is None:
+            abort(404)
+        etag = viewer_etag(f'{digest}:{stock}')
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+
+        response = make_response(render_template(
+            'product_view.html',
+            product=product_from_row(data['product']),
+            seller=seller_from_row(data['seller']),
+            stock=stock,
+        ))
+        return conditional(response, etag, last_modified)
 
 
     @app.route('/orders')
+    @query_budget(3)
     @login_required
     def order_history():
         if current_user.role != 'buyer':
             flash('Access denied.', 'danger')
             return redirect(url_for('home'))
 
-        orders = Order.query.filter_by(buyer_id=current_user.id).all()
+        orders = paginate(
+            Order.query.options(joinedload(Order.product))
+            .filter_by(buyer_id=current_user.id),
+            [(Order.created_at, True), (Order.id, True)],
+            count_key=('order_history', current_user.id),
+        )
         return render_template('order_history.html', orders=orders)
 
+    @app.route('/orders/export')
+    @read_replica
+    @login_required
+    def export_order_history():
+        if current_user.role != 'buyer':
+            abort(403)
+        return export_response(buyer_orders_query(current_user.id), BUYER_COLUMNS, 'orders')
+
 
     @app.route('/seller/orders')
+    @query_budget(3)
+    @read_replica
     @login_required
     def seller_orders():
         if current_user.role != 'seller':
             flash('Access denied: only sellers can view customer orders.', 'danger')
             return redirect(url_for('home'))
 
-        orders = (
+        orders = paginate(
             Order.query.join(Product)
-            .filter(Product.seller_id == current_user.id)
-            .all()
+            .options(contains_eager(Order.product), joinedload(Order.buyer))
+            .filter(Product.seller_id == current_user.id),
+            [(Order.created_at, True), (Order.id, True)],
+            count_key=('seller_orders', current_user.id),
         )
         return render_template('seller_orders.html', orders=orders)
+
+    @app.route('/seller/orders/export')
+    @read_replica
+    @login_required
+    def export_seller_orders():
+        if current_user.role != 'seller':
+            abort(403)
+        return export_response(
+            seller_orders_query(current_user.id), SELLER_COLUMNS, 'seller-orders'
+        )
     
+    def analytics_seller():
+        """Sellers see their own sales; admins see everyone's, or ?seller_id=."""
+        if current_user.is_admin():
+            return request.args.get('seller_id', type=int)
+        if current_user.role == 'seller':
+            return current_user.id
+        abort(403)
+
+    @app.route('/dashboard')
+    @read_replica
+    @login_required
+    def sales_dashboard():
+        seller_id = analytics_seller()
+        start, end = date_range()
+        return render_template(
+            'admin_dashboard.html', start=start, end=end, seller_id=seller_id,
+            summary=summary(seller_id, start, end),
+            days=daily(seller_id, start, end),
+            top=top_products(seller_id, start, end, by=request.args.get('by', 'revenue')),
+        )
+
+    @app.route('/api/analytics/summary')
+    @read_replica
+    @login_required
+    def analytics_summary():
+        seller_id = analytics_seller()
+        start, end = date_range()
+        return jsonify({'from': start.isoformat(), 'to': end.isoformat(),
+                        **summary(seller_id, start, end)})
+
+    @app.route('/api/analytics/daily')
+    @read_replica
+    @login_required
+    def analytics_daily():
+        seller_id = analytics_seller()
+        start, end = date_range()
+        return jsonify(daily(seller_id, start, end))
+
+    @app.route('/api/analytics/top-products')
+    @read_replica
+    @login_required
+    def analytics_top_products():
+        seller_id = analytics_seller()
+        start, end = date_range()
+        limit = min(request.args.get('limit', 10, type=int), 100)
+        return jsonify(top_products(seller_id, start, end,
+                                    by=request.args.get('by', 'revenue'), limit=limit))
+
     @app.route('/seller/order/update/<int:order_id>/<string:new_status>', methods=['POST'])
     @login_required
     def update_order_status(order_id, new_status):
@@ -386,27 +837,85 @@ def create_app():
             flash('Access denied.', 'danger')
             return redirect(url_for('home'))
 
-        order = Order.query.get_or_404(order_id)
-        if order.product.seller_id != current_user.id:
-            flash('Unauthorized action.', 'danger')
-            return redirect(url_for('seller_orders'))
+        try:
+            change_order_status(current_user.id, [order_id], new_status)
+        except StatusChangeRejected as e:
+            flash(str(e), 'danger')
+        else:
+            flash(f'Order marked as {new_status}.', 'success')
+        return redirect(url_for('seller_orders'))
+
+    @app.route('/seller/orders/status', methods=['POST'])
+    @login_required
+    def bulk_update_order_status():
+        """Form post from the orders page, or JSON: {"order_ids": [...], "status": "Shipped"}."""
+        if current_user.role != 'seller':
+            abort(403)
+        if request.is_json:
+            data = request.get_json(silent=True) or {}
+            order_ids, status = data.get('order_ids'), data.get('status')
+            if not isinstance(order_ids, list) or not all(isinstance(i, int) for i in order_ids):
+                return jsonify(error='order_ids must be a list of integers'), 400
+            if not isinstance(status, str):
+                return jsonify(error='status must be a string'), 400
+        else:
+            order_ids = request.form.getlist('order_id', type=int)
+            status = request.form.get('status')
 
-        allowed = ['Pending', 'Approved', 'Shipped', 'Completed']
-        if new_status not in allowed:
-            flash('Invalid status.', 'danger')
+        try:
+            changed = change_order_status(
+                current_user.id, order_ids, status, app.config['ORDER_STATUS_BATCH_MAX']
+            )
+        except StatusChangeRejected as e:
+            if request.is_json:
+                return jsonify(
+                    error=str(e), not_owned=e.not_owned,
+                    wrong_status={str(k): v for k, v in e.wrong_status.items()},
+                ), 403 if e.not_owned else 409 if e.wrong_status else 400
+            flash(str(e), 'danger')
             return redirect(url_for('seller_orders'))
 
-        order.status = new_status
-        db.session.commit()
-        flash(f'Order marked as {new_status}.', 'success')
+        if request.is_json:
+            return jsonify(status=status, updated=changed)
+        flash(f'{len(changed)} orders marked as {status}.', 'success')
         return redirect(url_for('seller_orders'))
 
+    @app.route('/media/<path:filename>')
+    def media(filename):
+        # Uploads are stored under their content hash, so a URL never changes
+        # meaning and browsers can keep it forever.
+        response = send_from_directory(
+            app.config['UPLOAD_FOLDER'], filename, max_age=31536000
+        )
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
     @app.route('/healthz')
     def health_check():
         return "OK", 200
 
+    if app.config['TEMPLATE_CACHE_DIR']:
+        os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])
     return app
 
-if __name__ == "__main__":
+
+def create_web_app():
+    """create_app() for processes that serve pages (gunicorn, python app.py).
+
+    The jobs worker, the sweeper and other CLI commands render nothing, so
+    only this factory compiles the templates up front and checks that
+    several workers share one catalog cache.
+    """
     app = create_app()
+    require_shared_cache(app)
+    if app.config['PRECOMPILE_TEMPLATES']:
+        precompile_templates(app)
+    return app
+
+
+if __name__ == "__main__":
+    app = create_web_app()
+    init_schema(app)
     app.run(debug=True)
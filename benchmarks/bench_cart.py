@@ -0,0 +1,105 @@
+"""Five "+" clicks on the cart: form posts vs. one debounced /api/cart batch.
+
+    python -m benchmarks.bench_cart [--clicks 5] [--repeat 20]
+
+The form flow is what the page does without JavaScript: POST, redirect,
+re-render cart.html, per click. The API flow is what the page's script
+sends once the clicks stop. Exits non-zero if the two flows end up with
+different carts or stock.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, init_schema
+from models import db, User, Product, CartItem
+from querycount import count_queries
+
+
+def seed():
+    password = generate_password_hash('pw', method='pbkdf2:sha256:1000')
+    seller = User(username='seller', email='seller@example.com', password=password, role='seller')
+    db.session.add(seller)
+    db.session.flush()
+    products = [Product(name=f'Squash {i}', description='fresh', price=35 + i,
+                        quantity=10 ** 6, seller_id=seller.id) for i in range(5)]
+    db.session.add_all(products)
+    db.session.add_all([
+        User(username=f'buyer{i}', email=f'buyer{i}@example.com', password=password,
+             role='buyer', address='Benguet')
+        for i in range(2)
+    ])
+    db.session.commit()
+    return [p.id for p in products]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clicks', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        app = create_app()
+        init_schema(app)
+        app.config['WTF_CSRF_ENABLED'] = False
+        logging.getLogger('metrics').setLevel(logging.ERROR)
+        with app.app_context():
+            product_ids = seed()
+            engine = db.engine
+
+        clients = []
+        for i in range(2):
+            client = app.test_client()
+            client.post('/login', data={'email': f'buyer{i}@example.com', 'password': 'pw'})
+            client.post('/api/cart', json={'operations': [
+                {'op': 'add', 'product_id': pid} for pid in product_ids
+            ]})
+            clients.append(client)
+        forms, api = clients
+        with app.app_context():
+            item_ids = [item.id for item in CartItem.query.filter_by(product_id=product_ids[0])
+                        .order_by(CartItem.user_id)]
+
+        results = {}
+        for name, run in (
+            ('form posts', lambda: [
+                forms.post(f'/cart/update/{item_ids[0]}', data={'action': 'increase'},
+                           follow_redirects=True)
+                for _ in range(args.clicks)
+            ]),
+            ('one /api/cart batch', lambda: api.post('/api/cart', json={'operations': [
+                {'op': 'add', 'product_id': product_ids[0], 'quantity': args.clicks}
+            ]})),
+        ):
+            start = time.perf_counter()
+            with count_queries(engine) as queries:
+                for _ in range(args.repeat):
+                    run()
+            results[name] = ((time.perf_counter() - start) * 1000 / args.repeat,
+                             queries.count / args.repeat)
+
+        with app.app_context():
+            quantities = [item.quantity for item in CartItem.query.filter_by(product_id=product_ids[0])
+                          .order_by(CartItem.user_id)]
+            stock = db.session.get(Product, product_ids[0]).quantity
+        expected = 1 + args.clicks * args.repeat
+        ok = quantities == [expected, expected] and stock == 10 ** 6 - 2 * expected
+        print(f'{"ok  " if ok else "FAIL"} both flows hold {expected} units per cart')
+
+        print(f'\n{args.clicks} clicks on "+" with {len(product_ids)} items in the cart')
+        print(f'{"flow":<22}{"requests":>10}{"SQL":>8}{"ms":>9}')
+        for name, (ms, sql) in results.items():
+            requests = 2 * args.clicks if name == 'form posts' else 1
+            print(f'{name:<22}{requests:>10}{sql:>8.0f}{ms:>9.1f}')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Concurrent checkout stress run: many buyers racing for one scarce product.
+
+    python -m benchmarks.bench_checkout [--buyers 200] [--threads 16] [--stock 150]
+    python -m benchmarks.bench_checkout --database-url postgresql://localhost/agrimarket_bench
+
+Exits non-zero if more units were sold than were in stock.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, init_schema
+from checkout import place_order
+from reservations import OutOfStock
+from models import db, User, Product, Order, CartItem
+
+
+def seed(buyers, stock, per_cart):
+    seller = User(username='bench-seller', email='seller@bench.test', password='x', role='seller')
+    db.session.add(seller)
+    db.session.commit()
+    hot = Product(name='Hot mangoes', description='scarce', price=120.0,
+                  quantity=stock, seller_id=seller.id)
+    plenty = Product(name='Rice', description='plenty', price=50.0,
+                     quantity=buyers * per_cart, seller_id=seller.id)
+    db.session.add_all([hot, plenty])
+    db.session.commit()
+
+    buyer_ids = []
+    for i in range(buyers):
+        buyer = User(username=f'buyer{i}', email=f'buyer{i}@bench.test', password='x',
+                     role='buyer', address='Davao City')
+        db.session.add(buyer)
+        db.session.flush()
+        db.session.add_all([
+            CartItem(user_id=buyer.id, product_id=hot.id, quantity=per_cart),
+            CartItem(user_id=buyer.id, product_id=plenty.id, quantity=per_cart),
+        ])
+        buyer_ids.append(buyer.id)
+    db.session.commit()
+    return hot.id, plenty.id, buyer_ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url')
+    parser.add_argument('--buyers', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--stock', type=int, default=150)
+    parser.add_argument('--per-cart', type=int, default=2)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = args.database_url or (
+        'sqlite:///' + os.path.join(tmp.name, 'bench.db')
+    )
+    app = create_app()
+    init_schema(app)
+    with app.app_context():
+        # --database-url may point at a used database. Empty it row by row
+        # rather than drop_all()/create_all(), which would lose the search
+        # and facet triggers that checkout fires.
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        hot_id, plenty_id, buyer_ids = seed(args.buyers, args.stock, args.per_cart)
+        plenty_stock = db.session.get(Product, plenty_id).quantity
+
+    def attempt(buyer_id):
+        with app.app_context():
+            try:
+                place_order(buyer_id, 'Davao City')
+                return 'ok'
+            except OutOfStock:
+                return 'out_of_stock'
+            except OperationalError:
+                return 'error'
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(attempt, buyer_ids))
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        def sold(pid):
+            return db.session.query(
+                func.coalesce(func.sum(Order.quantity), 0)
+            ).filter(Order.product_id == pid).scalar()
+
+        hot_left = db.session.get(Product, hot_id).quantity
+        plenty_left = db.session.get(Product, plenty_id).quantity
+        hot_sold, plenty_sold = sold(hot_id), sold(plenty_id)
+
+    ok = results.count('ok')
+    print(f'backend       {app.config["SQLALCHEMY_DATABASE_URI"].split(":")[0]}')
+    print(f'checkouts     {ok} ok, {results.count("out_of_stock")} out of stock, '
+          f'{results.count("error")} errors')
+    print(f'throughput    {len(results) / elapsed:.1f} attempts/s, {ok / elapsed:.1f} checkouts/s')
+    print(f'hot product   stock {args.stock}, sold {hot_sold}, left {hot_left}')
+
+    consistent = (
+        hot_left >= 0
+        and hot_sold + hot_left == args.stock
+        and plenty_sold + plenty_left == plenty_stock
+        and hot_sold == plenty_sold == ok * args.per_cart
+    )
+    print('consistency   ' + ('OK' if consistent else 'OVERSOLD / PARTIAL CHECKOUT'))
+    tmp.cleanup()
+    sys.exit(0 if consistent else 1)
+
+
+if __name__ == '__main__':
+    main()
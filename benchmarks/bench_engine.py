@@ -0,0 +1,129 @@
+"""Concurrent writers under each engine profile, the way gunicorn runs them.
+
+    python -m benchmarks.bench_engine [--processes 4] [--threads 4] [--duration 10]
+    python -m benchmarks.bench_engine --database-url postgresql://localhost/agrimarket_bench --profiles postgresql
+
+Each profile gets a fresh database. Several worker processes, each with a
+few threads, log in as their own buyer and loop add_to_cart -> checkout.
+Failed requests (e.g. "database is locked") are counted as errors.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+
+def seed(buyers):
+    from werkzeug.security import generate_password_hash
+    from models import db, User, Product
+
+    password = generate_password_hash('pw')
+    seller = User(username='seller', email='seller@example.com', password=password,
+                  role='seller')
+    db.session.add(seller)
+    db.session.flush()
+    products = [Product(name=f'Rice {i}', description='milled', price=40 + i,
+                        quantity=10 ** 8, seller_id=seller.id) for i in range(20)]
+    db.session.add_all(products)
+    db.session.add_all([
+        User(username=f'buyer{i}', email=f'buyer{i}@example.com', password=password,
+             role='buyer', address='Tarlac')
+        for i in range(buyers)
+    ])
+    db.session.commit()
+    return [p.id for p in products]
+
+
+def worker(env, first_buyer, threads, duration, product_ids, results):
+    os.environ.update(env)
+    from app import create_app
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.logger.setLevel(logging.CRITICAL)  # failed requests are counted, not printed
+    logging.getLogger('metrics').setLevel(logging.CRITICAL)
+    out = []
+    logged_in = threading.Barrier(threads)
+
+    def client_loop(n):
+        client = app.test_client()
+        client.post('/login', data={'email': f'buyer{first_buyer + n}@example.com', 'password': 'pw'})
+        logged_in.wait()  # password hashing is not part of the measurement
+        deadline = time.perf_counter() + duration
+        i = n
+        while time.perf_counter() < deadline:
+            for route, url in (('add_to_cart', f'/cart/add/{product_ids[i % len(product_ids)]}'),
+                               ('checkout', '/cart/checkout')):
+                start = time.perf_counter()
+                status = client.post(url, data={'quantity': 1}).status_code
+                out.append((route, (time.perf_counter() - start) * 1000, status >= 500))
+            i += 1
+
+    pool = [threading.Thread(target=client_loop, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    results.put(out)
+
+
+def run_profile(profile, database_url, args):
+    env = {'DB_PROFILE': profile, 'DATABASE_URL': database_url}
+    os.environ.update(env)
+    from app import create_app, init_schema
+    from models import db
+
+    app = create_app()
+    init_schema(app)
+    with app.app_context():
+        product_ids = seed(args.processes * args.threads)
+        db.session.remove()
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=worker, args=(env, p * args.threads, args.threads, args.duration,
+                                         product_ids, results))
+        for p in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    timings = []
+    for _ in procs:
+        timings.extend(results.get())
+    for p in procs:
+        p.join()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', help='an empty database; default: a new SQLite file per profile')
+    parser.add_argument('--profiles', default='sqlite-default,sqlite,sqlite-durable')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f'{args.processes} processes x {args.threads} threads, {args.duration:.0f}s per profile')
+    print(f'{"profile":<16}{"route":<13}{"requests":>10}{"errors":>8}{"p50 ms":>9}'
+          f'{"p95 ms":>9}{"req/s":>9}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in args.profiles.split(','):
+            url = args.database_url or 'sqlite:///' + os.path.join(tmp, f'{profile}.db')
+            timings = run_profile(profile, url, args)
+            for route in ('add_to_cart', 'checkout'):
+                ms = sorted(t for r, t, _ in timings if r == route)
+                errors = sum(failed for r, _, failed in timings if r == route)
+                p95 = ms[int(len(ms) * 0.95) - 1] if ms else 0
+                print(f'{profile:<16}{route:<13}{len(ms):>10}{errors:>8}'
+                      f'{statistics.median(ms) if ms else 0:>9.1f}{p95:>9.1f}'
+                      f'{len(ms) / args.duration:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
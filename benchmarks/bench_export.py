@@ -0,0 +1,148 @@
+"""Peak memory and time to first byte of the streaming order export.
+
+    python -m benchmarks.bench_export [--orders 300000] [--max-peak-mb 16]
+
+Generates one seller with a multi-year order history, then downloads
+/seller/orders/export as CSV, JSON and gzipped CSV while tracemalloc tracks
+the peak. For comparison it also loads the same orders the way the
+``seller_orders`` page does (ORM objects, all at once). Exits non-zero if
+any export's peak exceeds ``--max-peak-mb``.
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import contains_eager, joinedload
+from werkzeug.security import generate_password_hash
+
+from app import create_app, init_schema
+from models import db, User, Product, Order
+
+BATCH = 5000
+
+
+def seed(orders):
+    rng = random.Random(7)
+    password = generate_password_hash('pw')
+    seller = User(username='coop', email='coop@example.com', password=password, role='seller')
+    buyers = [User(username=f'buyer{i}', email=f'buyer{i}@example.com', password=password,
+                   role='buyer') for i in range(200)]
+    db.session.add_all([seller] + buyers)
+    db.session.flush()
+    products = [Product(name=f'Rice lot {i}', description='milled', price=50 + i,
+                        quantity=10 ** 6, seller_id=seller.id, sku=f'RICE-{i}')
+                for i in range(100)]
+    db.session.add_all(products)
+    db.session.commit()
+
+    start = datetime(2022, 1, 1)
+    span = 3 * 365 * 86400
+    rows = []
+    for _ in range(orders):
+        product = rng.choice(products)
+        quantity = rng.randint(1, 20)
+        rows.append({
+            'buyer_id': rng.choice(buyers).id, 'product_id': product.id,
+            'quantity': quantity, 'total_price': product.price * quantity,
+            'status': rng.choice(['Pending', 'Approved', 'Shipped', 'Completed']),
+            'delivery_address': 'Nueva Ecija',
+            'created_at': start + timedelta(seconds=rng.randrange(span)),
+        })
+        if len(rows) == BATCH:
+            db.session.execute(Order.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Order.__table__.insert(), rows)
+    db.session.commit()
+    return seller.id
+
+
+def download(client, url, headers=None):
+    """Consume the export chunk by chunk; returns timings, bytes, peak and CSV lines."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url, headers=headers or {}, buffered=False)
+    gunzip = zlib.decompressobj(31) if response.headers.get('Content-Encoding') == 'gzip' else None
+    first_byte, size, lines = None, 0, 0
+    for chunk in response.response:
+        if first_byte is None and chunk:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+        lines += (gunzip.decompress(chunk) if gunzip else chunk).count(b'\n')
+    response.close()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_byte, elapsed, size, peak, lines
+
+
+def materialize(app, seller_id):
+    with app.app_context():
+        tracemalloc.start()
+        start = time.perf_counter()
+        orders = (
+            Order.query.join(Product)
+            .options(contains_eager(Order.product), joinedload(Order.buyer))
+            .filter(Product.seller_id == seller_id)
+            .order_by(Order.created_at, Order.id)
+            .all()
+        )
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        count = len(orders)
+        del orders
+        db.session.remove()
+    return count, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=300000)
+    parser.add_argument('--max-peak-mb', type=float, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        app = create_app()
+        init_schema(app)
+        app.config['WTF_CSRF_ENABLED'] = False
+        logging.getLogger('metrics').setLevel(logging.ERROR)  # every export is "slow"
+        with app.app_context():
+            seller_id = seed(args.orders)
+
+        client = app.test_client()
+        client.post('/login', data={'email': 'coop@example.com', 'password': 'pw'})
+
+        runs = [
+            ('csv', '/seller/orders/export?format=csv', None),
+            ('json', '/seller/orders/export?format=json', None),
+            ('csv+gzip', '/seller/orders/export?format=csv', {'Accept-Encoding': 'gzip'}),
+            ('csv 2023, Shipped', '/seller/orders/export?from=2023-01-01&to=2023-12-31&status=Shipped', None),
+        ]
+        print(f'{args.orders} orders for one seller')
+        print(f'{"export":<20}{"rows":>8}{"first byte ms":>15}{"total s":>10}{"MB sent":>10}{"peak MB":>10}')
+        failed = False
+        for name, url, headers in runs:
+            first_byte, elapsed, size, peak, lines = download(client, url, headers)
+            rows = lines - 1 if 'json' not in name else '-'
+            print(f'{name:<20}{rows:>8}{first_byte * 1000:>15.1f}{elapsed:>10.2f}'
+                  f'{size / 2 ** 20:>10.1f}{peak / 2 ** 20:>10.1f}')
+            failed = failed or peak / 2 ** 20 > args.max_peak_mb
+
+        count, elapsed, peak = materialize(app, seller_id)
+        print(f'{"ORM .all() (page)":<20}{count:>8}{"":>15}{elapsed:>10.2f}{"":>10}{peak / 2 ** 20:>10.1f}')
+        print(('peak memory within ' if not failed else 'peak memory ABOVE ')
+              + f'{args.max_peak_mb:.0f} MB for every export')
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Home page facet counts from product_facets vs. GROUP BY over products.
+
+    python -m benchmarks.bench_facets [--scale catalog] [--repeat 10]
+
+Generates the catalog with ``benchmarks.datagen`` (500k products at the
+default scale; the facet triggers run on every insert). It then checks the
+trigger-maintained counts against a full recount. For a few filter
+combinations it times the counts both ways, and the uncached home page.
+Exits non-zero if the counts disagree.
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import sqlalchemy as sa
+from werkzeug.datastructures import MultiDict
+
+from benchmarks.datagen import SCALES, generate
+
+SELECTIONS = [
+    ('no filter', []),
+    ('category', [('category', 'vegetables')]),
+    ('category + region', [('category', 'vegetables'), ('region', 'Benguet')]),
+    ('2 categories + price', [('category', 'fruits'), ('category', 'grains'), ('price', '50')]),
+]
+
+
+def group_by_counts(selected):
+    """What the page would cost without the facet table: a GROUP BY per dimension."""
+    from facets import DIMENSIONS, PRICE_BUCKETS, filter_products
+    from models import db, Product
+
+    bucket = sa.case(*[(Product.price >= p, p) for p in reversed(PRICE_BUCKETS[1:])], else_=0)
+    columns = {'category': Product.category, 'region': Product.region, 'price': bucket}
+    counts = {}
+    for dimension in DIMENSIONS:
+        others = dict(selected, **{dimension: set()})
+        query = filter_products(Product.query.filter(Product.quantity > 0), others)
+        counts[dimension] = dict(
+            query.with_entities(columns[dimension], sa.func.count()).group_by(columns[dimension]).all()
+        )
+    total = filter_products(Product.query.filter(Product.quantity > 0), selected).count()
+    db.session.rollback()
+    return counts, total
+
+
+def timed(fn, repeat):
+    ms = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        ms.append((time.perf_counter() - start) * 1000)
+    return statistics.median(ms)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', choices=SCALES, default='catalog')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        from app import create_app, init_schema
+        from catalog_cache import invalidate_catalog
+        from facets import facet_counts, selected_facets
+        from models import db, Product
+
+        app = create_app()
+        init_schema(app)
+        logging.getLogger('metrics').setLevel(logging.ERROR)
+        with app.app_context():
+            start = time.perf_counter()
+            generate(args.scale, log=lambda line: None)
+            products = db.session.query(Product).count()
+            print(f'{products} products generated in {time.perf_counter() - start:.0f}s')
+
+            for name, pairs in SELECTIONS:
+                selected = selected_facets(MultiDict(pairs))
+                facets, total = facet_counts(selected)
+                expected, expected_total = group_by_counts(selected)
+                got = {d: {f['value']: f['count'] for f in entries if f['count']}
+                       for d, entries in facets.items()}
+                # Products without a region have no region facet.
+                want = {d: {k: v for k, v in counts.items() if k not in (None, '')}
+                        for d, counts in expected.items()}
+                ok = got == want and total == expected_total
+                print(f'{"ok  " if ok else "FAIL"} facet counts match a recount ({name})')
+                if not ok:
+                    failures.append(name)
+
+            print(f'\n{"filters":<24}{"facet table ms":>16}{"GROUP BY ms":>13}{"home page ms":>14}')
+            client = app.test_client()
+            for name, pairs in SELECTIONS:
+                selected = selected_facets(MultiDict(pairs))
+                fast = timed(lambda: facet_counts(selected), args.repeat)
+                slow = timed(lambda: group_by_counts(selected), max(1, args.repeat // 3))
+
+                def page():
+                    invalidate_catalog()  # measure a cache miss
+                    assert client.get('/', query_string=pairs).status_code == 200
+
+                print(f'{name:<24}{fast:>16.1f}{slow:>13.1f}{timed(page, args.repeat):>14.1f}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Home page image weight with original uploads vs. generated card variants.
+
+    python -m benchmarks.bench_images [--products 24]
+
+Uploads phone-sized photos through the real add-product form, waits for the
+variant workers, then fetches the home page and every image it references.
+"""
+import argparse
+import io
+import os
+import random
+import re
+import tempfile
+import time
+
+from PIL import Image, ImageFilter
+
+from app import create_app, init_schema
+from images import variant_name
+from models import db, User, Product
+from werkzeug.security import generate_password_hash
+
+
+def phone_photo(rng, size=(3024, 4032)):
+    small = Image.effect_noise((size[0] // 8, size[1] // 8), rng.randint(40, 90))
+    image = Image.merge('RGB', [small, small.rotate(90, expand=False), small]).resize(size)
+    image = image.filter(ImageFilter.GaussianBlur(2))
+    buf = io.BytesIO()
+    image.save(buf, 'JPEG', quality=92)
+    return buf.getvalue()
+
+
+def fetch_images(client, urls):
+    total_bytes, decode_s = 0, 0.0
+    for url in urls:
+        body = client.get(url).data
+        total_bytes += len(body)
+        start = time.perf_counter()
+        with Image.open(io.BytesIO(body)) as im:
+            im.load()
+        decode_s += time.perf_counter() - start
+    return total_bytes, decode_s * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=24)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        os.environ['UPLOAD_FOLDER'] = os.path.join(tmp, 'uploads')
+        app = create_app()
+        init_schema(app)
+        app.config['WTF_CSRF_ENABLED'] = False
+        client = app.test_client()
+
+        with app.app_context():
+            db.session.add(User(username='farmer', email='farmer@example.com', role='seller',
+                                password=generate_password_hash('pw')))
+            db.session.commit()
+        client.post('/login', data={'email': 'farmer@example.com', 'password': 'pw'})
+
+        for i in range(args.products):
+            client.post('/seller/add-product', content_type='multipart/form-data', data={
+                'name': f'Product {i}', 'description': 'Fresh from the farm',
+                'price': '10', 'quantity': '5',
+                'image': (io.BytesIO(phone_photo(rng)), f'IMG_{i:04d}.jpg'),
+            })
+
+        with app.app_context():
+            originals = [p.image for p in Product.query.all()]
+        folder = app.config['UPLOAD_FOLDER']
+        deadline = time.time() + 120
+        while time.time() < deadline and not all(
+            os.path.exists(os.path.join(folder, variant_name(url.rsplit('/', 1)[1], 'card')))
+            for url in originals
+        ):
+            time.sleep(0.1)
+
+        client.get('/logout')
+        start = time.perf_counter()
+        html = client.get('/').get_data(as_text=True)
+        html_ms = (time.perf_counter() - start) * 1000
+        cards = re.findall(r'<img src="(/media/[^"]+)"', html)
+
+        before_bytes, before_ms = fetch_images(client, originals)
+        after_bytes, after_ms = fetch_images(client, cards)
+
+        print(f'{len(originals)} products, home HTML {len(html)} bytes in {html_ms:.1f} ms')
+        print(f'{"":<10}{"image KB":>12}{"decode ms":>12}')
+        print(f'{"before":<10}{before_bytes / 1024:>12.0f}{before_ms:>12.1f}')
+        print(f'{"after":<10}{after_bytes / 1024:>12.0f}{after_ms:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Checkout request latency with inline mail vs. the job queue.
+
+    python -m benchmarks.bench_jobs [--buyers 50] [--smtp-latency 0.02]
+
+"inline" drains the notification jobs inside the request, which is what a
+plain ``mail.send()`` in ``checkout()`` would cost; "queued" only enqueues
+them. The queued jobs are then drained by a worker in batches.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, init_schema
+from benchmarks.smtp_standin import SMTPStandIn
+from jobs import run_once, work
+from models import db, User, Product, CartItem, Job
+
+
+def seed(buyers, prefix):
+    password = generate_password_hash('pw')
+    seller = User(username=f'{prefix}-seller', email=f'{prefix}-seller@example.com',
+                  password=password, role='seller')
+    db.session.add(seller)
+    db.session.flush()
+    product = Product(name='Mangoes', description='sweet', price=80.0,
+                      quantity=buyers * 10, seller_id=seller.id)
+    db.session.add(product)
+    db.session.flush()
+    emails = []
+    for i in range(buyers):
+        email = f'{prefix}-buyer{i}@example.com'
+        buyer = User(username=f'{prefix}-buyer{i}', email=email, password=password,
+                     role='buyer', address='Cebu City')
+        db.session.add(buyer)
+        db.session.flush()
+        db.session.add(CartItem(user_id=buyer.id, product_id=product.id, quantity=1))
+        emails.append(email)
+    db.session.commit()
+    return emails
+
+
+def run(app, emails):
+    timings = []
+    for email in emails:
+        client = app.test_client()
+        client.post('/login', data={'email': email, 'password': 'pw'})
+        start = time.perf_counter()
+        client.post('/cart/checkout')
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--buyers', type=int, default=50)
+    parser.add_argument('--smtp-latency', type=float, default=0.02)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, SMTPStandIn(latency=args.smtp_latency) as smtp:
+        os.environ.update({
+            'DATABASE_URL': 'sqlite:///' + os.path.join(tmp, 'bench.db'),
+            'MAIL_SERVER': '127.0.0.1', 'MAIL_PORT': str(smtp.port), 'MAIL_USE_TLS': '0',
+        })
+        app = create_app()
+        init_schema(app)
+        app.config['WTF_CSRF_ENABLED'] = False
+
+        inline_mode = {'on': False}
+
+        @app.after_request
+        def send_inline(response):
+            if inline_mode['on']:
+                while run_once(limit=1):
+                    pass
+            return response
+
+        with app.app_context():
+            inline_emails = seed(args.buyers, 'inline')
+            queued_emails = seed(args.buyers, 'queued')
+
+        inline_mode['on'] = True
+        inline = run(app, inline_emails)
+        inline_mode['on'] = False
+        queued = run(app, queued_emails)
+
+        sent_before = len(smtp.messages)
+        start = time.perf_counter()
+        work(app, stop_when_idle=True)
+        drain_s = time.perf_counter() - start
+        drained = len(smtp.messages) - sent_before
+
+        with app.app_context():
+            failed = Job.query.filter_by(status='failed').count()
+
+        def row(name, ms):
+            p95 = statistics.quantiles(ms, n=20)[-1]
+            print(f'{name:<8}{statistics.median(ms):>10.1f}{p95:>10.1f}'
+                  f'{1000 * len(ms) / sum(ms):>12.1f}')
+
+        print(f'{args.buyers} checkouts per mode, SMTP latency {args.smtp_latency * 1000:.0f} ms/command')
+        print(f'{"mode":<8}{"p50 ms":>10}{"p95 ms":>10}{"req/s":>12}')
+        row('inline', inline)
+        row('queued', queued)
+        print(f'worker drained {drained} emails in {drain_s:.2f}s '
+              f'({drained / drain_s:.1f}/s), {failed} failed jobs')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Bulk order status changes vs. one POST per order, plus rejection checks.
+
+    python -m benchmarks.bench_order_status [--orders 1000]
+
+Approves the orders one request at a time (the old flow), then ships them
+all with a single JSON request. Before that it checks that a batch with
+another seller's order, or an order in the wrong state, is rejected as a
+whole. Exits non-zero if any check fails.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, init_schema
+from models import db, User, Product, Order, OrderStatusHistory
+from querycount import count_queries
+
+
+def seed(orders):
+    password = generate_password_hash('pw')
+    users = [
+        User(username='coop', email='coop@example.com', password=password, role='seller'),
+        User(username='other', email='other@example.com', password=password, role='seller'),
+        User(username='buyer', email='buyer@example.com', password=password, role='buyer'),
+    ]
+    db.session.add_all(users)
+    db.session.flush()
+    coop, other, buyer = users
+    mine = Product(name='Rice', description='milled', price=50, quantity=10 ** 6, seller_id=coop.id)
+    theirs = Product(name='Corn', description='yellow', price=30, quantity=10 ** 6, seller_id=other.id)
+    db.session.add_all([mine, theirs])
+    db.session.flush()
+    rows = [{'buyer_id': buyer.id, 'product_id': mine.id, 'quantity': 1, 'total_price': 50,
+             'status': 'Pending'} for _ in range(orders)]
+    rows.append({'buyer_id': buyer.id, 'product_id': theirs.id, 'quantity': 1,
+                 'total_price': 30, 'status': 'Pending'})
+    db.session.execute(Order.__table__.insert(), rows)
+    db.session.commit()
+    ids = [order_id for order_id, in db.session.query(Order.id).filter_by(product_id=mine.id)]
+    other_id = db.session.query(Order.id).filter_by(product_id=theirs.id).scalar()
+    return ids, other_id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=1000)
+    args = parser.parse_args()
+
+    failures = []
+
+    def check(name, ok):
+        print(f'{"ok  " if ok else "FAIL"} {name}')
+        if not ok:
+            failures.append(name)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        app = create_app()
+        init_schema(app)
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['ORDER_STATUS_BATCH_MAX'] = max(args.orders, 1000)
+        with app.app_context():
+            ids, other_id = seed(args.orders)
+            engine = db.engine
+
+        client = app.test_client()
+        client.post('/login', data={'email': 'coop@example.com', 'password': 'pw'})
+
+        def statuses():
+            with app.app_context():
+                return dict(db.session.query(Order.status, db.func.count()).group_by(Order.status).all())
+
+        def history():
+            with app.app_context():
+                return db.session.query(OrderStatusHistory).count()
+
+        before, before_history = statuses(), history()
+        r = client.post('/seller/orders/status', json={'order_ids': ids[:10] + [other_id], 'status': 'Approved'})
+        check('batch with another seller\'s order is rejected with 403',
+              r.status_code == 403 and r.json['not_owned'] == [other_id])
+        check('nothing changed after the partial-ownership rejection',
+              statuses() == before and history() == before_history)
+        r = client.post('/seller/orders/status', json={'order_ids': ids[:10], 'status': 'Shipped'})
+        check('Pending -> Shipped is rejected with 409', r.status_code == 409
+              and len(r.json['wrong_status']) == 10 and statuses() == before)
+        r = client.post('/seller/orders/status', json={'order_ids': ids[:10], 'status': 'Pending'})
+        check('moving back to Pending is rejected', r.status_code == 400)
+
+        start = time.perf_counter()
+        with count_queries(engine) as single:
+            for order_id in ids:
+                client.post(f'/seller/order/update/{order_id}/Approved')
+        single_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with count_queries(engine) as bulk:
+            r = client.post('/seller/orders/status', json={'order_ids': ids, 'status': 'Shipped'})
+        bulk_s = time.perf_counter() - start
+        check(f'bulk request shipped all {len(ids)} orders',
+              r.status_code == 200 and statuses().get('Shipped') == len(ids))
+        check('one history row per transition', history() == 2 * len(ids))
+
+        print(f'\n{len(ids)} orders')
+        print(f'{"flow":<22}{"requests":>10}{"SQL":>8}{"seconds":>10}')
+        print(f'{"one POST per order":<22}{len(ids):>10}{single.count:>8}{single_s:>10.2f}')
+        print(f'{"one bulk POST":<22}{1:>10}{bulk.count:>8}{bulk_s:>10.3f}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Many buyers racing for one scarce product, with cart reservations.
+
+    python -m benchmarks.bench_reservations [--buyers 200] [--stock 50] [--threads 16]
+
+Every buyer adds one unit to the cart and, if that succeeded, checks out.
+With reservations a buyer who loses the race finds out at add_to_cart, so
+checkout should never fail. Then every hold is left to expire and the
+sweeper must return all of the stock. Exits non-zero if a check fails:
+overselling, a failed checkout after a successful add, or leaked stock.
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from queue import Queue, Empty
+
+
+def seed(buyers, stock):
+    from werkzeug.security import generate_password_hash
+    from models import db, User, Product
+
+    # A cheap hash: logging in is not what is measured here.
+    password = generate_password_hash('pw', method='pbkdf2:sha256:1000')
+    seller = User(username='seller', email='seller@example.com', password=password, role='seller')
+    db.session.add(seller)
+    db.session.flush()
+    product = Product(name='Carabao mango', description='first harvest', price=120,
+                      quantity=stock, seller_id=seller.id)
+    db.session.add(product)
+    db.session.add_all([
+        User(username=f'buyer{i}', email=f'buyer{i}@example.com', password=password,
+             role='buyer', address='Guimaras')
+        for i in range(buyers)
+    ])
+    db.session.commit()
+    return product.id
+
+
+def race(app, product_id, buyers, threads):
+    """Run every buyer's add -> checkout; returns (step, ms, ok) tuples."""
+    queue = Queue()
+    for i in range(buyers):
+        queue.put(i)
+    results = []
+
+    def run():
+        while True:
+            try:
+                i = queue.get_nowait()
+            except Empty:
+                return
+            client = app.test_client()
+            client.post('/login', data={'email': f'buyer{i}@example.com', 'password': 'pw'})
+            start = time.perf_counter()
+            r = client.post(f'/cart/add/{product_id}', data={'quantity': 1}, follow_redirects=True)
+            added = 'added to cart' in r.get_data(as_text=True)
+            results.append(('add_to_cart', (time.perf_counter() - start) * 1000, added))
+            if not added:
+                continue
+            start = time.perf_counter()
+            r = client.post('/cart/checkout')
+            ok = r.status_code == 200 and 'Checkout complete' in r.get_data(as_text=True)
+            results.append(('checkout', (time.perf_counter() - start) * 1000, ok))
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--buyers', type=int, default=200)
+    parser.add_argument('--stock', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    failures = []
+
+    def check(name, ok):
+        print(f'{"ok  " if ok else "FAIL"} {name}')
+        if not ok:
+            failures.append(name)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        from app import create_app, init_schema
+        from models import db, Product, Order, CartItem
+        from reservations import release_expired
+
+        app = create_app()
+        init_schema(app)
+        app.config['WTF_CSRF_ENABLED'] = False
+        logging.getLogger('metrics').setLevel(logging.ERROR)
+        with app.app_context():
+            product_id = seed(args.buyers, args.stock)
+
+        started = time.perf_counter()
+        results = race(app, product_id, args.buyers, args.threads)
+        elapsed = time.perf_counter() - started
+
+        adds = [r for r in results if r[0] == 'add_to_cart']
+        checkouts = [r for r in results if r[0] == 'checkout']
+        with app.app_context():
+            sold = db.session.query(db.func.coalesce(db.func.sum(Order.quantity), 0)).scalar()
+            left = db.session.get(Product, product_id).quantity
+        expected = min(args.stock, args.buyers)
+        check(f'sold exactly {expected} units, none oversold', sold == expected and left == args.stock - sold)
+        check('every buyer who got a hold checked out', all(ok for _, _, ok in checkouts))
+        check('buyers who lost the race were told at add_to_cart',
+              sum(not ok for _, _, ok in adds) == args.buyers - expected)
+
+        print(f'\n{args.buyers} buyers, {args.stock} units, {args.threads} threads, {elapsed:.1f}s')
+        print(f'{"step":<13}{"requests":>10}{"succeeded":>11}{"p50 ms":>9}{"p95 ms":>9}{"max ms":>9}')
+        for step, rows in (('add_to_cart', adds), ('checkout', checkouts)):
+            ms = sorted(t for _, t, _ in rows)
+            if not ms:
+                continue
+            print(f'{step:<13}{len(ms):>10}{sum(ok for _, _, ok in rows):>11}'
+                  f'{statistics.median(ms):>9.1f}{ms[int(len(ms) * 0.95) - 1]:>9.1f}{ms[-1]:>9.1f}')
+        print(f'success rate {expected / args.buyers:.0%} of buyers; '
+              f'{len(checkouts) - sum(ok for _, _, ok in checkouts)} wasted checkouts')
+
+        # Abandoned carts: everyone holds a unit, nobody checks out, holds expire.
+        with app.app_context():
+            db.session.query(Product).filter_by(id=product_id).update({'quantity': args.stock})
+            db.session.commit()
+        app.config['RESERVATION_TTL'] = 0
+        abandoned = 0
+        for i in range(min(args.buyers, args.stock)):
+            client = app.test_client()
+            client.post('/login', data={'email': f'buyer{i}@example.com', 'password': 'pw'})
+            r = client.post(f'/cart/add/{product_id}', data={'quantity': 1}, follow_redirects=True)
+            abandoned += 'added to cart' in r.get_data(as_text=True)
+        time.sleep(0.01)
+        with app.app_context():
+            held = args.stock - db.session.get(Product, product_id).quantity
+            start = time.perf_counter()
+            released = release_expired(batch_size=max(1, abandoned // 4))
+            sweep_ms = (time.perf_counter() - start) * 1000
+            left = db.session.get(Product, product_id).quantity
+            still_held = CartItem.query.filter(CartItem.reserved_until.isnot(None)).count()
+        check(f'sweeper released {released} expired holds in {sweep_ms:.1f} ms and returned all stock',
+              held == abandoned and released == abandoned and left == args.stock and still_held == 0)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Dashboard queries from the sales rollups vs. aggregating ``orders`` directly.
+
+    python -m benchmarks.bench_rollups [--scale small] [--repeat 20]
+
+Generates a database with ``benchmarks.datagen``, then times the summary
+and top-products queries for a 30-day and a full-year range both ways.
+The generated orders are spread thin (about one per product per day), so
+this is close to the worst case for the rollups.
+Exits non-zero if the rollups disagree with the orders.
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+import sqlalchemy as sa
+
+from benchmarks.datagen import SCALES, generate
+
+
+def raw_summary(seller_id, start, end):
+    from models import db, Product, Order
+
+    stmt = (
+        sa.select(sa.func.count(), sa.func.sum(Order.quantity), sa.func.sum(Order.total_price))
+        .join(Product, Product.id == Order.product_id)
+        .where(sa.func.date(Order.created_at) >= start.isoformat(),
+               sa.func.date(Order.created_at) <= end.isoformat())
+    )
+    if seller_id is not None:
+        stmt = stmt.where(Product.seller_id == seller_id)
+    return db.session.execute(stmt).one()
+
+
+def raw_top_products(seller_id, start, end):
+    from models import db, Product, Order
+
+    stmt = (
+        sa.select(Order.product_id, Product.name, sa.func.sum(Order.total_price).label('revenue'))
+        .join(Product, Product.id == Order.product_id)
+        .where(sa.func.date(Order.created_at) >= start.isoformat(),
+               sa.func.date(Order.created_at) <= end.isoformat())
+        .group_by(Order.product_id, Product.name)
+        .order_by(sa.desc('revenue'))
+        .limit(10)
+    )
+    if seller_id is not None:
+        stmt = stmt.where(Product.seller_id == seller_id)
+    return db.session.execute(stmt).all()
+
+
+def timed(fn, repeat):
+    ms = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        ms.append((time.perf_counter() - start) * 1000)
+    return statistics.median(ms)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        from app import create_app, init_schema
+        from analytics import check_rollups, summary, top_products
+        from models import db, Order, SalesDaily
+
+        app = create_app()
+        init_schema(app)
+        logging.getLogger('metrics').setLevel(logging.ERROR)
+        with app.app_context():
+            generate(args.scale, log=lambda line: None)
+            print(f'{db.session.query(Order).count()} orders, '
+                  f'{db.session.query(SalesDaily).count()} rollup rows')
+            mismatches = check_rollups()
+            print(f'{"ok  " if not mismatches else "FAIL"} rollups match the orders '
+                  f'({len(mismatches)} mismatched rows)')
+
+            print(f'\n{"query":<28}{"range":<10}{"rollup ms":>11}{"orders ms":>11}')
+            for label, start, end in (('30 days', date(2025, 6, 1), date(2025, 6, 30)),
+                                      ('year', date(2025, 1, 1), date(2025, 12, 31))):
+                for name, fast, slow in (
+                    ('summary (all sellers)', lambda: summary(None, start, end),
+                     lambda: raw_summary(None, start, end)),
+                    ('summary (seller 1)', lambda: summary(1, start, end),
+                     lambda: raw_summary(1, start, end)),
+                    ('top products (all)', lambda: top_products(None, start, end),
+                     lambda: raw_top_products(None, start, end)),
+                ):
+                    print(f'{name:<28}{label:<10}{timed(fast, args.repeat):>11.1f}'
+                          f'{timed(slow, args.repeat):>11.1f}')
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
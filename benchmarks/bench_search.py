@@ -0,0 +1,88 @@
+"""Compare the full-text search path with the old ``ilike`` scan.
+
+    python -m benchmarks.bench_search [--products 100000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app import create_app, init_schema
+from models import db, User, Product
+from search import search_products
+
+WORDS = [
+    'rice', 'corn', 'mango', 'banana', 'tomato', 'onion', 'garlic', 'eggplant',
+    'cabbage', 'carrot', 'calamansi', 'coconut', 'pineapple', 'ampalaya',
+    'organic', 'fresh', 'sweet', 'native', 'premium', 'dried', 'harvest',
+]
+SYLLABLES = ['ba', 'ka', 'la', 'ma', 'na', 'pa', 'sa', 'ta', 'ri', 'lo', 'gu', 'yo']
+QUERIES = ['mango', 'fresh tomato', 'calam', 'kala', 'durian']
+
+
+def vocabulary(rng, size=3000):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed(count):
+    rng = random.Random(42)
+    vocab = vocabulary(rng)
+    seller = User(username='bench-seller', email='bench@example.com',
+                  password='x', role='seller')
+    db.session.add(seller)
+    db.session.commit()
+
+    rows = []
+    for _ in range(count):
+        rows.append({
+            'name': f'{rng.choice(WORDS)} {rng.choice(vocab)} {rng.choice(WORDS)}',
+            'description': ' '.join(rng.choices(vocab, k=12)),
+            'price': round(rng.uniform(5, 500), 2),
+            'quantity': rng.randint(0, 100),
+            'seller_id': seller.id,
+        })
+        if len(rows) == 5000:
+            db.session.execute(Product.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Product.__table__.insert(), rows)
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        app = create_app()
+        init_schema(app)
+        with app.app_context():
+            seed(args.products)
+            print(f'{args.products} products')
+            print(f'{"query":<24}{"ilike ms":>10}{"fts ms":>10}{"hits":>8}')
+            for q in QUERIES:
+                base = Product.query.filter(Product.price <= 400)
+                ilike = lambda: base.filter(Product.name.ilike(f'%{q}%')).all()
+                fts = lambda: search_products(base, q)[0].all()
+                ilike_ms = timed(ilike, args.repeat)
+                fts_ms = timed(fts, args.repeat)
+                print(f'{q:<24}{ilike_ms:>10.2f}{fts_ms:>10.2f}{len(fts()):>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""SQL statements and latency per authenticated request, with and without the user cache.
+
+    python -m benchmarks.bench_session [--requests 500]
+
+"uncached" swaps in a cache that never holds an entry, which is what the old
+``User.query.get`` loader cost on every request.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, init_schema
+from catalog_cache import LRUCache
+from models import db, User, Product, CartItem
+from querycount import count_queries
+
+PAGES = [
+    ('home (cached page)', 'GET', '/'),
+    ('product_view', 'GET', '/product/{pid}'),
+    ('view_cart', 'GET', '/cart'),
+    ('cart +1', 'POST', '/cart/update/{item_id}'),
+]
+
+
+def seed():
+    password = generate_password_hash('pw')
+    seller = User(username='bench-seller', email='seller@example.com', password=password,
+                  role='seller')
+    buyer = User(username='bench-buyer', email='buyer@example.com', password=password,
+                 role='buyer', address='Iloilo City')
+    db.session.add_all([seller, buyer])
+    db.session.flush()
+    product = Product(name='Mangoes', description='sweet', price=80.0, quantity=10 ** 6,
+                      seller_id=seller.id)
+    db.session.add(product)
+    db.session.flush()
+    item = CartItem(user_id=buyer.id, product_id=product.id, quantity=1)
+    db.session.add(item)
+    db.session.commit()
+    return product.id, item.id
+
+
+def measure(engine, client, method, url, requests):
+    # No app context around the loop: each request must get a fresh session,
+    # as it would in production, or the identity map hides the user query.
+    timings = []
+    with count_queries(engine) as counter:
+        for _ in range(requests):
+            start = time.perf_counter()
+            client.open(url, method=method, data={'action': 'increase'})
+            timings.append((time.perf_counter() - start) * 1000)
+    return counter.count / requests, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        app = create_app()
+        init_schema(app)
+        app.config['WTF_CSRF_ENABLED'] = False
+        with app.app_context():
+            pid, item_id = seed()
+            engine = db.engine
+
+        buyer = app.test_client()
+        buyer.post('/login', data={'email': 'buyer@example.com', 'password': 'pw'})
+        seller = app.test_client()
+        seller.post('/login', data={'email': 'seller@example.com', 'password': 'pw'})
+        pages = [(name, buyer, method, url.format(pid=pid, item_id=item_id))
+                 for name, method, url in PAGES]
+        # Rejected on the role check alone.
+        pages.append(('seller add_to_cart', seller, 'POST', f'/cart/add/{pid}'))
+
+        cached = app.extensions['user_cache']
+        results = {}
+        for mode, cache in (('uncached', LRUCache(max_entries=0)), ('cached', cached)):
+            app.extensions['user_cache'] = cache
+            for name, client, method, url in pages:
+                client.open(url, method=method)  # warm up
+                results[name, mode] = measure(engine, client, method, url, args.requests)
+
+        print(f'{args.requests} requests per page; SQL statements and median ms per request')
+        print(f'{"page":<22}{"uncached":>10}{"cached":>10}{"uncached ms":>13}{"cached ms":>11}')
+        for name, *_ in pages:
+            (q0, t0), (q1, t1) = results[name, 'uncached'], results[name, 'cached']
+            print(f'{name:<22}{q0:>10.1f}{q1:>10.1f}{t0:>13.2f}{t1:>11.2f}')
+
+
+if __name__ == '__main__':
+    main()
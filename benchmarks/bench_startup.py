@@ -0,0 +1,124 @@
+"""Worker cold start: time from a fresh worker to its first responses.
+
+    python -m benchmarks.bench_startup [--runs 5] [--workers 4]
+
+Every run boots a new interpreter and times import, create_app() and the
+first GET of / and /login. There are three ways to boot a web worker:
+
+- ``schema at boot`` is how every worker used to start. It ran the
+  migrations and the index checks, then compiled templates on first render.
+- ``cold worker`` is today's create_web_app(), loading compiled templates
+  from TEMPLATE_CACHE_DIR.
+- ``--preload fork`` is ``gunicorn --preload``. The master imports and
+  creates the app once, then forks workers, each timed from fork() to its
+  first responses.
+
+Exits non-zero if any response is not 200.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PATHS = ('/', '/login')
+MODES = ('schema at boot', 'cold worker', '--preload fork')
+
+
+def first_requests(app):
+    client = app.test_client()
+    return all(client.get(path).status_code == 200 for path in PATHS)
+
+
+def boot(mode, workers):
+    """Runs in a fresh interpreter; prints one JSON line per worker."""
+    if mode == 'schema at boot':
+        os.environ['PRECOMPILE_TEMPLATES'] = '0'
+        os.environ['TEMPLATE_CACHE_DIR'] = ''
+    start = time.perf_counter()
+    from app import create_app, create_web_app, init_schema
+    imported = time.perf_counter()
+    if mode == 'schema at boot':
+        app = create_app()
+        init_schema(app)
+    else:
+        app = create_web_app()
+    created = time.perf_counter()
+
+    if mode != '--preload fork':
+        ok = first_requests(app)
+        done = time.perf_counter()
+        print(json.dumps({'import': imported - start, 'create_app': created - imported,
+                          'first requests': done - created, 'total': done - start, 'ok': ok}))
+        return
+
+    for _ in range(workers):
+        read, write = os.pipe()
+        forked = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            ok = first_requests(app)
+            done = time.perf_counter()  # monotonic clock, shared with the parent
+            os.write(write, json.dumps({'import': 0, 'create_app': 0, 'first requests': done - forked,
+                                        'total': done - forked, 'ok': ok}).encode())
+            os._exit(0)
+        os.close(write)
+        with os.fdopen(read) as reply:
+            print(reply.read())
+        os.waitpid(pid, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4, help='forks per preloaded master')
+    parser.add_argument('--boot', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.boot:
+        boot(args.boot, args.workers)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'),
+                   TEMPLATE_CACHE_DIR=os.path.join(tmp, 'templates'))
+        # Deploy step: schema, sample data and a warm template cache.
+        subprocess.run([sys.executable, '-c', (
+            'import logging\n'
+            'from app import create_web_app, init_schema\n'
+            'from benchmarks.datagen import generate\n'
+            'app = create_web_app()\n'
+            'init_schema(app)\n'
+            'logging.getLogger("alembic").setLevel(logging.WARNING)\n'
+            'with app.app_context():\n'
+            '    generate("tiny", log=lambda line: None)\n'
+        )], env=env, check=True, stderr=subprocess.DEVNULL)
+
+        results = {}
+        for mode in MODES:
+            rows = []
+            for _ in range(args.runs):
+                out = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_startup', '--boot', mode,
+                     '--workers', str(args.workers)],
+                    env=env, check=True, capture_output=True, text=True,
+                ).stdout
+                rows += [json.loads(line) for line in out.splitlines() if line.startswith('{')]
+            results[mode] = rows
+
+    ok = all(row['ok'] for rows in results.values() for row in rows)
+    print(f'{"ok  " if ok else "FAIL"} every worker answered {" and ".join(PATHS)} with 200')
+    columns = ('import', 'create_app', 'first requests', 'total')
+    print(f'\nmedian ms per worker\n{"boot":<18}' + ''.join(f'{c:>16}' for c in columns))
+    for mode, rows in results.items():
+        print(f'{mode:<18}' + ''.join(
+            f'{statistics.median(row[c] for row in rows) * 1000:>16.1f}' for c in columns
+        ))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
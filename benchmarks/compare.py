@@ -0,0 +1,75 @@
+"""Compare two ``benchmarks.loadtest`` result files and flag regressions.
+
+    python -m benchmarks.compare before.json after.json [--threshold 0.10]
+
+A route regresses when its p95 or p99 latency grows, or its throughput
+drops, by more than the threshold (10% by default), or when it starts
+returning errors. Exits 1 if anything regressed.
+"""
+import argparse
+import json
+import sys
+
+LATENCY = ('p50_ms', 'p95_ms', 'p99_ms')
+GATED = ('p95_ms', 'p99_ms')
+
+
+def change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) / old
+
+
+def compare(before, after, threshold):
+    """Yield ``(route, metric, old, new, delta, regressed)`` rows."""
+    for route in sorted(set(before['routes']) | set(after['routes'])):
+        old = before['routes'].get(route)
+        new = after['routes'].get(route)
+        if old is None or new is None:
+            yield route, 'missing', bool(old), bool(new), None, False
+            continue
+        for metric in LATENCY:
+            delta = change(old[metric], new[metric])
+            yield route, metric, old[metric], new[metric], delta, (
+                metric in GATED and delta > threshold
+            )
+        delta = change(old['rps'], new['rps'])
+        yield route, 'rps', old['rps'], new['rps'], delta, -delta > threshold
+        yield route, 'errors', old['errors'], new['errors'], None, (
+            new['errors'] > 0 and old['errors'] == 0
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    for label, result in (('before', before), ('after', after)):
+        meta = result['meta']
+        print(f'{label:<7}{meta.get("revision") or "?":<10}{meta["database"]:<12}'
+              f'scale={meta.get("scale")} clients={meta["clients"]} {meta["duration_s"]}s')
+
+    regressions = 0
+    print(f'{"route":<16}{"metric":<8}{"before":>10}{"after":>10}{"change":>9}')
+    for route, metric, old, new, delta, regressed in compare(before, after, args.threshold):
+        if metric == 'errors' and not (old or new):
+            continue
+        shown = '' if delta is None else f'{delta:+.1%}'
+        flag = '  REGRESSION' if regressed else ''
+        print(f'{route:<16}{metric:<8}{old:>10}{new:>10}{shown:>9}{flag}')
+        regressions += regressed
+
+    print(f'{regressions} regression(s) above {args.threshold:.0%}')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""Seeded synthetic marketplace data, built through the real models.
+
+    python -m benchmarks.datagen --database-url sqlite:////tmp/agrimarket_bench.db --scale small
+    python -m benchmarks.datagen --database-url postgresql://localhost/agrimarket_bench --scale large
+
+The same ``--seed`` and ``--scale`` always produce the same rows, so two
+benchmark runs against freshly generated databases are comparable. Every
+generated user has the password ``PASSWORD``.
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from analytics import rebuild_rollups
+from models import db, User, Product, Order, CartItem, Message, SalesDaily
+
+PASSWORD = 'bench-password'
+EPOCH = datetime(2025, 1, 1)
+
+SCALES = {
+    #          sellers  buyers   products  orders     carts   threads
+    'tiny':   (20,      200,     2000,     10000,     100,    100),
+    'small':  (200,     2000,    20000,    100000,    1000,   1000),
+    'medium': (2000,    20000,   100000,   1000000,   10000,  10000),
+    'large':  (10000,   100000,  500000,   5000000,   50000,  50000),
+    # the large catalog alone, for the home page and facet benchmarks
+    'catalog': (10000,  100,     500000,   0,         0,      0),
+}
+
+CROPS = [
+    'rice', 'corn', 'mango', 'banana', 'tomato', 'onion', 'garlic', 'eggplant',
+    'cabbage', 'carrot', 'calamansi', 'coconut', 'pineapple', 'ampalaya',
+    'papaya', 'camote', 'cassava', 'okra', 'pechay', 'kangkong', 'sitaw',
+    'squash', 'ginger', 'lanzones', 'rambutan', 'durian', 'coffee', 'cacao',
+]
+CROP_CATEGORIES = {
+    'rice': 'grains', 'corn': 'grains', 'coffee': 'other', 'cacao': 'other',
+    'camote': 'root-crops', 'cassava': 'root-crops', 'garlic': 'herbs-spices',
+    'ginger': 'herbs-spices', 'onion': 'vegetables', 'tomato': 'vegetables',
+    'eggplant': 'vegetables', 'cabbage': 'vegetables', 'carrot': 'vegetables',
+    'ampalaya': 'vegetables', 'okra': 'vegetables', 'pechay': 'vegetables',
+    'kangkong': 'vegetables', 'sitaw': 'vegetables', 'squash': 'vegetables',
+}  # everything else in CROPS is a fruit
+QUALIFIERS = [
+    'organic', 'fresh', 'sweet', 'native', 'premium', 'dried', 'harvest',
+    'young', 'ripe', 'red', 'yellow', 'highland', 'lowland', 'wholesale',
+]
+REGIONS = [
+    'Benguet', 'Nueva Ecija', 'Pangasinan', 'Bukidnon', 'Davao', 'Cebu',
+    'Iloilo', 'Quezon', 'Batangas', 'Cotabato', 'Leyte', 'Bohol',
+]
+STATUSES = ['Pending', 'Approved', 'Shipped', 'Completed']
+STATUS_WEIGHTS = [15, 20, 25, 40]
+PHRASES = [
+    'Is this still available?', 'How many kilos can you deliver?',
+    'Can you ship to {region}?', 'Thank you, received in good condition.',
+    'When is the next harvest?', 'Yes, we have stock.', 'Shipping tomorrow.',
+]
+
+BATCH = 5000
+
+
+def search_terms():
+    """Queries the load driver sends to ``home()``; all occur in the data."""
+    return CROPS + [f'{q} {c}' for q in QUALIFIERS[:4] for c in CROPS[:6]]
+
+
+def _when(rng, days=365):
+    return EPOCH + timedelta(seconds=rng.randrange(days * 86400))
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH):
+        db.session.bulk_insert_mappings(model, rows[start:start + BATCH])
+    db.session.commit()
+
+
+def _stream(model, count, make):
+    """Insert ``count`` rows built by ``make(i)`` without holding them all."""
+    rows = []
+    for i in range(count):
+        rows.append(make(i))
+        if len(rows) == BATCH:
+            db.session.bulk_insert_mappings(model, rows)
+            db.session.commit()
+            rows = []
+    if rows:
+        db.session.bulk_insert_mappings(model, rows)
+        db.session.commit()
+
+
+def generate(scale='small', seed=1, log=print):
+    """Fill an empty database; returns the row counts that were written."""
+    sellers, buyers, products, orders, carts, threads = SCALES[scale]
+    rng = random.Random(seed)
+    password = generate_password_hash(PASSWORD)
+    started = time.perf_counter()
+
+    def step(label, count):
+        log(f'{label:<10}{count:>10}  {time.perf_counter() - started:7.1f}s')
+
+    _insert(User, [
+        {
+            'username': f'seller{i}', 'email': f'seller{i}@example.com',
+            'password': password, 'role': 'seller',
+            'location': rng.choice(REGIONS), 'created_at': _when(rng),
+        }
+        for i in range(sellers)
+    ] + [
+        {
+            'username': f'buyer{i}', 'email': f'buyer{i}@example.com',
+            'password': password, 'role': 'buyer',
+            'address': f'{rng.randint(1, 999)} Rizal St, {rng.choice(REGIONS)}',
+            'created_at': _when(rng),
+        }
+        for i in range(buyers)
+    ])
+    seller_regions = dict(db.session.query(User.id, User.location).filter_by(role='seller'))
+    seller_ids = sorted(seller_regions)
+    buyer_ids = [row[0] for row in db.session.query(User.id).filter_by(role='buyer').order_by(User.id)]
+    step('users', sellers + buyers)
+
+    # A long tail: a few sellers list most of the catalog.
+    def product(i):
+        crop = rng.choice(CROPS)
+        region = rng.choice(REGIONS)
+        seller_id = seller_ids[int(len(seller_ids) * rng.random() ** 2)]
+        return {
+            'name': f'{rng.choice(QUALIFIERS).title()} {crop} from {region}',
+            'description': f'{rng.choice(QUALIFIERS)} {crop}, harvested in {region}. '
+                           f'{rng.choice(QUALIFIERS)} {rng.choice(CROPS)} also available.',
+            'price': round(rng.lognormvariate(4.5, 0.8), 2),
+            'quantity': rng.randint(100, 100000),
+            'seller_id': seller_id,
+            'category': CROP_CATEGORIES.get(crop, 'fruits'),
+            'region': seller_regions[seller_id],
+            'created_at': _when(rng),
+        }
+
+    _stream(Product, products, product)
+    product_rows = db.session.query(Product.id, Product.price).order_by(Product.id).all()
+    step('products', products)
+
+    def order(i):
+        pid, price = product_rows[int(len(product_rows) * rng.random() ** 1.5)]
+        quantity = rng.randint(1, 10)
+        created = _when(rng)
+        return {
+            'buyer_id': rng.choice(buyer_ids), 'product_id': pid,
+            'quantity': quantity, 'total_price': round(price * quantity, 2),
+            'status': rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+            'delivery_address': rng.choice(REGIONS),
+            'created_at': created, 'updated_at': created,
+        }
+
+    _stream(Order, orders, order)
+    step('orders', orders)
+    rebuild_rollups()
+    step('rollups', db.session.query(SalesDaily).count())
+
+    cart_rows = []
+    for buyer_id in rng.sample(buyer_ids, min(carts, len(buyer_ids))):
+        for pid, _ in rng.sample(product_rows, rng.randint(1, 5)):
+            cart_rows.append({
+                'user_id': buyer_id, 'product_id': pid,
+                'quantity': rng.randint(1, 3), 'added_at': _when(rng),
+            })
+    _insert(CartItem, cart_rows)
+    step('cart items', len(cart_rows))
+
+    def messages(count):
+        for _ in range(count):
+            buyer_id, seller_id = rng.choice(buyer_ids), rng.choice(seller_ids)
+            sent = _when(rng)
+            for n in range(rng.randint(2, 12)):
+                sent += timedelta(minutes=rng.randint(1, 600))
+                sender, receiver = (buyer_id, seller_id) if n % 2 == 0 else (seller_id, buyer_id)
+                yield {
+                    'sender_id': sender, 'receiver_id': receiver,
+                    'content': rng.choice(PHRASES).format(region=rng.choice(REGIONS)),
+                    'timestamp': sent, 'read_at': sent,
+                }
+
+    message_rows = messages(threads)
+    message_count = 0
+    while True:
+        batch = list(itertools.islice(message_rows, BATCH))
+        if not batch:
+            break
+        db.session.bulk_insert_mappings(Message, batch)
+        db.session.commit()
+        message_count += len(batch)
+    step('messages', message_count)
+
+    return {
+        'users': sellers + buyers, 'products': products, 'orders': orders,
+        'cart_items': len(cart_rows), 'messages': message_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url
+    from app import create_app, init_schema
+
+    app = create_app()
+    init_schema(app)
+    with app.app_context():
+        if db.session.query(User.id).first() is not None:
+            parser.error('database is not empty')
+        generate(args.scale, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Scripted buyer and seller journeys against the WSGI app, N clients at once.
+
+    python -m benchmarks.loadtest --scale tiny --clients 8 --duration 30 --out before.json
+    python -m benchmarks.loadtest --database-url sqlite:////tmp/agrimarket_bench.db --clients 16
+
+Without ``--database-url`` a fresh database is generated with
+``benchmarks.datagen`` in a temporary directory. Each client logs in as a
+generated buyer or seller and loops over its journey until the time is up;
+p50/p95/p99 latency and throughput are reported per route and written to
+``--out`` for ``python -m benchmarks.compare``.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks.datagen import PASSWORD, SCALES, generate, search_terms
+
+
+def percentile(sorted_ms, pct):
+    if not sorted_ms:
+        return None
+    rank = max(0, min(len(sorted_ms) - 1, round(pct / 100 * len(sorted_ms) + 0.5) - 1))
+    return sorted_ms[rank]
+
+
+class Client:
+    def __init__(self, app, email, rng, timings):
+        self.http = app.test_client()
+        self.rng = rng
+        self.timings = timings
+        self.http.post('/login', data={'email': email, 'password': PASSWORD})
+
+    def hit(self, route, method, url, **kwargs):
+        start = time.perf_counter()
+        response = self.http.open(url, method=method, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.timings.append((route, elapsed, response.status_code >= 500))
+        return response
+
+
+def buyer_journey(client, product_ids, terms):
+    client.hit('home', 'GET', '/')
+    client.hit('home_search', 'GET', '/', query_string={'q': client.rng.choice(terms)})
+    pid = client.rng.choice(product_ids)
+    client.hit('product_view', 'GET', f'/product/{pid}')
+    client.hit('add_to_cart', 'POST', f'/cart/add/{pid}', data={'quantity': 1})
+    client.hit('view_cart', 'GET', '/cart')
+    if client.rng.random() < 0.3:
+        client.hit('checkout', 'POST', '/cart/checkout')
+        client.hit('order_history', 'GET', '/orders')
+
+
+def seller_journey(client, product_ids, terms):
+    client.hit('seller_orders', 'GET', '/seller/orders')
+    client.hit('my_products', 'GET', '/seller/my-products')
+    client.hit('product_view', 'GET', f'/product/{client.rng.choice(product_ids)}')
+
+
+def run(app, clients, duration, seller_share, seed):
+    from models import db, User, Product
+
+    with app.app_context():
+        product_ids = [row[0] for row in db.session.query(Product.id)]
+        # datagen skews the catalog towards low seller ids, so these are the busiest.
+        sellers = [row[0] for row in db.session.query(User.email).filter_by(role='seller').order_by(User.id)]
+        buyers = [row[0] for row in db.session.query(User.email).filter_by(role='buyer').order_by(User.id)]
+
+    terms = search_terms()
+    timings = []
+    lock = threading.Lock()
+    n_sellers = round(clients * seller_share)
+    start_gate = threading.Barrier(clients + 1)
+    deadline = [0.0]
+
+    def client_loop(i):
+        rng = random.Random(seed * 1000 + i)
+        is_seller = i < n_sellers
+        email = sellers[i % len(sellers)] if is_seller else buyers[i % len(buyers)]
+        local = []
+        client = Client(app, email, rng, local)
+        journey = seller_journey if is_seller else buyer_journey
+        start_gate.wait()
+        while time.perf_counter() < deadline[0]:
+            journey(client, product_ids, terms)
+        with lock:
+            timings.extend(local)
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    deadline[0] = time.perf_counter() + duration
+    start_gate.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    return timings, time.perf_counter() - started
+
+
+def summarize(timings, wall):
+    by_route = defaultdict(list)
+    errors = defaultdict(int)
+    for route, ms, failed in timings:
+        by_route[route].append(ms)
+        errors[route] += failed
+    routes = {}
+    for route, values in sorted(by_route.items()):
+        values.sort()
+        routes[route] = {
+            'requests': len(values),
+            'errors': errors[route],
+            'p50_ms': round(percentile(values, 50), 2),
+            'p95_ms': round(percentile(values, 95), 2),
+            'p99_ms': round(percentile(values, 99), 2),
+            'rps': round(len(values) / wall, 2),
+        }
+    return routes
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(routes, wall):
+    print(f'{"route":<16}{"requests":>10}{"errors":>8}{"p50 ms":>10}{"p95 ms":>10}'
+          f'{"p99 ms":>10}{"req/s":>10}')
+    for route, r in routes.items():
+        print(f'{route:<16}{r["requests"]:>10}{r["errors"]:>8}{r["p50_ms"]:>10.1f}'
+              f'{r["p95_ms"]:>10.1f}{r["p99_ms"]:>10.1f}{r["rps"]:>10.1f}')
+    total = sum(r['requests'] for r in routes.values())
+    print(f'{total} requests in {wall:.1f}s, {total / wall:.1f} req/s overall')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', help='an existing database built by benchmarks.datagen')
+    parser.add_argument('--scale', choices=SCALES, default='tiny')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--seller-share', type=float, default=0.25)
+    parser.add_argument('--out', help='write results as JSON')
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = args.database_url or (
+        'sqlite:///' + os.path.join(tmp.name, 'bench.db')
+    )
+    from app import create_app, init_schema
+    from models import db
+
+    app = create_app()
+    init_schema(app)
+    app.config['WTF_CSRF_ENABLED'] = False
+    logging.getLogger('metrics').setLevel(logging.ERROR)
+
+    if not args.database_url:
+        with app.app_context():
+            generate(args.scale, args.seed)
+            db.session.remove()
+
+    timings, wall = run(app, args.clients, args.duration, args.seller_share, args.seed)
+    routes = summarize(timings, wall)
+    print_table(routes, wall)
+
+    if args.out:
+        result = {
+            'meta': {
+                'revision': git_revision(),
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0],
+                'scale': None if args.database_url else args.scale,
+                'seed': args.seed,
+                'clients': args.clients,
+                'duration_s': round(wall, 2),
+                'python': platform.python_version(),
+            },
+            'routes': routes,
+        }
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'results written to {args.out}')
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
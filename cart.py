@@ -0,0 +1,114 @@
+import sqlalchemy as sa
+from flask import current_app
+
+from models import db, Product, CartItem
+from reservations import cart_item, hold_stock, release_stock
+
+OPERATIONS = ('add', 'set', 'remove')
+
+
+class CartRejected(Exception):
+    """The batch was not applied; nothing changed."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def cart_rows(buyer_id):
+    """The buyer's cart lines with subtotals, plus the cart total and unit
+    count on every row, in one query."""
+    subtotal = Product.price * CartItem.quantity
+    return db.session.execute(
+        sa.select(
+            CartItem.id, CartItem.product_id, Product.name, Product.price,
+            CartItem.quantity, CartItem.reserved_until,
+            subtotal.label('subtotal'),
+            sa.func.sum(subtotal).over().label('total'),
+            sa.func.sum(CartItem.quantity).over().label('units'),
+        )
+        .join(Product, Product.id == CartItem.product_id)
+        .where(CartItem.user_id == buyer_id)
+        .order_by(CartItem.id)
+    ).all()
+
+
+def cart_json(buyer_id):
+    rows = cart_rows(buyer_id)
+    return {
+        'items': [
+            {
+                'id': row.id, 'product_id': row.product_id, 'name': row.name,
+                'price': row.price, 'quantity': row.quantity, 'subtotal': row.subtotal,
+                'reserved_until': row.reserved_until.isoformat() + 'Z'
+                if row.reserved_until else None,
+            }
+            for row in rows
+        ],
+        'units': rows[0].units if rows else 0,
+        'total': rows[0].total if rows else 0,
+    }
+
+
+def _parse(operation):
+    if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+        raise CartRejected(f'each operation needs "op": one of {", ".join(OPERATIONS)}')
+    try:
+        product_id = int(operation['product_id'])
+        quantity = int(operation.get('quantity', 1 if operation['op'] == 'add' else 0))
+    except (KeyError, TypeError, ValueError):
+        raise CartRejected('each operation needs an integer "product_id" and "quantity"')
+    if quantity < 0 or (operation['op'] == 'add' and quantity == 0):
+        raise CartRejected('quantity must be positive')
+    return operation['op'], product_id, quantity
+
+
+def apply_operations(buyer_id, operations):
+    """Apply ``{"op": "add"|"set"|"remove", "product_id", "quantity"}`` operations
+    in order, in one transaction.
+
+    ``add`` increases the quantity (creating the line if needed), ``set``
+    replaces it (0 removes the line) and ``remove`` drops the line. ``set``
+    and ``remove`` on a line that is not in the cart do nothing, so a late
+    batch can't bring back lines a checkout just emptied. Stock is held as
+    in ``reservations``. All
+    or nothing: an invalid operation raises ``CartRejected`` and a short
+    product raises ``OutOfStock``, with the cart and stock left unchanged.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise CartRejected('"operations" must be a non-empty list')
+    limit = current_app.config['CART_MAX_OPERATIONS']
+    if len(operations) > limit:
+        raise CartRejected(f'at most {limit} operations per request')
+    parsed = [_parse(operation) for operation in operations]
+
+    products = {
+        product.id: product
+        for product in Product.query.filter(Product.id.in_({p for _, p, _ in parsed}))
+    }
+    try:
+        for op, product_id, quantity in parsed:
+            product = products.get(product_id)
+            if product is None:
+                raise CartRejected(f'no product {product_id}', status=404)
+            if product.seller_id == buyer_id:
+                raise CartRejected("You can't buy your own product.", status=403)
+            item = CartItem.query.filter_by(user_id=buyer_id, product_id=product_id).first()
+            if item is None and op != 'add':
+                continue
+            if op == 'remove' or (op == 'set' and quantity == 0):
+                release_stock(item)
+                continue
+            if item is None:
+                item = cart_item(buyer_id, product)
+            if op == 'add':
+                hold_stock(item, delta=quantity)
+            else:
+                hold_stock(item, quantity=quantity)
+        db.session.commit()
+    except LookupError:
+        db.session.rollback()
+        raise CartRejected('A cart line was removed meanwhile; reload the cart.', status=409)
+    except Exception:
+        db.session.rollback()
+        raise
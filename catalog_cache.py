@@ -0,0 +1,196 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from models import Product, User
+from pagination import clear_count_cache
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            value, expires = hit
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SharedCache:
+    """Cache shared between workers, backed by a Redis-style client.
+
+    Any client with ``get``/``set(ex=)``/``delete`` works, so tests can pass
+    an in-memory stand-in instead of a real server.
+    """
+
+    def __init__(self, client, ttl=300, prefix='agrimarket:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+def init_cache(app, client=None):
+    ttl = app.config['CATALOG_CACHE_TTL']
+    url = app.config.get('CATALOG_CACHE_URL')
+    if client is None and url:
+        import redis  # optional dependency, only needed for a shared cache
+        client = redis.Redis.from_url(url)
+    if client is not None:
+        backend = SharedCache(client, ttl=ttl)
+    else:
+        backend = LRUCache(app.config['CATALOG_CACHE_MAX_ENTRIES'], ttl=ttl)
+    app.extensions['catalog_cache'] = backend
+    return backend
+
+
+def require_shared_cache(app):
+    """Refuse to serve pages from several workers with per-process caches.
+
+    Invalidation can't reach other processes' LRUs; see config.py. Only
+    web processes call this: the release step, the jobs worker and the
+    sweeper see the same WEB_CONCURRENCY on some hosts but serve nothing.
+    """
+    if isinstance(app.extensions['catalog_cache'], LRUCache) \
+            and int(os.environ.get('WEB_CONCURRENCY', 1)) > 1:
+        raise RuntimeError(
+            'WEB_CONCURRENCY > 1 needs CATALOG_CACHE_URL: with a per-process '
+            'cache, workers would keep serving stale listings and stock'
+        )
+
+
+def get_cache():
+    return current_app.extensions['catalog_cache']
+
+
+def catalog_version():
+    cache = get_cache()
+    version = cache.get('catalog:version')
+    if version is None:
+        version = {'token': uuid.uuid4().hex, 'modified': datetime.utcnow().replace(microsecond=0)}
+        cache.set('catalog:version', version, ttl=0)
+    return version
+
+
+def invalidate_catalog():
+    """Drop cached catalog reads after products are added, removed or sold."""
+    get_cache().set('catalog:version', {
+        'token': uuid.uuid4().hex,
+        'modified': datetime.utcnow().replace(microsecond=0),
+    }, ttl=0)
+    clear_count_cache()
+
+
+def cached_read(key, loader):
+    """Return ``(payload, etag, last_modified)`` for ``key``, loading on a miss.
+
+    Keys are tied to the catalog version, so a single bump invalidates every
+    cached listing and product page.
+    """
+    cache = get_cache()
+    version = catalog_version()
+    full_key = f'catalog:{version["token"]}:{key}'
+    entry = cache.get(full_key)
+    if entry is None:
+        payload = loader()
+        digest = hashlib.sha1(repr(payload).encode()).hexdigest()
+        entry = (payload, digest, version['modified'])
+        cache.set(full_key, entry)
+    return entry
+
+
+def product_row(product):
+    return {c.key: getattr(product, c.key) for c in Product.__table__.columns}
+
+
+def seller_row(user):
+    return {'id': user.id, 'username': user.username, 'location': user.location}
+
+
+def product_from_row(row):
+    return Product(**row)
+
+
+def seller_from_row(row):
+    return User(**row)
+
+
+def _viewer_tag():
+    if not current_user.is_authenticated:
+        return 'anon'
+    return f'{current_user.id}:{current_user.username}:{current_user.role}'
+
+
+def viewer_etag(digest):
+    return hashlib.sha1(f'{digest}:{_viewer_tag()}'.encode()).hexdigest()
+
+
+def not_modified(etag, last_modified):
+    """Return a 304 response if the client already has this page."""
+    if session.get('_flashes'):
+        return None
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    elif request.if_modified_since:
+        fresh = last_modified <= request.if_modified_since.replace(tzinfo=None)
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return conditional(make_response('', 304), etag, last_modified)
+
+
+def conditional(response, etag, last_modified):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy import event
+
+from models import db, User, Message
+
+
+class MessageBus:
+    """Wakes chat streams in this process when a message is committed.
+
+    Other processes only see new messages on their next database check, so
+    streams still re-check the database every CHAT_STREAM_RECHECK seconds.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._versions = defaultdict(int)
+
+    def version(self, user_id):
+        with self._cond:
+            return self._versions[user_id]
+
+    def publish(self, user_ids):
+        with self._cond:
+            for user_id in user_ids:
+                self._versions[user_id] += 1
+            self._cond.notify_all()
+
+    def wait(self, user_id, seen, timeout):
+        with self._cond:
+            return self._cond.wait_for(lambda: self._versions[user_id] != seen, timeout)
+
+
+bus = MessageBus()
+
+
+def _collect(session, flush_context, instances):
+    users = session.info.setdefault('message_users', set())
+    for obj in session.new:
+        if isinstance(obj, Message):
+            users.update((obj.sender_id, obj.receiver_id))
+
+
+def _publish(session):
+    users = session.info.pop('message_users', None)
+    if users:
+        bus.publish(users)
+
+
+def _discard(session, previous_transaction):
+    session.info.pop('message_users', None)
+
+
+def init_chat(app):
+    """Publish committed messages to ``bus`` and limit open chat streams.
+
+    Each stream holds a gunicorn thread (see the Procfile) for up to
+    CHAT_STREAM_SECONDS, so only CHAT_MAX_STREAMS may be open per process;
+    the page falls back to polling when it gets a 503.
+    """
+    factory = db.session.session_factory
+    if not event.contains(factory, 'before_flush', _collect):
+        event.listen(factory, 'before_flush', _collect)
+        event.listen(factory, 'after_commit', _publish)
+        event.listen(factory, 'after_soft_rollback', _discard)
+    app.extensions['chat_streams'] = threading.BoundedSemaphore(app.config['CHAT_MAX_STREAMS'])
+
+
+def conversation(a, b):
+    return (
+        ((Message.sender_id == a) & (Message.receiver_id == b)) |
+        ((Message.sender_id == b) & (Message.receiver_id == a))
+    )
+
+
+def recent_messages(me, other, limit):
+    rows = (
+        Message.query.filter(conversation(me, other))
+        .order_by(Message.id.desc())
+        .limit(limit)
+        .all()
+    )
+    rows.reverse()
+    return rows
+
+
+def messages_after(me, other, after_id, limit=200):
+    return (
+        Message.query.filter(conversation(me, other), Message.id > after_id)
+        .order_by(Message.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def stream_messages(me, other, after_id, duration, recheck):
+    """Yield each batch of new messages, as ``message_json`` dicts, as soon
+    as it is committed.
+
+    Yields ``[]`` when ``recheck`` seconds pass without news, so the caller
+    can send a keep-alive, and stops after ``duration`` seconds. The
+    database connection goes back to the pool while waiting.
+    """
+    deadline = time.monotonic() + duration
+    while True:
+        seen = bus.version(me)
+        rows = messages_after(me, other, after_id)
+        if rows:
+            after_id = rows[-1].id
+            payload = [message_json(m) for m in rows]
+            if any(m.receiver_id == me and m.read_at is None for m in rows):
+                mark_read(me, other)
+            yield payload
+        db.session.close()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not bus.wait(me, seen, min(remaining, recheck)) and not rows:
+            yield []
+
+
+def mark_read(me, other):
+    db.session.execute(
+        sa.update(Message)
+        .where(Message.sender_id == other, Message.receiver_id == me,
+               Message.read_at.is_(None))
+        .values(read_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def message_json(m):
+    return {
+        'id': m.id,
+        'sender_id': m.sender_id,
+        'receiver_id': m.receiver_id,
+        'content': m.content,
+        'timestamp': m.timestamp.isoformat() if m.timestamp else None,
+        'display_time': m.timestamp.strftime('%b %d, %I:%M %p') if m.timestamp else '',
+    }
+
+
+def inbox(me):
+    """One row per conversation partner: last message and unread count."""
+    other = sa.case((Message.sender_id == me, Message.receiver_id), else_=Message.sender_id)
+    unread = sa.func.sum(sa.case(
+        ((Message.receiver_id == me) & Message.read_at.is_(None), 1), else_=0
+    ))
+    threads = (
+        sa.select(
+            other.label('other_id'),
+            sa.func.max(Message.id).label('last_id'),
+            unread.label('unread'),
+        )
+        .where((Message.sender_id == me) | (Message.receiver_id == me))
+        .group_by(other)
+        .subquery()
+    )
+    rows = db.session.execute(
+        sa.select(User.id, User.username, Message, threads.c.unread)
+        .join(threads, threads.c.other_id == User.id)
+        .join(Message, Message.id == threads.c.last_id)
+        .order_by(threads.c.last_id.desc())
+    ).all()
+    return [
+        {
+            'user_id': user_id,
+            'username': username,
+            'unread': int(unread or 0),
+            'last_message': message_json(message),
+        }
+        for user_id, username, message, unread in rows
+    ]
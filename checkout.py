@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.orm import joinedload
+
+from analytics import record_orders
+from models import db, Order, CartItem
+from notifications import notify_order_placed
+from reservations import take_hold, take_stock
+
+
+def place_order(buyer_id, delivery_address=None):
+    """Turn the buyer's cart into orders in a single transaction.
+
+    Items whose stock is still held (see ``reservations``) are converted as
+    they are. Items without a hold, e.g. one the sweeper released, take their
+    stock with a conditional UPDATE, so two buyers racing for the last units
+    can never both succeed; if any line is short the whole cart is rolled
+    back and ``OutOfStock`` is raised. Buyer and seller emails and the sales
+    rollups are written in the same transaction. Returns the cart items that
+    were ordered (empty if the cart was empty).
+    """
+    items = (
+        CartItem.query.options(joinedload(CartItem.product))
+        .filter_by(user_id=buyer_id)
+        .order_by(CartItem.product_id)  # consistent lock order across buyers
+        .all()
+    )
+    if not items:
+        return []
+
+    now = datetime.utcnow()
+    try:
+        lines = []
+        for item in items:
+            held, quantity = take_hold(item.id)
+            if quantity is None:
+                continue  # removed by a concurrent request
+            if not held:
+                take_stock(item.product_id, quantity, item.product.name)
+            lines.append((item, quantity, item.product.price * quantity))
+        if not lines:
+            db.session.rollback()
+            return []
+
+        db.session.execute(Order.__table__.insert(), [
+            {
+                'buyer_id': buyer_id,
+                'product_id': item.product_id,
+                'quantity': quantity,
+                'total_price': total,
+                'status': 'Pending',
+                'delivery_address': delivery_address,
+                'created_at': now,
+                'updated_at': now,
+            }
+            for item, quantity, total in lines
+        ])
+        record_orders([
+            (item.product_id, item.product.seller_id, quantity, total)
+            for item, quantity, total in lines
+        ], now)
+        notify_order_placed(buyer_id, [
+            (item.product_id, quantity, total) for item, quantity, total in lines
+        ])
+        db.session.execute(
+            sa.delete(CartItem)
+            .where(CartItem.id.in_([item.id for item, _, _ in lines]))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return [item for item, _, _ in lines]
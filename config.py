@@ -6,3 +6,77 @@ class Config:
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(BASE_DIR, 'agrimarket.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv("SECRET_KEY", "fallbacksecret")
+    # Engine tuning. DB_PROFILE picks one of DB_PROFILES; by default the
+    # database URL's scheme does ("sqlite" or "postgresql"). create_app()
+    # reads DB_PROFILE and DATABASE_REPLICA_URL from the environment.
+    DB_PROFILE = None
+    DB_PROFILES = {
+        'sqlite': {
+            # WAL lets readers run alongside the single writer; busy_timeout
+            # makes a second writer wait for the lock instead of failing.
+            'pragmas': {'journal_mode': 'WAL', 'busy_timeout': 15000, 'synchronous': 'NORMAL'},
+            'engine': {'connect_args': {'timeout': 15}},
+        },
+        'sqlite-durable': {
+            'pragmas': {'journal_mode': 'WAL', 'busy_timeout': 15000, 'synchronous': 'FULL'},
+            'engine': {'connect_args': {'timeout': 15}},
+        },
+        'sqlite-default': {},  # driver defaults: rollback journal, 5 s timeout
+        'postgresql': {
+            'engine': {
+                'pool_size': int(os.getenv("DB_POOL_SIZE", 10)),
+                'max_overflow': int(os.getenv("DB_MAX_OVERFLOW", 20)),
+                'pool_recycle': 1800,
+                'pool_pre_ping': True,
+                'pool_timeout': 10,
+            },
+        },
+    }
+    DATABASE_REPLICA_URL = None  # reads of @read_replica views go here when set
+    PAGE_SIZE = int(os.getenv("PAGE_SIZE", 24))
+    COUNT_CACHE_TTL = int(os.getenv("COUNT_CACHE_TTL", 60))
+    CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", 300))
+    CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", 1024))
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 120))
+    USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000))
+    # e.g. redis://localhost:6379/0. Without it every process keeps its own
+    # catalog and user cache, and invalidate_catalog() only clears the
+    # process that made the change: other web workers, and anything the
+    # sweeper or jobs worker changes, stay stale for up to CATALOG_CACHE_TTL.
+    # That is only right with one web worker, so create_web_app() refuses
+    # to start with WEB_CONCURRENCY > 1 unless this is set.
+    CATALOG_CACHE_URL = os.getenv("CATALOG_CACHE_URL")
+    IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+    JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", 50))
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+    JOB_MAX_ATTEMPTS = 5
+    JOB_RETRY_BASE = 30     # seconds, doubled on every failed attempt
+    JOB_RETRY_MAX = 3600
+    JOB_LEASE_SECONDS = 300  # a running job older than this is picked up again
+    CHAT_PAGE_SIZE = 50
+    CHAT_POLL_INTERVAL = 3  # seconds between polls when the page can't stream
+    # The chat page streams new messages over server-sent events. A stream
+    # holds one gunicorn thread, so keep CHAT_MAX_STREAMS below --threads in
+    # the Procfile; past it, pages fall back to polling.
+    CHAT_MAX_STREAMS = int(os.getenv("CHAT_MAX_STREAMS", 12))
+    CHAT_STREAM_SECONDS = 55  # then the browser reconnects
+    CHAT_STREAM_RECHECK = 2  # seconds; how late a message sent via another process can be
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+    IMPORT_MAX_ERRORS = 1000  # per-row errors kept in the report
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))  # rows fetched per round trip
+    ORDER_STATUS_BATCH_MAX = 1000  # orders per bulk status change
+    RESERVATION_TTL = int(os.getenv("RESERVATION_TTL", 900))  # seconds a cart holds its stock
+    RESERVATION_SWEEP_BATCH = 500
+    RESERVATION_SWEEP_INTERVAL = 30
+    CART_MAX_OPERATIONS = 100  # per /api/cart request
+    SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", 500))
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # /metrics needs "Authorization: Bearer <token>"
+    # Where each worker writes its metrics so /metrics can add them up; needed
+    # with more than one worker, or every scrape sees a different process.
+    METRICS_DIR = os.getenv("METRICS_DIR")
+    PROFILER_TOKEN = os.getenv("PROFILER_TOKEN")  # enables /debug/profile when set
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, 'profiles'))
+    PROFILE_INTERVAL = 0.005
+    PRECOMPILE_TEMPLATES = os.getenv("PRECOMPILE_TEMPLATES", "1") == "1"
+    # Compiled templates shared by workers and restarts; empty disables.
+    TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", os.path.join(BASE_DIR, 'instance', 'template-cache'))
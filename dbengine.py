@@ -0,0 +1,92 @@
+import os
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+
+class RoutingSession(Session):
+    """Sends reads of ``read_replica`` views to the replica engine.
+
+    Writes, flushes and every other view keep using the primary. A view
+    opts in only when slightly stale data is acceptable there.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and has_request_context()
+            and g.get('read_replica')
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+        ):
+            replica = self._db.engines.get('replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(view):
+    """Mark a read-only view whose queries may go to DATABASE_REPLICA_URL."""
+    view.read_replica = True
+    return view
+
+
+def engine_profile(app):
+    """Return ``(name, profile)``; DB_PROFILE wins, else the URL scheme decides.
+
+    A backend without a profile (e.g. ``mysql+pymysql://``) gets an empty
+    one, i.e. SQLAlchemy's defaults; only an explicit unknown DB_PROFILE is
+    an error.
+    """
+    profiles = app.config['DB_PROFILES']
+    name = app.config.get('DB_PROFILE')
+    if name:
+        if name not in profiles:
+            raise RuntimeError(f'unknown DB_PROFILE {name!r}, expected one of {", ".join(profiles)}')
+        return name, profiles[name]
+    scheme = app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0].split('+', 1)[0]
+    name = 'postgresql' if scheme in ('postgres', 'postgresql') else scheme
+    return name, profiles.get(name, {})
+
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for key, value in pragmas.items():
+            cursor.execute(f'PRAGMA {key} = {value}')
+        cursor.close()
+    return on_connect
+
+
+def init_database(app, db):
+    """Apply the engine profile, then initialise Flask-SQLAlchemy."""
+    name, profile = engine_profile(app)
+    options = dict(profile.get('engine', {}))
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    replica_url = app.config.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        # Bind options don't inherit SQLALCHEMY_ENGINE_OPTIONS.
+        app.config.setdefault('SQLALCHEMY_BINDS', {})['replica'] = dict(options, url=replica_url)
+    app.config['DB_PROFILE'] = name
+    db.init_app(app)
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    pragmas = profile.get('pragmas')
+    if pragmas:
+        for engine in engines:
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _apply_pragmas(pragmas))
+
+    # Workers forked from a ``gunicorn --preload`` master must not share its
+    # pooled connections: drop them in the child without closing the parent's.
+    os.register_at_fork(after_in_child=lambda: [engine.dispose(close=False) for engine in engines])
+
+    if replica_url:
+        @app.before_request
+        def route_reads_to_replica():
+            view = current_app.view_functions.get(request.endpoint)
+            g.read_replica = getattr(view, 'read_replica', False)
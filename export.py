@@ -0,0 +1,155 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+from flask import Response, abort, current_app, request, stream_with_context
+from sqlalchemy.orm import aliased
+
+from models import db, User, Product, Order
+
+FORMATS = {'csv': 'text/csv', 'json': 'application/json'}
+STATUSES = ('Pending', 'Approved', 'Shipped', 'Completed')
+CHUNK_SIZE = 64 * 1024  # bytes buffered before a chunk is sent
+
+_buyer = aliased(User)
+_seller = aliased(User)
+
+SELLER_COLUMNS = (
+    ('order_id', Order.id), ('created_at', Order.created_at), ('status', Order.status),
+    ('product_id', Product.id), ('sku', Product.sku), ('product', Product.name),
+    ('quantity', Order.quantity), ('total_price', Order.total_price),
+    ('buyer', _buyer.username), ('delivery_address', Order.delivery_address),
+)
+BUYER_COLUMNS = (
+    ('order_id', Order.id), ('created_at', Order.created_at), ('status', Order.status),
+    ('product_id', Product.id), ('product', Product.name), ('seller', _seller.username),
+    ('quantity', Order.quantity), ('total_price', Order.total_price),
+    ('delivery_address', Order.delivery_address),
+)
+
+
+def seller_orders_query(seller_id):
+    return (
+        sa.select(*(column for _, column in SELLER_COLUMNS))
+        .select_from(Order)
+        .join(Product, Product.id == Order.product_id)
+        .join(_buyer, _buyer.id == Order.buyer_id)
+        .where(Product.seller_id == seller_id)
+    )
+
+
+def buyer_orders_query(buyer_id):
+    return (
+        sa.select(*(column for _, column in BUYER_COLUMNS))
+        .select_from(Order)
+        .join(Product, Product.id == Order.product_id)
+        .join(_seller, _seller.id == Product.seller_id)
+        .where(Order.buyer_id == buyer_id)
+    )
+
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        abort(400, f'{name} must be a date like 2025-01-31')
+
+
+def filtered(stmt):
+    """Apply the ``from``/``to`` (inclusive dates) and ``status`` query args."""
+    start, end = _date_arg('from'), _date_arg('to')
+    if start:
+        stmt = stmt.where(Order.created_at >= start)
+    if end:
+        stmt = stmt.where(Order.created_at < end + timedelta(days=1))
+    statuses = [s for s in request.args.getlist('status') if s]
+    if statuses:
+        if not set(statuses) <= set(STATUSES):
+            abort(400, 'unknown status')
+        stmt = stmt.where(Order.status.in_(statuses))
+    return stmt.order_by(Order.created_at, Order.id)
+
+
+def _rows(stmt, batch_size):
+    # yield_per streams from a server-side cursor on PostgreSQL; without it
+    # the ORM buffers the whole result before handing out the first row.
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield from partition
+
+
+def _drain(buffer):
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def _csv_chunks(names, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    # The header goes out before the query runs, so the download starts at once.
+    yield _drain(buffer)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield _drain(buffer)
+    yield _drain(buffer)
+
+
+def _json_chunks(names, rows):
+    yield '['
+    parts, size, first = [], 0, True
+    for row in rows:
+        record = json.dumps(dict(zip(names, row)), default=str)
+        parts.append(record if first else ',' + record)
+        size += len(record) + 1
+        first = False
+        if size >= CHUNK_SIZE:
+            yield ''.join(parts)
+            parts, size = [], 0
+    parts.append(']')
+    yield ''.join(parts)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+    first = True
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if first:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(stmt, columns, name):
+    """Stream ``stmt`` as a CSV or JSON download, gzipped if the client accepts it."""
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        abort(400, 'format must be csv or json')
+    names = [label for label, _ in columns]
+    rows = _rows(filtered(stmt), batch_size)
+    chunks = (_csv_chunks if fmt == 'csv' else _json_chunks)(names, rows)
+
+    headers = {
+        'Content-Disposition': f'attachment; filename="{name}.{fmt}"',
+        'Vary': 'Accept-Encoding',
+        'X-Accel-Buffering': 'no',  # let nginx pass chunks straight through
+    }
+    if 'gzip' in request.accept_encodings:
+        headers['Content-Encoding'] = 'gzip'
+        body = _gzipped(chunks)
+    else:
+        body = (chunk.encode() for chunk in chunks)
+    return Response(stream_with_context(body), mimetype=FORMATS[fmt], headers=headers)
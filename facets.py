@@ -0,0 +1,282 @@
+import sqlalchemy as sa
+from flask import request, url_for
+
+from models import db, Product, ProductFacet
+
+CATEGORIES = {
+    'vegetables': 'Vegetables',
+    'fruits': 'Fruits',
+    'grains': 'Rice, Corn & Grains',
+    'root-crops': 'Root Crops',
+    'herbs-spices': 'Herbs & Spices',
+    'livestock': 'Livestock & Poultry',
+    'fishery': 'Fish & Seafood',
+    'other': 'Other',
+}
+DEFAULT_CATEGORY = 'other'
+# Lower edges of the price buckets; the last one is open-ended. Changing them
+# needs `flask rebuild-facet-counts`, which also recreates the triggers.
+PRICE_BUCKETS = (0, 25, 50, 100, 250, 500, 1000)
+DIMENSIONS = ('category', 'region', 'price')
+
+
+def normalize_region(location):
+    """A seller's location as stored on their products (the migration does the same)."""
+    return (location or '').strip() or None
+
+
+def price_label(lower):
+    i = PRICE_BUCKETS.index(lower)
+    if i + 1 == len(PRICE_BUCKETS):
+        return f'₱{lower}+'
+    return f'₱{lower}–{PRICE_BUCKETS[i + 1]}'
+
+
+# -- maintenance ----------------------------------------------------------------
+
+def _bucket_sql(price):
+    cases = ' '.join(f'WHEN {price} >= {lower} THEN {lower}' for lower in reversed(PRICE_BUCKETS[1:]))
+    return f'CASE {cases} ELSE 0 END'
+
+
+def _key_sql(row):
+    return (f"coalesce({row}.category, '{DEFAULT_CATEGORY}'), coalesce({row}.region, ''), "
+            f"{_bucket_sql(row + '.price')}")
+
+
+def _in_stock_sql(row):
+    return f'coalesce({row}.quantity, 0) > 0'
+
+
+def _moved_sql():
+    return (f'old.category IS NOT new.category OR old.region IS NOT new.region '
+            f'OR {_bucket_sql("old.price")} != {_bucket_sql("new.price")}')
+
+
+def _increment_sql(row):
+    return f"""
+        INSERT INTO product_facets (category, region, price_from, products)
+        VALUES ({_key_sql(row)}, 1)
+        ON CONFLICT (category, region, price_from)
+        DO UPDATE SET products = product_facets.products + 1;
+    """
+
+
+def _decrement_sql(row):
+    return f"""
+        UPDATE product_facets SET products = products - 1
+        WHERE (category, region, price_from) = ({_key_sql(row)});
+    """
+
+
+def _sqlite_ddl():
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS products_facets_ai AFTER INSERT ON products
+        WHEN {_in_stock_sql('new')} BEGIN {_increment_sql('new')} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS products_facets_ad AFTER DELETE ON products
+        WHEN {_in_stock_sql('old')} BEGIN {_decrement_sql('old')} END
+        """,
+        # Updates only touch the counts when a product goes in or out of
+        # stock or changes bucket; 5 -> 3 units costs nothing.
+        f"""
+        CREATE TRIGGER IF NOT EXISTS products_facets_au_old
+        AFTER UPDATE OF quantity, price, category, region ON products
+        WHEN {_in_stock_sql('old')} AND (NOT {_in_stock_sql('new')} OR {_moved_sql()})
+        BEGIN {_decrement_sql('old')} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS products_facets_au_new
+        AFTER UPDATE OF quantity, price, category, region ON products
+        WHEN {_in_stock_sql('new')} AND (NOT {_in_stock_sql('old')} OR {_moved_sql()})
+        BEGIN {_increment_sql('new')} END
+        """,
+    ]
+
+
+SQLITE_TRIGGERS = ('products_facets_ai', 'products_facets_ad',
+                   'products_facets_au_old', 'products_facets_au_new')
+
+
+def _pg_ddl():
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION products_facets() RETURNS trigger AS $$
+        DECLARE
+            old_in boolean := false;
+            new_in boolean := false;
+            moved boolean := true;
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN old_in := {_in_stock_sql('OLD')}; END IF;
+            IF TG_OP <> 'DELETE' THEN new_in := {_in_stock_sql('NEW')}; END IF;
+            IF TG_OP = 'UPDATE' THEN
+                moved := OLD.category IS DISTINCT FROM NEW.category
+                    OR OLD.region IS DISTINCT FROM NEW.region
+                    OR {_bucket_sql('OLD.price')} <> {_bucket_sql('NEW.price')};
+            END IF;
+            IF old_in AND (moved OR NOT new_in) THEN {_decrement_sql('OLD')} END IF;
+            IF new_in AND (moved OR NOT old_in) THEN {_increment_sql('NEW')} END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS products_facets ON products",
+        """
+        CREATE TRIGGER products_facets
+        AFTER INSERT OR DELETE OR UPDATE OF quantity, price, category, region ON products
+        FOR EACH ROW EXECUTE FUNCTION products_facets()
+        """,
+    ]
+
+
+def _has_triggers(conn):
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        found = conn.execute(sa.text(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'products_facets_%'"
+        )).scalar()
+        return found == len(SQLITE_TRIGGERS)
+    if dialect == 'postgresql':
+        return conn.execute(sa.text(
+            "SELECT 1 FROM pg_trigger WHERE tgname = 'products_facets'"
+        )).first() is not None
+    return True
+
+
+def _create_triggers(conn):
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        for name in SQLITE_TRIGGERS:
+            conn.execute(sa.text(f'DROP TRIGGER IF EXISTS {name}'))
+        for ddl in _sqlite_ddl():
+            conn.execute(sa.text(ddl))
+    elif dialect == 'postgresql':
+        for ddl in _pg_ddl():
+            conn.execute(sa.text(ddl))
+
+
+def _count_from_products(conn):
+    bucket = sa.case(
+        *[(Product.price >= lower, lower) for lower in reversed(PRICE_BUCKETS[1:])], else_=0
+    )
+    category = sa.func.coalesce(Product.category, DEFAULT_CATEGORY)
+    region = sa.func.coalesce(Product.region, '')
+    conn.execute(ProductFacet.__table__.delete())
+    conn.execute(ProductFacet.__table__.insert().from_select(
+        ['category', 'region', 'price_from', 'products'],
+        sa.select(category, region, bucket, sa.func.count())
+        .where(sa.func.coalesce(Product.quantity, 0) > 0)
+        .group_by(category, region, bucket),
+    ))
+
+
+def ensure_facet_counts():
+    """Install the triggers; count from scratch if they were missing."""
+    with db.engine.begin() as conn:
+        if not _has_triggers(conn):
+            _create_triggers(conn)
+            _count_from_products(conn)
+
+
+def rebuild_facet_counts():
+    """Recreate the triggers (e.g. after changing PRICE_BUCKETS) and recount."""
+    with db.engine.begin() as conn:
+        _create_triggers(conn)
+        _count_from_products(conn)
+
+
+# -- filtering and counting -------------------------------------------------------
+
+def selected_facets(args):
+    """The facet filters in the query string, as ``{dimension: set}``; unknown values are dropped."""
+    prices = set()
+    for value in args.getlist('price'):
+        try:
+            prices.add(int(value))
+        except ValueError:
+            continue
+    return {
+        'category': {c for c in args.getlist('category') if c in CATEGORIES},
+        'region': {r for r in args.getlist('region') if r},
+        'price': prices & set(PRICE_BUCKETS),
+    }
+
+
+def facet_cache_key(selected):
+    return ':'.join(','.join(sorted(map(str, selected[d]))) for d in DIMENSIONS)
+
+
+def filter_products(query, selected):
+    """Values within a dimension are OR'ed, dimensions are AND'ed."""
+    if selected['category']:
+        query = query.filter(Product.category.in_(sorted(selected['category'])))
+    if selected['region']:
+        query = query.filter(Product.region.in_(sorted(selected['region'])))
+    if selected['price']:
+        ranges = []
+        for lower in sorted(selected['price']):
+            i = PRICE_BUCKETS.index(lower)
+            bounds = [Product.price >= lower] if lower else []
+            if i + 1 < len(PRICE_BUCKETS):
+                bounds.append(Product.price < PRICE_BUCKETS[i + 1])
+            ranges.append(sa.and_(*bounds) if bounds else sa.true())
+        query = query.filter(sa.or_(*ranges))
+    return query
+
+
+def facet_counts(selected):
+    """Counts for every facet value, plus the number of matching products.
+
+    Read from the small product_facets table, never from products. Each
+    dimension is counted with the other dimensions' filters applied but not
+    its own, so picking a category still shows the other categories.
+    Returns ``(facets, total)``, where ``facets`` maps a dimension to
+    ``[{'value', 'label', 'count', 'selected'}]``.
+    """
+    rows = db.session.execute(
+        sa.select(ProductFacet.category, ProductFacet.region, ProductFacet.price_from,
+                  ProductFacet.products)
+        .where(ProductFacet.products > 0)
+    ).all()
+
+    def matches(row, skip=None):
+        values = {'category': row.category, 'region': row.region, 'price': row.price_from}
+        return all(not selected[d] or values[d] in selected[d] for d in DIMENSIONS if d != skip)
+
+    counts = {d: {} for d in DIMENSIONS}
+    total = 0
+    for row in rows:
+        values = {'category': row.category, 'region': row.region, 'price': row.price_from}
+        for d in DIMENSIONS:
+            if matches(row, skip=d):
+                counts[d][values[d]] = counts[d].get(values[d], 0) + row.products
+        if matches(row):
+            total += row.products
+
+    def entry(d, value, label):
+        return {'value': value, 'label': label, 'count': counts[d].get(value, 0),
+                'selected': value in selected[d]}
+
+    facets = {
+        'category': [entry('category', c, label) for c, label in CATEGORIES.items()
+                     if counts['category'].get(c) or c in selected['category']],
+        'region': sorted(
+            (entry('region', r, r) for r in set(counts['region']) | selected['region'] if r),
+            key=lambda e: (-e['count'], e['label']),
+        ),
+        'price': [entry('price', p, price_label(p)) for p in PRICE_BUCKETS
+                  if counts['price'].get(p) or p in selected['price']],
+    }
+    return facets, total
+
+
+def facet_url(dimension, value):
+    """The current page's URL with one facet value toggled, back on page one."""
+    args = request.args.to_dict(flat=False)
+    args.pop('cursor', None)
+    values = args.get(dimension, [])
+    value = str(value)
+    args[dimension] = [v for v in values if v != value] if value in values else values + [value]
+    return url_for(request.endpoint, **args)
@@ -4,7 +4,8 @@ from wtforms import (
     TextAreaField, DecimalField, FileField, SelectField
 )
 from wtforms.validators import DataRequired, Length, Email, NumberRange, EqualTo
-from flask_wtf.file import FileAllowed
+from flask_wtf.file import FileAllowed, FileRequired
+from facets import CATEGORIES, DEFAULT_CATEGORY
 
 class LoginForm(FlaskForm):
     email = StringField('Email', validators=[DataRequired(), Email()])
@@ -24,9 +25,16 @@ class ProductForm(FlaskForm):
     description = TextAreaField('Description', validators=[DataRequired()])
     price = DecimalField('Price', validators=[DataRequired(), NumberRange(min=0)])
     quantity = IntegerField('Quantity', validators=[DataRequired(), NumberRange(min=0)])
+    category = SelectField('Category', choices=list(CATEGORIES.items()), default=DEFAULT_CATEGORY)
     image = FileField('Product Image', validators=[FileAllowed(['jpg', 'png', 'jpeg', 'gif'], 'Images only!')])
     submit = SubmitField('Add Product')
 
+class ProductImportForm(FlaskForm):
+    file = FileField('CSV or JSON-lines file', validators=[
+        FileRequired(), FileAllowed(['csv', 'jsonl', 'ndjson', 'json'], 'CSV or JSON-lines only!')
+    ])
+    submit = SubmitField('Import')
+
 class OrderForm(FlaskForm):
     quantity = IntegerField('Quantity', validators=[DataRequired(), NumberRange(min=1)])
     submit = SubmitField('Buy')
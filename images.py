@@ -0,0 +1,100 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+# name: (width, height, crop). Cropped variants fill the box exactly, the
+# others are only shrunk to fit inside it.
+VARIANTS = {
+    'card': (440, 300, True),
+    'page': (800, 800, False),
+    'avatar': (128, 128, True),
+    'background': (1600, 600, True),
+}
+
+PRODUCT_VARIANTS = ('card', 'page')
+
+MEDIA_URL = '/media/'
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=current_app.config['IMAGE_WORKERS'],
+            thread_name_prefix='images',
+        )
+    return _executor
+
+
+def variant_name(filename, variant):
+    stem = filename.rsplit('.', 1)[0]
+    return f'{stem}_{variant}.jpg'
+
+
+def variant_url(url, variant):
+    """URL of ``variant`` for a stored media URL, or ``url`` until it exists."""
+    if not url or not url.startswith(MEDIA_URL):
+        return url
+    name = variant_name(url[len(MEDIA_URL):], variant)
+    if os.path.exists(os.path.join(current_app.config['UPLOAD_FOLDER'], name)):
+        return MEDIA_URL + name
+    return url
+
+
+def _resize(src_path, folder, filename, variants):
+    from PIL import Image, ImageOps
+
+    with Image.open(src_path) as original:
+        image = ImageOps.exif_transpose(original).convert('RGB')
+    for variant in variants:
+        width, height, crop = VARIANTS[variant]
+        if crop:
+            out = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        else:
+            out = image.copy()
+            out.thumbnail((width, height), Image.LANCZOS)
+        name = variant_name(filename, variant)
+        tmp = os.path.join(folder, f'.{name}.tmp')
+        out.save(tmp, 'JPEG', quality=82, optimize=True, progressive=True)
+        os.replace(tmp, os.path.join(folder, name))
+
+
+def ingest_image(storage, variants):
+    """Store an upload under its content hash and queue its resized variants.
+
+    Returns the media URL of the original; ``variant_url`` switches to a
+    variant once the worker pool has written it.
+    """
+    data = storage.read()
+    ext = storage.filename.rsplit('.', 1)[1].lower()
+    filename = f'{hashlib.sha256(data).hexdigest()[:32]}.{ext}'
+    folder = current_app.config['UPLOAD_FOLDER']
+    path = os.path.join(folder, filename)
+
+    if not os.path.exists(path):
+        tmp = os.path.join(folder, f'.{filename}.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    missing = [
+        v for v in variants
+        if not os.path.exists(os.path.join(folder, variant_name(filename, v)))
+    ]
+    if missing:
+        future = _pool().submit(_resize, path, folder, filename, missing)
+        future.add_done_callback(_log_failure)
+    return MEDIA_URL + filename
+
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error('image variant generation failed: %s', error)
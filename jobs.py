@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+from flask import current_app
+
+from models import db, Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handler(kind):
+    """Register a job handler.
+
+    A handler takes the decoded payload and returns a list of
+    ``flask_mail.Message`` objects to send (possibly empty). Mail from every
+    job in a batch goes out over one SMTP connection.
+    """
+    def decorator(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def enqueue(kind, payload, delay=0, max_attempts=None):
+    """Add a job to the current session; it is committed with the caller's
+    transaction, so it only runs if the surrounding change is committed."""
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload),
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+        max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+    )
+    db.session.add(job)
+    return job
+
+
+def backoff(attempts):
+    base = current_app.config['JOB_RETRY_BASE']
+    return min(base * 2 ** (attempts - 1), current_app.config['JOB_RETRY_MAX'])
+
+
+def claim(worker_id, limit):
+    """Atomically mark up to ``limit`` due jobs as running for this worker."""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config['JOB_LEASE_SECONDS'])
+    due = sa.or_(
+        sa.and_(Job.status == 'queued', Job.run_at <= now),
+        sa.and_(Job.status == 'running', Job.locked_at < stale),
+    )
+    candidates = sa.select(Job.id).where(due).order_by(Job.run_at, Job.id).limit(limit)
+    if db.engine.dialect.name == 'postgresql':
+        candidates = candidates.with_for_update(skip_locked=True)
+
+    token = f'{worker_id}:{uuid.uuid4().hex[:8]}'
+    db.session.execute(
+        sa.update(Job)
+        .where(Job.id.in_(candidates.scalar_subquery()), due)
+        .values(status='running', locked_by=token, locked_at=now,
+                attempts=Job.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return Job.query.filter_by(locked_by=token, status='running').order_by(Job.id).all()
+
+
+def _finish(job):
+    job.status = 'done'
+    job.last_error = None
+
+
+def _fail(job, error):
+    job.last_error = f'{type(error).__name__}: {error}'
+    if job.attempts >= job.max_attempts:
+        job.status = 'failed'
+        logger.error('job %s (%s) failed permanently: %s', job.id, job.kind, job.last_error)
+    else:
+        job.status = 'queued'
+        job.run_at = datetime.utcnow() + timedelta(seconds=backoff(job.attempts))
+
+
+def process(jobs):
+    outgoing = []
+    for job in jobs:
+        fn = HANDLERS.get(job.kind)
+        try:
+            if fn is None:
+                raise LookupError(f'no handler for job kind {job.kind!r}')
+            outgoing.append((job, fn(json.loads(job.payload))))
+        except Exception as e:
+            _fail(job, e)
+
+    if any(messages for _, messages in outgoing):
+        try:
+            with current_app.extensions['mail'].connect() as conn:
+                for job, messages in outgoing:
+                    try:
+                        for message in messages:
+                            conn.send(message)
+                        _finish(job)
+                    except Exception as e:
+                        _fail(job, e)
+        except Exception as e:  # could not connect / log in
+            for job, messages in outgoing:
+                if job.status == 'running':
+                    if messages:
+                        _fail(job, e)
+                    else:
+                        _finish(job)
+    else:
+        for job, _ in outgoing:
+            _finish(job)
+
+    db.session.commit()
+
+
+def run_once(worker_id=None, limit=None):
+    worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+    jobs = claim(worker_id, limit or current_app.config['JOB_BATCH_SIZE'])
+    if jobs:
+        process(jobs)
+    return len(jobs)
+
+
+def work(app, poll_interval=None, stop_when_idle=False):
+    """Process jobs until interrupted (or until the queue is empty)."""
+    poll_interval = poll_interval or app.config['JOB_POLL_INTERVAL']
+    with app.app_context():
+        while True:
+            try:
+                done = run_once()
+            finally:
+                db.session.remove()
+            if not done:
+                if stop_when_idle:
+                    return
+                time.sleep(poll_interval)
+
+
+def _worker_process(poll_interval):
+    from app import create_app  # imported here: app imports this module
+    work(create_app(), poll_interval)
+
+
+def start_workers(app, processes, poll_interval=None):
+    if processes <= 1:
+        work(app, poll_interval)
+        return
+    import multiprocessing
+    ctx = multiprocessing.get_context('spawn')
+    workers = [
+        ctx.Process(target=_worker_process, args=(poll_interval,), daemon=True)
+        for _ in range(processes)
+    ]
+    for p in workers:
+        p.start()
+    try:
+        for p in workers:
+            p.join()
+    except KeyboardInterrupt:
+        for p in workers:
+            p.terminate()
@@ -0,0 +1,404 @@
+import glob
+import hmac
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import (
+    Response, abort, current_app, g, has_request_context, request,
+    before_render_template, template_rendered, send_from_directory
+)
+from sqlalchemy import event
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def reset(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        with self._lock:
+            return {k: [list(counts), total, n] for k, (counts, total, n) in self._series.items()}
+
+    @staticmethod
+    def merge(into, other):
+        for label_values, (counts, total, n) in other.items():
+            series = into.setdefault(label_values, [[0] * len(counts), 0.0, 0])
+            series[0] = [a + b for a, b in zip(series[0], counts)]
+            series[1] += total
+            series[2] += n
+
+    def render(self, series):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, total, count) in sorted(series.items()):
+            base = _labels(self.labels, label_values)
+            for bound, n in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{_labels(self.labels, label_values, le=bound)} {n}')
+            lines.append(f'{self.name}_bucket{_labels(self.labels, label_values, le="+Inf")} {count}')
+            lines.append(f'{self.name}_sum{base} {total}')
+            lines.append(f'{self.name}_count{base} {count}')
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values):
+        with self._lock:
+            self._values[label_values] += 1
+
+    def reset(self):
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(into, other):
+        for label_values, value in other.items():
+            into[label_values] = into.get(label_values, 0) + value
+
+    def render(self, values):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(values.items()):
+            lines.append(f'{self.name}{_labels(self.labels, label_values)} {value}')
+        return lines
+
+
+def _labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ''
+    inner = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return '{' + inner + '}'
+
+
+REQUESTS = CounterMetric(
+    'agrimarket_requests_total', 'Requests handled.', ('endpoint', 'method', 'status'))
+REQUEST_TIME = Histogram(
+    'agrimarket_request_duration_seconds', 'Wall time per request.',
+    ('endpoint', 'method'), TIME_BUCKETS)
+SQL_COUNT = Histogram(
+    'agrimarket_request_sql_statements', 'SQL statements per request.',
+    ('endpoint',), COUNT_BUCKETS)
+SQL_TIME = Histogram(
+    'agrimarket_request_sql_duration_seconds', 'Time spent in SQL per request.',
+    ('endpoint',), TIME_BUCKETS)
+TEMPLATE_TIME = Histogram(
+    'agrimarket_request_template_seconds', 'Template render time per request.',
+    ('endpoint',), TIME_BUCKETS)
+
+ALL_METRICS = (REQUESTS, REQUEST_TIME, SQL_COUNT, SQL_TIME, TEMPLATE_TIME)
+
+
+def _snapshot():
+    return {metric.name: metric.snapshot() for metric in ALL_METRICS}
+
+
+# -- several worker processes -------------------------------------------------
+# Each process only sees its own requests. With METRICS_DIR set, every
+# process writes its series to a file there (at most once a second), and a
+# scrape adds up all the files, so any worker answers for all of them. Files
+# of workers that have exited keep counting, as counters must; empty the
+# directory when deploying.
+
+_process_file = None
+_last_write = 0.0
+_write_lock = threading.Lock()
+
+
+def _write_snapshot(directory, force=False):
+    global _process_file, _last_write
+    now = time.monotonic()
+    if not force and now - _last_write < 1:
+        return
+    with _write_lock:
+        _last_write = now
+        if _process_file is None:
+            _process_file = f'{os.getpid()}-{uuid.uuid4().hex}.pickle'
+        path = os.path.join(directory, _process_file)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(_snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+
+def _after_fork():
+    # A forked worker starts from zero; the parent's series are its own file.
+    global _process_file, _write_lock
+    _process_file = None
+    _write_lock = threading.Lock()
+    for metric in ALL_METRICS:
+        metric.reset()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _merged_snapshot(directory):
+    merged = {metric.name: {} for metric in ALL_METRICS}
+    for path in glob.glob(os.path.join(directory, '*.pickle')):
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            continue
+        for metric in ALL_METRICS:
+            metric.merge(merged[metric.name], data.get(metric.name, {}))
+    return merged
+
+
+def render_metrics(directory=None):
+    if directory:
+        _write_snapshot(directory, force=True)
+        series = _merged_snapshot(directory)
+    else:
+        series = _snapshot()
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render(series[metric.name]))
+    return '\n'.join(lines) + '\n'
+
+
+# -- request and SQL timing -------------------------------------------------
+
+def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+
+def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_start')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if has_request_context() and 'metrics' in g:
+        stats = g.metrics
+        stats['sql_count'] += 1
+        stats['sql_time'] += elapsed
+        if len(stats['statements']) < 200:
+            stats['statements'].append((elapsed, statement))
+
+
+def _template_started(sender, template, context, **extra):
+    if 'metrics' in g:
+        g.metrics['template_started'] = time.perf_counter()
+
+
+def _template_finished(sender, template, context, **extra):
+    if 'metrics' in g and g.metrics.get('template_started'):
+        g.metrics['template_time'] += time.perf_counter() - g.metrics.pop('template_started')
+
+
+def init_metrics(app):
+    directory = app.config['METRICS_DIR']
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with app.app_context():
+        if not event.contains(db.engine, 'before_cursor_execute', _before_cursor):
+            event.listen(db.engine, 'before_cursor_execute', _before_cursor)
+            event.listen(db.engine, 'after_cursor_execute', _after_cursor)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics = {
+            'start': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0,
+            'template_time': 0.0, 'statements': [],
+        }
+        profiler.start_if_requested()
+
+    @app.teardown_request
+    def record_request_metrics(exc):
+        stats = g.pop('metrics', None)
+        if stats is None:
+            return
+        profiler.stop_if_running()
+        endpoint = request.endpoint or 'unknown'
+        elapsed = time.perf_counter() - stats['start']
+        status = getattr(g, 'response_status', 500 if exc else 200)
+
+        REQUESTS.inc(endpoint, request.method, status)
+        REQUEST_TIME.observe(elapsed, endpoint, request.method)
+        SQL_COUNT.observe(stats['sql_count'], endpoint)
+        SQL_TIME.observe(stats['sql_time'], endpoint)
+        TEMPLATE_TIME.observe(stats['template_time'], endpoint)
+        if directory:
+            _write_snapshot(directory)
+
+        if elapsed * 1000 >= app.config['SLOW_REQUEST_MS']:
+            logger.warning(
+                'slow request %s %s (%s): %.0f ms, %d SQL statements in %.0f ms, '
+                'templates %.0f ms\n%s',
+                request.method, request.path, endpoint, elapsed * 1000,
+                stats['sql_count'], stats['sql_time'] * 1000, stats['template_time'] * 1000,
+                '\n'.join(f'  [{t * 1000:.1f} ms] {sql}' for t, sql in stats['statements']),
+            )
+
+    @app.after_request
+    def remember_status(response):
+        g.response_status = response.status_code
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if not token or not _token_matches(request.headers.get('Authorization', ''),
+                                           f'Bearer {token}'):
+            abort(404)
+        return Response(render_metrics(directory), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/debug/profile', methods=['GET', 'POST'])
+    def profile_control():
+        _check_profiler_token()
+        if request.method == 'POST':
+            profiler.arm(
+                request.values['endpoint'],
+                request.values.get('requests', 100, type=int),
+                request.values.get('interval', app.config['PROFILE_INTERVAL'], type=float),
+            )
+        return profiler.status()
+
+    @app.route('/debug/profile/<endpoint>.folded')
+    def profile_download(endpoint):
+        _check_profiler_token()
+        return send_from_directory(
+            app.config['PROFILE_DIR'], f'{endpoint}.folded', mimetype='text/plain'
+        )
+
+
+def _token_matches(given, expected):
+    """Constant-time comparison; bytes, because compare_digest rejects non-ASCII str."""
+    return hmac.compare_digest(given.encode(), expected.encode())
+
+
+def _check_profiler_token():
+    token = current_app.config.get('PROFILER_TOKEN')
+    if not token or not _token_matches(request.headers.get('X-Profiler-Token', ''), token):
+        abort(404)
+
+
+# -- sampling profiler ------------------------------------------------------
+
+class SamplingProfiler:
+    """Samples the stack of requests to one endpoint from a side thread.
+
+    Stacks are accumulated in Brendan Gregg's folded format
+    (``frame;frame;frame count``), which flamegraph.pl and speedscope read
+    directly. Armed at runtime through ``POST /debug/profile``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoint = None
+        self.remaining = 0
+        self.interval = 0.005
+        self.stacks = Counter()
+
+    def arm(self, endpoint, requests, interval):
+        with self._lock:
+            self.endpoint = endpoint
+            self.remaining = requests
+            self.interval = interval
+            self.stacks = Counter()
+
+    def status(self):
+        with self._lock:
+            return {
+                'endpoint': self.endpoint,
+                'remaining_requests': self.remaining,
+                'samples': sum(self.stacks.values()),
+            }
+
+    def start_if_requested(self):
+        with self._lock:
+            if self.remaining <= 0 or request.endpoint != self.endpoint:
+                return
+            self.remaining -= 1
+        stop = threading.Event()
+        samples = Counter()
+        target = threading.get_ident()
+        thread = threading.Thread(
+            target=self._sample, args=(target, stop, samples), daemon=True
+        )
+        g.profiler = (thread, stop, samples)
+        thread.start()
+
+    def stop_if_running(self):
+        running = g.pop('profiler', None)
+        if running is None:
+            return
+        thread, stop, samples = running
+        stop.set()
+        thread.join()
+        with self._lock:
+            self.stacks.update(samples)
+            finished = self.remaining <= 0
+            stacks = Counter(self.stacks)
+            endpoint = self.endpoint
+        self._write(endpoint, stacks)
+        if finished:
+            logger.info('profile of %s complete: %d samples', endpoint, sum(stacks.values()))
+
+    def _sample(self, thread_id, stop, samples):
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                samples[';'.join(reversed(stack))] += 1
+
+    def _write(self, endpoint, stacks):
+        folder = current_app.config['PROFILE_DIR']
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'{endpoint}.folded')
+        with open(path + '.tmp', 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        os.replace(path + '.tmp', path)
+
+
+profiler = SamplingProfiler()
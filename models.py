@@ -2,8 +2,10 @@ from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from images import variant_url
+from dbengine import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
@@ -29,8 +31,23 @@ class User(db.Model, UserMixin):
     def check_password(self, password):
         return check_password_hash(self.password, password)
 
+    def profile_image_url(self):
+        return variant_url(self.profile_image, 'avatar')
+
+    def background_image_url(self):
+        return variant_url(self.background_image, 'background')
+
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_seller_created', 'seller_id', 'created_at', 'id'),
+        db.Index('ix_products_created', 'created_at', 'id'),
+        db.Index('ix_products_price', 'price'),
+        db.Index('uq_products_seller_sku', 'seller_id', 'sku', unique=True),
+        db.Index('ix_products_category_created', 'category', 'created_at', 'id'),
+        db.Index('ix_products_category_region_created', 'category', 'region', 'created_at', 'id'),
+        db.Index('ix_products_region_created', 'region', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
@@ -39,11 +56,22 @@ class Product(db.Model):
     image = db.Column(db.String(300))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     seller_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    def image_url(self):
-        return self.image if self.image else '/static/default_product.png'
+    sku = db.Column(db.String(64))  # seller's own stock code, unique per seller
+    category = db.Column(db.String(40), nullable=False, default='other', server_default='other')
+    region = db.Column(db.String(200))  # the seller's location, kept in sync by profile()
+    def image_url(self, variant='card'):
+        if not self.image:
+            return '/static/default_product.png'
+        if self.image.startswith('static/'):
+            return '/' + self.image
+        return variant_url(self.image, variant)
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        db.Index('ix_orders_buyer_created', 'buyer_id', 'created_at', 'id'),
+        db.Index('ix_orders_product_created', 'product_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     buyer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
@@ -56,23 +84,96 @@ class Order(db.Model):
     delivery_address = db.Column(db.String(255))
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class OrderStatusHistory(db.Model):
+    __tablename__ = 'order_status_history'
+    __table_args__ = (
+        db.Index('ix_order_status_history_order', 'order_id', 'changed_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    from_status = db.Column(db.String(50))
+    to_status = db.Column(db.String(50), nullable=False)
+    changed_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class SalesDaily(db.Model):
+    """Orders placed per seller, product and (UTC) day, kept current by
+    checkout and status changes; see analytics.py."""
+    __tablename__ = 'sales_daily'
+    __table_args__ = (
+        db.Index('ix_sales_daily_seller_day', 'seller_id', 'day'),
+        db.Index('ix_sales_daily_day', 'day'),
+    )
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    seller_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    pending = db.Column(db.Integer, nullable=False, default=0)
+    approved = db.Column(db.Integer, nullable=False, default=0)
+    shipped = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    completed_revenue = db.Column(db.Float, nullable=False, default=0)
+
+class ProductFacet(db.Model):
+    """In-stock product counts per (category, region, price bucket).
+
+    Maintained by database triggers (see facets.py), so every write to
+    products keeps it current.
+    """
+    __tablename__ = 'product_facets'
+    category = db.Column(db.String(40), primary_key=True)
+    region = db.Column(db.String(200), primary_key=True)  # '' when the seller has none
+    price_from = db.Column(db.Integer, primary_key=True)  # lower edge of the price bucket
+    products = db.Column(db.Integer, nullable=False, default=0)
+
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        db.Index('uq_cart_items_user_product', 'user_id', 'product_id', unique=True),
+        db.Index('ix_cart_items_reserved_until', 'reserved_until'),
+        db.Index('ix_cart_items_product_reserved', 'product_id', 'reserved_until'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=1)
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # While set, ``quantity`` units are held out of Product.quantity for this cart.
+    reserved_until = db.Column(db.DateTime)
 
     user = db.relationship('User', backref='cart_items', lazy=True)
     product = db.relationship('Product')
 
 class Message(db.Model):
+    __table_args__ = (
+        db.Index('ix_message_conversation', 'sender_id', 'receiver_id', 'timestamp'),
+        db.Index('ix_message_receiver_read', 'receiver_id', 'read_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     receiver_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    read_at = db.Column(db.DateTime)
 
     sender = db.relationship('User', foreign_keys=[sender_id])
     receiver = db.relationship('User', foreign_keys=[receiver_id])
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(64))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,91 @@
+from flask_mail import Message as MailMessage
+
+from jobs import enqueue, handler
+from models import db, User, Product, Order
+
+
+def notify_order_placed(buyer_id, lines):
+    """Queue buyer and seller emails for a checkout.
+
+    ``lines`` are ``(product_id, quantity, total_price)`` tuples. Call before
+    the checkout transaction commits.
+    """
+    enqueue('order_placed', {
+        'buyer_id': buyer_id,
+        'lines': [list(line) for line in lines],
+    })
+
+
+def notify_status_changed(order_ids, status):
+    enqueue('order_status_changed', {'order_ids': list(order_ids), 'status': status})
+
+
+@handler('order_placed')
+def order_placed(payload):
+    buyer = db.session.get(User, payload['buyer_id'])
+    lines = payload['lines']
+    products = {
+        p.id: p for p in Product.query.filter(
+            Product.id.in_([product_id for product_id, _, _ in lines])
+        )
+    }
+    sellers = {
+        u.id: u for u in User.query.filter(
+            User.id.in_({p.seller_id for p in products.values()})
+        )
+    }
+
+    summary = '\n'.join(
+        f'- {quantity} x {products[pid].name if pid in products else "(removed product)"}: '
+        f'PHP {total:.2f}'
+        for pid, quantity, total in lines
+    )
+    messages = []
+    if buyer and buyer.email:
+        messages.append(MailMessage(
+            subject='AgriMarket PH: order received',
+            recipients=[buyer.email],
+            body=f'Hi {buyer.username},\n\nWe received your order:\n{summary}\n',
+        ))
+
+    by_seller = {}
+    for pid, quantity, total in lines:
+        product = products.get(pid)
+        if product is not None:
+            by_seller.setdefault(product.seller_id, []).append(f'- {quantity} x {product.name}')
+    for seller_id, seller_lines in by_seller.items():
+        seller = sellers.get(seller_id)
+        if seller and seller.email:
+            messages.append(MailMessage(
+                subject='AgriMarket PH: new order',
+                recipients=[seller.email],
+                body=f'Hi {seller.username},\n\nYou have a new order:\n'
+                     + '\n'.join(seller_lines) + '\n',
+            ))
+    return messages
+
+
+@handler('order_status_changed')
+def order_status_changed(payload):
+    orders = (
+        Order.query.options(db.joinedload(Order.buyer), db.joinedload(Order.product))
+        .filter(Order.id.in_(payload['order_ids']))
+        .all()
+    )
+    by_buyer = {}
+    for order in orders:
+        if order.buyer and order.buyer.email:
+            by_buyer.setdefault(order.buyer, []).append(order)
+    return [
+        MailMessage(
+            subject=f'AgriMarket PH: order {payload["status"].lower()}',
+            recipients=[buyer.email],
+            body=f'Hi {buyer.username},\n\n'
+                 + '\n'.join(
+                     f'- Order #{o.id} ({o.product.name if o.product else "removed product"}) '
+                     f'is now {payload["status"]}.'
+                     for o in buyer_orders
+                 ) + '\n',
+        )
+        for buyer, buyer_orders in by_buyer.items()
+    ]
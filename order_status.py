@@ -0,0 +1,93 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from analytics import record_status_change
+from models import db, Product, Order, OrderStatusHistory
+from notifications import notify_status_changed
+
+STATUSES = ('Pending', 'Approved', 'Shipped', 'Completed')
+# target status -> the only status an order may move to it from
+TRANSITIONS = {'Approved': 'Pending', 'Shipped': 'Approved', 'Completed': 'Shipped'}
+
+
+class StatusChangeRejected(Exception):
+    """The batch was not applied; nothing changed.
+
+    ``not_owned`` holds ids that don't exist or belong to another seller,
+    ``wrong_status`` maps ids to a current status the transition can't
+    start from.
+    """
+
+    def __init__(self, message, not_owned=(), wrong_status=None):
+        super().__init__(message)
+        self.not_owned = sorted(not_owned)
+        self.wrong_status = wrong_status or {}
+
+
+def change_order_status(seller_id, order_ids, status, max_batch=None):
+    """Move the seller's orders to ``status`` in one transaction, all or nothing.
+
+    The state machine and ownership are both part of the UPDATE's WHERE
+    clause, so the happy path is one UPDATE, one executemany INSERT into
+    ``order_status_history`` and the queued buyer emails. Only when the row
+    count comes up short does a single join find out why.
+    """
+    if status not in TRANSITIONS:
+        raise StatusChangeRejected(f'Orders cannot be moved to {status!r}.')
+    order_ids = sorted({int(order_id) for order_id in order_ids})
+    if not order_ids:
+        raise StatusChangeRejected('No orders selected.')
+    if max_batch and len(order_ids) > max_batch:
+        raise StatusChangeRejected(f'At most {max_batch} orders can be changed at once.')
+    previous = TRANSITIONS[status]
+    now = datetime.utcnow()
+
+    try:
+        result = db.session.execute(
+            sa.update(Order)
+            .where(
+                Order.id.in_(order_ids),
+                Order.status == previous,
+                Order.product_id.in_(
+                    sa.select(Product.id).where(Product.seller_id == seller_id)
+                ),
+            )
+            .values(status=status, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(order_ids):
+            db.session.rollback()  # explain against the statuses before this UPDATE
+            raise _explain(seller_id, order_ids, previous, status)
+
+        record_status_change(order_ids, previous, status)
+        db.session.execute(OrderStatusHistory.__table__.insert(), [
+            {'order_id': order_id, 'from_status': previous, 'to_status': status,
+             'changed_by': seller_id, 'changed_at': now}
+            for order_id in order_ids
+        ])
+        notify_status_changed(order_ids, status)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return order_ids
+
+
+def _explain(seller_id, order_ids, previous, status):
+    rows = db.session.execute(
+        sa.select(Order.id, Order.status)
+        .join(Product, Product.id == Order.product_id)
+        .where(Order.id.in_(order_ids), Product.seller_id == seller_id)
+    ).all()
+    not_owned = set(order_ids) - {order_id for order_id, _ in rows}
+    if not_owned:
+        return StatusChangeRejected(
+            f'{len(not_owned)} of the selected orders are not yours.', not_owned=not_owned
+        )
+    wrong_status = {order_id: current for order_id, current in rows if current != previous}
+    return StatusChangeRejected(
+        f'{len(wrong_status)} of the selected orders are not {previous}, '
+        f'so they cannot be marked {status}.',
+        wrong_status=wrong_status,
+    )
@@ -0,0 +1,170 @@
+import base64
+import binascii
+import json
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+from flask import current_app, request, url_for
+
+
+class Page:
+    def __init__(self, items, next_cursor, prev_cursor, total):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(values, direction):
+    payload = {'k': [_encode_value(v) for v in values], 'd': direction}
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _fits(column, value):
+    """Whether a decoded cursor value can be compared with ``column``."""
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:  # e.g. a computed rank
+        expected = float
+    if expected is datetime:
+        return isinstance(value, datetime)
+    if expected is str:
+        return isinstance(value, str)
+    if isinstance(value, bool):
+        return False
+    if expected is int:
+        return isinstance(value, int)
+    return isinstance(value, (int, float))
+
+
+def decode_cursor(token, keys):
+    """``(values, direction)`` from a ``?cursor=`` token, or ``None`` if it is
+    malformed or its values don't match the types of ``keys``."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(v) for v in payload['k']]
+        direction = payload['d']
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        return None
+    if len(values) != len(keys) or direction not in ('next', 'prev'):
+        return None
+    if not all(_fits(column, value) for (column, _), value in zip(keys, values)):
+        return None
+    return values, direction
+
+
+def _after(keys, values, reverse=False):
+    # (a, b) > (x, y) spelled out as a OR chain so mixed ASC/DESC keys and
+    # every backend are handled the same way.
+    clauses = []
+    for i, ((column, descending), value) in enumerate(zip(keys, values)):
+        forward = descending == reverse
+        step = column > value if forward else column < value
+        prefix = [keys[j][0] == values[j] for j in range(i)]
+        clauses.append(sa.and_(*prefix, step))
+    return sa.or_(*clauses)
+
+
+def _order(keys, reverse=False):
+    return [
+        column.desc() if descending != reverse else column.asc()
+        for column, descending in keys
+    ]
+
+
+def _key_of(row, labels):
+    return [getattr(row, label) for label in labels]
+
+
+def paginate(query, keys, count_key=None, per_page=None):
+    """Keyset-paginate ``query`` on ``keys``, a list of (column, descending).
+
+    The cursor comes from ``?cursor=`` and each key must be unique together,
+    so the last key should be the primary key.
+    """
+    per_page = per_page or current_app.config['PAGE_SIZE']
+    key_query = query.add_columns(*[column.label(f'_k{i}') for i, (column, _) in enumerate(keys)])
+    labels = [f'_k{i}' for i in range(len(keys))]
+
+    cursor = None
+    token = request.args.get('cursor')
+    if token:
+        cursor = decode_cursor(token, keys)
+
+    if cursor is None:
+        rows = key_query.order_by(*_order(keys)).limit(per_page + 1).all()
+        has_more, has_before = len(rows) > per_page, False
+        rows = rows[:per_page]
+    else:
+        values, direction = cursor
+        reverse = direction == 'prev'
+        rows = (
+            key_query.filter(_after(keys, values, reverse))
+            .order_by(*_order(keys, reverse))
+            .limit(per_page + 1)
+            .all()
+        )
+        extra = len(rows) > per_page
+        rows = rows[:per_page]
+        if reverse:
+            rows.reverse()
+            has_more, has_before = True, extra
+        else:
+            has_more, has_before = extra, True
+
+    items = [row[0] for row in rows]
+    next_cursor = prev_cursor = None
+    if rows and has_more:
+        next_cursor = encode_cursor(_key_of(rows[-1], labels), 'next')
+    if rows and has_before:
+        prev_cursor = encode_cursor(_key_of(rows[0], labels), 'prev')
+
+    total = cached_count(query, count_key) if count_key is not None else None
+    return Page(items, next_cursor, prev_cursor, total)
+
+
+_count_cache = {}
+
+
+def cached_count(query, key):
+    ttl = current_app.config['COUNT_CACHE_TTL']
+    now = time.monotonic()
+    hit = _count_cache.get(key)
+    if hit and now - hit[1] < ttl:
+        return hit[0]
+    total = query.order_by(None).count()
+    if len(_count_cache) > 10_000:
+        _count_cache.clear()
+    _count_cache[key] = (total, now)
+    return total
+
+
+def clear_count_cache():
+    _count_cache.clear()
+
+
+def cursor_url(cursor):
+    args = request.args.to_dict(flat=False)  # keeps repeated filters like ?category=a&category=b
+    args['cursor'] = cursor
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
@@ -0,0 +1,280 @@
+import codecs
+import csv
+import json
+import os
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import sqlalchemy as sa
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from facets import CATEGORIES, DEFAULT_CATEGORY, normalize_region
+from models import db, User, Product
+from reservations import held_units
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl'}
+COLUMNS = ('sku', 'name', 'description', 'price', 'quantity', 'category')
+
+_products = Product.__table__
+# An import's quantity is what the seller has on hand. Product.quantity is
+# what is left once carts have taken their holds, so those are subtracted.
+# It can go below zero if the seller now has less than carts hold; it comes
+# back as those holds expire.
+_update = (
+    _products.update()
+    .where(_products.c.id == sa.bindparam('b_id'))
+    .values(
+        name=sa.bindparam('b_name'),
+        description=sa.bindparam('b_description'),
+        price=sa.bindparam('b_price'),
+        quantity=sa.bindparam('b_quantity') - held_units(_products.c.id),
+        category=sa.bindparam('b_category'),
+    )
+)
+
+
+class ImportReport:
+    def __init__(self, max_errors):
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def fail(self, line, messages):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': messages})
+
+    @property
+    def changed(self):
+        return self.inserted + self.updated
+
+    def as_dict(self):
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def import_format(filename):
+    return FORMATS.get(os.path.splitext(filename or '')[1].lower())
+
+
+class BadRow:
+    """A row that could not be read; ``validate`` reports ``message`` for it."""
+
+    def __init__(self, message):
+        self.message = message
+
+
+NOT_UTF8 = 'not valid UTF-8 text; save the file as UTF-8 (in Excel: "CSV UTF-8")'
+
+
+def _lines(stream):
+    """Yield ``(line_number, text, decoded)`` from a binary stream.
+
+    Lines are decoded one at a time, so a file saved in another encoding
+    (e.g. cp1252 from Excel) fails only on the lines that aren't UTF-8,
+    which are passed on with replacement characters and ``decoded`` False.
+    """
+    for number, raw in enumerate(stream, 1):
+        if number == 1 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        try:
+            yield number, raw.decode('utf-8'), True
+        except UnicodeDecodeError:
+            yield number, raw.decode('utf-8', 'replace'), False
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row)`` from a binary stream, one row at a time.
+
+    A row that can't be read (not UTF-8, or a JSON line that does not
+    parse) is yielded as a ``BadRow`` so it can be reported rather than
+    abort the import. A JSON array is reported once, on its first line,
+    and nothing else is read: its rows are not one per line.
+    """
+    if fmt == 'csv':
+        undecoded = []
+
+        def text():
+            for number, line, decoded in _lines(stream):
+                if not decoded:
+                    undecoded.append(number)
+                yield line
+
+        reader = csv.DictReader(text())
+        for row in reader:
+            if undecoded:  # the reader has only read this row's lines (and the header)
+                undecoded.clear()
+                yield reader.line_num, BadRow(NOT_UTF8)
+            else:
+                yield reader.line_num, row
+        return
+    first = True
+    for number, line, decoded in _lines(stream):
+        if not line.strip():
+            continue
+        if first and line.lstrip().startswith('['):
+            yield number, BadRow('the file is a JSON array; upload JSON lines instead, '
+                                 'one product object per line')
+            return
+        first = False
+        if not decoded:
+            yield number, BadRow(NOT_UTF8)
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, BadRow('not valid JSON')
+
+
+def validate(row):
+    """Check one row with the same rules as ``ProductForm``.
+
+    Returns ``(values, errors)``; ``values`` only holds the fields the row
+    actually set, so a restock line with just ``sku`` and ``quantity`` leaves
+    the rest of an existing product alone.
+    """
+    if isinstance(row, BadRow):
+        return None, [row.message]
+    if not isinstance(row, dict):
+        return None, ['not a JSON object']
+
+    def text(key):
+        value = row.get(key)
+        return '' if value is None else str(value).strip()
+
+    values, errors = {'sku': text('sku') or None}, []
+    if values['sku'] and len(values['sku']) > 64:
+        errors.append('sku is longer than 64 characters')
+
+    for key, limit in (('name', 200), ('description', None)):
+        value = text(key)
+        if value:
+            values[key] = value
+            if limit and len(value) > limit:
+                errors.append(f'{key} is longer than {limit} characters')
+
+    if text('price'):
+        try:
+            price = Decimal(text('price'))
+            if not price.is_finite() or price < 0:
+                raise InvalidOperation
+            values['price'] = float(round(price, 2))
+        except InvalidOperation:
+            errors.append('price must be a number of at least 0')
+
+    if not text('quantity'):
+        errors.append('quantity is required')
+    else:
+        try:
+            values['quantity'] = int(text('quantity'))
+            if values['quantity'] < 0:
+                raise ValueError
+        except ValueError:
+            errors.append('quantity must be a whole number of at least 0')
+
+    if text('category'):
+        values['category'] = text('category').lower()
+        if values['category'] not in CATEGORIES:
+            errors.append(f'category must be one of {", ".join(CATEGORIES)}')
+
+    if not values['sku']:
+        errors.extend(_missing(values))
+    return values, errors
+
+
+def _missing(values):
+    return [f'{key} is required' for key in ('name', 'description', 'price') if key not in values]
+
+
+def import_products(seller_id, stream, fmt, batch_size=None, max_errors=None):
+    """Stream rows into ``products`` in batches, upserting on the seller's SKU.
+
+    Each batch is one SELECT for the SKUs it mentions, one executemany
+    INSERT and one executemany UPDATE, committed on its own, so memory stays
+    flat however long the file is. A SKU that already exists has its fields
+    (usually just ``quantity``) replaced in place.
+    """
+    config = current_app.config
+    batch_size = batch_size or config['IMPORT_BATCH_SIZE']
+    report = ImportReport(max_errors or config['IMPORT_MAX_ERRORS'])
+    region = normalize_region(
+        db.session.execute(sa.select(User.location).where(User.id == seller_id)).scalar()
+    )
+    batch = []
+    for line, row in read_rows(stream, fmt):
+        values, errors = validate(row)
+        if errors:
+            report.fail(line, errors)
+            continue
+        batch.append((line, values))
+        if len(batch) >= batch_size:
+            _write_batch(seller_id, region, batch, report)
+            batch = []
+    if batch:
+        _write_batch(seller_id, region, batch, report)
+    return report
+
+
+def _write_batch(seller_id, region, batch, report):
+    skus = {values['sku'] for _, values in batch if values['sku']}
+    existing = {}
+    if skus:
+        rows = db.session.execute(
+            sa.select(Product.id, Product.sku, Product.name, Product.description,
+                      Product.price, Product.quantity, Product.category)
+            .where(Product.seller_id == seller_id, Product.sku.in_(skus))
+        )
+        existing = {row.sku: dict(row._mapping) for row in rows}
+
+    now = datetime.utcnow()
+    by_sku, inserts, lines, inserted, updated = {}, [], [], 0, 0
+    for line, values in batch:
+        sku = values['sku']
+        fields = {k: v for k, v in values.items() if k != 'sku'}
+        new = {'category': DEFAULT_CATEGORY, 'region': region, 'seller_id': seller_id,
+               'sku': sku, 'created_at': now}
+        if sku is None:
+            inserts.append(dict(new, **fields))
+            inserted += 1
+        elif sku in by_sku:
+            by_sku[sku].update(fields)
+            updated += 1
+        elif sku in existing:
+            by_sku[sku] = dict(existing[sku], **fields)
+            updated += 1
+        elif _missing(fields):
+            report.fail(line, [f'{message} for a new SKU' for message in _missing(fields)])
+            continue
+        else:
+            by_sku[sku] = dict(new, **fields)
+            inserts.append(by_sku[sku])  # later lines for this SKU update it in place
+            inserted += 1
+        lines.append(line)
+
+    updates = [
+        {'b_id': row['id'], 'b_name': row['name'], 'b_description': row['description'],
+         'b_price': row['price'], 'b_quantity': row['quantity'], 'b_category': row['category']}
+        for row in by_sku.values() if 'id' in row
+    ]
+    try:
+        if inserts:
+            db.session.execute(_products.insert(), inserts)
+        if updates:
+            db.session.execute(_update, updates)
+        db.session.commit()
+    except IntegrityError:
+        # Another import created one of these SKUs since the SELECT above.
+        db.session.rollback()
+        for line in lines:
+            report.fail(line, ['not saved: a SKU in this batch was created concurrently, retry'])
+        return
+    report.inserted += inserted
+    report.updated += updated
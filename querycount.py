@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+
+from models import db
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=None):
+    engine = engine or db.engine
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Fail if the block runs more than ``limit`` SQL statements.
+
+    Typical use in a test::
+
+        with app.app_context(), assert_max_queries(3):
+            client.get('/cart')
+    """
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(
+            f'{counter.count} SQL statements executed, expected at most {limit}:\n'
+            + '\n'.join(counter.statements)
+        )
+
+
+def query_budget(limit):
+    """Declare the maximum number of SQL statements a view may run."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def _count_request_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'query_budget_statements' in g:
+        g.query_budget_statements.append(statement)
+
+
+def init_query_budgets(app):
+    """Enforce ``@query_budget`` limits on every request while testing."""
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _count_request_statement)
+
+    @app.before_request
+    def start_query_budget():
+        if app.config.get('ENFORCE_QUERY_BUDGETS', app.testing):
+            g.query_budget_statements = []
+
+    @app.after_request
+    def check_query_budget(response):
+        view = current_app.view_functions.get(request.endpoint)
+        limit = getattr(view, 'query_budget', None)
+        statements = g.pop('query_budget_statements', None)
+        if statements is None:
+            return response
+        if limit is not None and len(statements) > limit:
+            raise AssertionError(
+                f'{request.endpoint} ran {len(statements)} SQL statements, '
+                f'budget is {limit}:\n' + '\n'.join(statements)
+            )
+        return response
@@ -0,0 +1,63 @@
+import re
+
+import sqlalchemy as sa
+
+from models import db, User, Product, Order, CartItem, Message
+
+
+def hot_queries():
+    """The access paths the indexes in models.py exist for."""
+    return {
+        'latest products': Product.query.order_by(
+            Product.created_at.desc(), Product.id.desc()).limit(24),
+        'price range': Product.query.filter(Product.price >= 10, Product.price <= 50),
+        'category facet': Product.query.filter(
+            Product.category == 'fruits', Product.quantity > 0
+        ).order_by(Product.created_at.desc(), Product.id.desc()).limit(24),
+        'category and region facets': Product.query.filter(
+            Product.category == 'fruits', Product.region.in_(['Davao', 'Cebu'])
+        ).order_by(Product.created_at.desc(), Product.id.desc()).limit(24),
+        'region facet': Product.query.filter(Product.region == 'Davao').order_by(
+            Product.created_at.desc(), Product.id.desc()).limit(24),
+        'seller products': Product.query.filter_by(seller_id=1).order_by(
+            Product.created_at.desc(), Product.id.desc()),
+        'cart item lookup': CartItem.query.filter_by(user_id=1, product_id=1),
+        'buyer orders': Order.query.filter_by(buyer_id=1).order_by(
+            Order.created_at.desc(), Order.id.desc()),
+        'seller orders': Order.query.join(Product).filter(Product.seller_id == 1),
+        'conversation': Message.query.filter(
+            ((Message.sender_id == 1) & (Message.receiver_id == 2)) |
+            ((Message.sender_id == 2) & (Message.receiver_id == 1))
+        ).order_by(Message.timestamp),
+        'login by email': User.query.filter_by(email='someone@example.com'),
+    }
+
+
+def explain(query):
+    dialect = db.engine.dialect
+    sql = str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    with db.engine.begin() as conn:
+        if dialect.name == 'sqlite':
+            rows = conn.execute(sa.text('EXPLAIN QUERY PLAN ' + sql)).fetchall()
+            return [row[-1] for row in rows]
+        if dialect.name == 'postgresql':
+            # Empty tables make a seq scan the cheapest plan; disable it so
+            # the plan shows whether an index *can* be used.
+            conn.execute(sa.text('SET LOCAL enable_seqscan = off'))
+            return [row[0] for row in conn.execute(sa.text('EXPLAIN ' + sql))]
+    raise RuntimeError(f'EXPLAIN is not supported for {dialect.name}')
+
+
+def full_scans(plan):
+    if db.engine.dialect.name == 'postgresql':
+        return [line for line in plan if 'Seq Scan' in line]
+    return [line for line in plan if re.match(r'^SCAN \w+$', line.strip())]
+
+
+def check_query_plans():
+    """Return ``(name, ok, plan)`` for every hot query."""
+    results = []
+    for name, query in hot_queries().items():
+        plan = explain(query)
+        results.append((name, not full_scans(plan), plan))
+    return results
@@ -0,0 +1,236 @@
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+from flask import current_app
+
+from models import db, Product, CartItem
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_name):
+        super().__init__(f'Not enough stock for {product_name}')
+        self.product_name = product_name
+
+
+def held_units(product_id):
+    """Units of a product held by carts, as a correlated scalar subquery.
+
+    Expired holds still count until the sweeper hands them back, because
+    it will add them to Product.quantity when it does.
+    """
+    return (
+        sa.select(sa.func.coalesce(sa.func.sum(CartItem.quantity), 0))
+        .where(CartItem.product_id == product_id, CartItem.reserved_until.isnot(None))
+        .scalar_subquery()
+    )
+
+
+def held_by_product(product_ids):
+    """``{product_id: units held by carts}`` for the given products."""
+    if not product_ids:
+        return {}
+    return dict(db.session.execute(
+        sa.select(CartItem.product_id, sa.func.sum(CartItem.quantity))
+        .where(CartItem.product_id.in_(product_ids), CartItem.reserved_until.isnot(None))
+        .group_by(CartItem.product_id)
+    ).all())
+
+
+def take_hold(item_id):
+    """Clear a cart item's hold inside the caller's transaction.
+
+    Returns ``(held, quantity)``: whether the row was holding stock (an
+    expired hold the sweeper hasn't reached yet still counts) and its
+    current quantity, or ``(False, None)`` if the item is gone. The guarded
+    UPDATE makes this safe against the sweeper and the buyer's own
+    concurrent requests: only one of them can take a given hold.
+    """
+    held = db.session.execute(
+        sa.update(CartItem)
+        .where(CartItem.id == item_id, CartItem.reserved_until.isnot(None))
+        .values(reserved_until=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    quantity = db.session.execute(
+        sa.select(CartItem.quantity).where(CartItem.id == item_id)
+    ).scalar()
+    return held, quantity
+
+
+def listing_changed():
+    """Whether stock changes in this session, since the last call, took a
+    product out of the home page listing or put one back.
+
+    The listing and its facet counts only cover products with stock left,
+    so callers need to invalidate the catalog only then. Everything else
+    that shows stock reads it live.
+    """
+    return db.session.info.pop('listing_changed', False)
+
+
+def _note_listing_change():
+    db.session.info['listing_changed'] = True
+
+
+def take_stock(product_id, quantity, product_name):
+    """Move ``quantity`` units out of available stock (back into it if negative)."""
+    if quantity == 0:
+        return
+    if quantity > 0:
+        result = db.session.execute(
+            sa.update(Product)
+            .where(Product.id == product_id, Product.quantity >= quantity)
+            .values(quantity=Product.quantity - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            raise OutOfStock(product_name)
+    else:
+        db.session.execute(
+            sa.update(Product)
+            .where(Product.id == product_id)
+            .values(quantity=Product.quantity - quantity)
+            .execution_options(synchronize_session=False)
+        )
+    remaining = db.session.execute(
+        sa.select(Product.quantity).where(Product.id == product_id)
+    ).scalar()
+    if (remaining > 0) != (remaining + quantity > 0):
+        _note_listing_change()
+
+
+def cart_item(buyer_id, product):
+    """The buyer's cart line for ``product``, created empty if there is none.
+
+    Uses INSERT ... ON CONFLICT DO NOTHING, so two concurrent adds of the
+    same product end up on one line instead of one of them failing on the
+    unique index. The new line holds nothing until ``hold_stock`` runs in
+    the same transaction.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    db.session.execute(
+        insert(CartItem.__table__)
+        .values(user_id=buyer_id, product_id=product.id, quantity=0, added_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=['user_id', 'product_id'])
+    )
+    return CartItem.query.filter_by(user_id=buyer_id, product_id=product.id).one()
+
+
+def hold_stock(item, quantity=None, delta=0):
+    """Set a cart item's quantity (or change it by ``delta``) and hold that
+    much stock for RESERVATION_TTL seconds, inside the caller's transaction.
+
+    Raises ``LookupError`` if the line was deleted meanwhile, e.g. by a
+    checkout in another tab. Returns the new quantity.
+    """
+    db.session.flush()
+    held, current = take_hold(item.id)
+    if current is None:
+        raise LookupError('cart item was removed')
+    target = quantity if quantity is not None else current + delta
+    if target < 1:
+        raise ValueError('quantity must be at least 1')
+    take_stock(item.product_id, target - (current if held else 0), item.product.name)
+    db.session.execute(
+        sa.update(CartItem)
+        .where(CartItem.id == item.id)
+        .values(
+            quantity=target,
+            reserved_until=datetime.utcnow()
+            + timedelta(seconds=current_app.config['RESERVATION_TTL']),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return target
+
+
+def release_stock(item):
+    """Delete a cart item and return any stock it held, inside the caller's transaction."""
+    held, current = take_hold(item.id)
+    if held:
+        take_stock(item.product_id, -current, item.product.name)
+    db.session.execute(
+        sa.delete(CartItem)
+        .where(CartItem.id == item.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reserve(item, quantity=None, delta=0):
+    """``hold_stock`` in its own transaction. All or nothing: on
+    ``OutOfStock`` neither the cart nor the stock changes."""
+    try:
+        quantity = hold_stock(item, quantity, delta)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return quantity
+
+
+def release(item):
+    """Remove a cart item, returning any stock it held."""
+    try:
+        release_stock(item)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def release_expired(batch_size=None):
+    """Return expired holds to stock, one transaction per batch.
+
+    The items stay in their carts; checkout tries to take the stock again.
+    Returns the number of holds released; see ``listing_changed`` for
+    whether any product came back into stock.
+    """
+    batch_size = batch_size or current_app.config['RESERVATION_SWEEP_BATCH']
+    released = 0
+    while True:
+        expired = CartItem.reserved_until < datetime.utcnow()
+        candidates = (
+            sa.select(CartItem.id).where(expired)
+            .order_by(CartItem.reserved_until).limit(batch_size)
+        )
+        if db.engine.dialect.name == 'postgresql':
+            candidates = candidates.with_for_update(skip_locked=True)
+        ids = db.session.execute(candidates).scalars().all()
+        if not ids:
+            break
+
+        # Both statements re-check expiry: a hold taken by checkout or the
+        # buyer between the SELECT and here is left alone.
+        batch = sa.and_(CartItem.id.in_(ids), expired)
+        held = (
+            sa.select(sa.func.sum(CartItem.quantity))
+            .where(batch, CartItem.product_id == Product.id)
+            .scalar_subquery()
+        )
+        products = Product.id.in_(sa.select(CartItem.product_id).where(batch))
+        try:
+            if db.session.execute(
+                sa.select(Product.id).where(products, Product.quantity + held > 0,
+                                            Product.quantity <= 0).limit(1)
+            ).first():
+                _note_listing_change()
+            db.session.execute(
+                sa.update(Product)
+                .where(products)
+                .values(quantity=Product.quantity + held)
+                .execution_options(synchronize_session=False)
+            )
+            released += db.session.execute(
+                sa.update(CartItem).where(batch).values(reserved_until=None)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        if len(ids) < batch_size:
+            break
+    return released
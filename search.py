@@ -0,0 +1,117 @@
+import re
+
+import sqlalchemy as sa
+
+from models import db, Product
+
+
+# Same expression is used by the GIN index and by the query so PostgreSQL
+# can match one against the other.
+PG_DOCUMENT = "products.name || ' ' || coalesce(products.description, '')"
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+PG_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_products_search "
+    f"ON products USING GIN (to_tsvector('simple', {PG_DOCUMENT}))",
+]
+
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text or '')
+
+
+def ensure_search_index():
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        existed = sa.inspect(db.engine).has_table('products_fts')
+        with db.engine.begin() as conn:
+            for ddl in SQLITE_DDL:
+                conn.execute(sa.text(ddl))
+        if not existed:
+            rebuild_search_index()
+    elif dialect == 'postgresql':
+        with db.engine.begin() as conn:
+            for ddl in PG_DDL:
+                conn.execute(sa.text(ddl))
+
+
+def rebuild_search_index():
+    dialect = _dialect()
+    with db.engine.begin() as conn:
+        if dialect == 'sqlite':
+            conn.execute(sa.text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+        elif dialect == 'postgresql':
+            conn.execute(sa.text("REINDEX INDEX ix_products_search"))
+
+
+def search_products(query, text):
+    """Restrict ``query`` to products matching ``text``.
+
+    Returns the filtered query and a rank expression where lower sorts as a
+    better match, or ``None`` when there is nothing to rank by.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return query, None
+
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        # Every term must match; the trailing * keeps "tom" finding "tomato"
+        # the way the old substring filter did.
+        match = ' '.join(f'"{t}"*' for t in terms)
+        hits = (
+            sa.text(
+                "SELECT rowid AS product_id, bm25(products_fts) AS rank "
+                "FROM products_fts WHERE products_fts MATCH :match"
+            )
+            .bindparams(match=match)
+            .columns(product_id=sa.Integer, rank=sa.Float)
+            .subquery('search_hits')
+        )
+        return query.join(hits, hits.c.product_id == Product.id), hits.c.rank
+
+    if dialect == 'postgresql':
+        document = sa.func.to_tsvector('simple', sa.literal_column(PG_DOCUMENT))
+        tsquery = sa.func.to_tsquery('simple', ' & '.join(f'{t}:*' for t in terms))
+        rank = -sa.func.ts_rank(document, tsquery)
+        return query.filter(document.op('@@')(tsquery)), rank
+
+    for t in terms:
+        pattern = f'%{t}%'
+        query = query.filter(
+            Product.name.ilike(pattern) | Product.description.ilike(pattern)
+        )
+    return query, None
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app, init_schema
+from models import db, User, Product
+from pagination import clear_count_cache
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'test.db'))
+    monkeypatch.setenv('UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, TEMPLATE_CACHE_DIR='')
+    init_schema(app)
+    clear_count_cache()  # module-level, and user ids repeat in every fresh database
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def make_user(username, role='buyer'):
+    user = User(
+        username=username, email=f'{username}@example.com', role=role, address='Somewhere',
+        password=generate_password_hash('pw', method='pbkdf2:sha256:1000'),
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def make_product(seller_id, name='Mango', price=10.0, quantity=10, created_at=None):
+    product = Product(name=name, description=f'Fresh {name}', price=price, quantity=quantity,
+                      seller_id=seller_id, created_at=created_at or datetime.utcnow())
+    db.session.add(product)
+    db.session.commit()
+    return product.id
+
+
+def login(client, username):
+    response = client.post('/login', data={'email': f'{username}@example.com', 'password': 'pw'})
+    assert response.status_code == 302
@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+
+from analytics import check_rollups, rebuild_rollups, summary
+from checkout import place_order
+from conftest import login, make_product, make_user
+from models import db, CartItem
+
+
+def test_deleting_a_sold_product_keeps_its_rollups(app, client):
+    seller, buyer = make_user('seller', role='seller'), make_user('buyer')
+    mango = make_product(seller, 'Mango', price=25.0)
+    rice = make_product(seller, 'Rice', price=40.0)
+    db.session.add_all([CartItem(user_id=buyer, product_id=mango, quantity=2),
+                        CartItem(user_id=buyer, product_id=rice, quantity=1)])
+    db.session.commit()
+    place_order(buyer)
+    today = date.today()
+    week = (today - timedelta(days=7), today + timedelta(days=1))
+    assert summary(seller, *week)['revenue'] == 90.0
+
+    login(client, 'seller')
+    client.post(f'/seller/delete-product/{mango}')
+
+    assert check_rollups() == []
+    rebuild_rollups()
+    assert check_rollups() == []
+    assert summary(seller, *week)['revenue'] == 90.0
+    rebuild_rollups(today, today)
+    assert summary(seller, *week)['revenue'] == 90.0
@@ -0,0 +1,12 @@
+import pytest
+
+from app import create_app, create_web_app
+
+
+def test_only_web_processes_need_a_shared_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'test.db'))
+    monkeypatch.setenv('UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+    create_app()  # init-db, jobs-worker and sweep-reservations
+    with pytest.raises(RuntimeError, match='CATALOG_CACHE_URL'):
+        create_web_app()
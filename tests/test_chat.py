@@ -0,0 +1,60 @@
+import json
+import threading
+import time
+
+from chat import stream_messages
+from conftest import login, make_user
+from models import db, Message
+
+
+def send(sender_id, receiver_id, content):
+    db.session.add(Message(sender_id=sender_id, receiver_id=receiver_id, content=content))
+    db.session.commit()
+
+
+def test_stream_wakes_up_when_a_message_is_committed(app):
+    ana, ben = make_user('ana'), make_user('ben')
+    stream = stream_messages(ana, ben, 0, duration=30, recheck=10)
+
+    def reply():
+        time.sleep(0.2)
+        with app.app_context():
+            send(ben, ana, 'hello')
+
+    threading.Thread(target=reply).start()
+    start = time.monotonic()
+    batch = next(stream)
+    assert time.monotonic() - start < 5  # well before the 10 s database recheck
+    assert [m['content'] for m in batch] == ['hello']
+    stream.close()
+    assert Message.query.one().read_at is not None
+
+
+def test_stream_sends_keep_alives_and_stops(app):
+    ana, ben = make_user('ana'), make_user('ben')
+    assert list(stream_messages(ana, ben, 0, duration=0.3, recheck=0.1))[:2] == [[], []]
+
+
+def test_stream_endpoint_resumes_after_last_event_id(app, client):
+    ana, ben = make_user('ana'), make_user('ben')
+    send(ben, ana, 'first')
+    send(ben, ana, 'second')
+    first_id = Message.query.filter_by(content='first').one().id
+    app.config['CHAT_STREAM_SECONDS'] = 0
+    login(client, 'ana')
+
+    response = client.get(f'/api/messages/{ben}/stream', headers={'Last-Event-ID': str(first_id)})
+    assert response.mimetype == 'text/event-stream'
+    events = [block for block in response.get_data(as_text=True).split('\n\n') if 'data:' in block]
+    assert [json.loads(e.split('data: ')[1])['content'] for e in events] == ['second']
+    assert app.extensions['chat_streams'].acquire(blocking=False)  # released on close
+
+
+def test_stream_endpoint_refuses_past_the_limit(app, client):
+    make_user('ana')
+    ben = make_user('ben')
+    streams = app.extensions['chat_streams']
+    while streams.acquire(blocking=False):
+        pass
+    login(client, 'ana')
+    assert client.get(f'/api/messages/{ben}/stream').status_code == 503
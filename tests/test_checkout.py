@@ -0,0 +1,76 @@
+import pytest
+
+from checkout import place_order
+from conftest import login, make_product, make_user
+from models import db, CartItem, Order, Product
+from reservations import OutOfStock
+
+
+@pytest.fixture
+def seller(app):
+    return make_user('seller', role='seller')
+
+
+def stock(product_id):
+    return db.session.query(Product.quantity).filter_by(id=product_id).scalar()
+
+
+def unheld_line(buyer_id, product_id, quantity):
+    """A cart line whose hold the sweeper has already released."""
+    db.session.add(CartItem(user_id=buyer_id, product_id=product_id, quantity=quantity))
+    db.session.commit()
+
+
+def test_held_stock_is_taken_once(app, client, seller):
+    buyer = make_user('buyer')
+    mango = make_product(seller, 'Mango', quantity=5)
+    login(client, 'buyer')
+
+    client.post(f'/cart/add/{mango}', data={'quantity': 3})
+    assert stock(mango) == 2
+    assert client.post('/cart/checkout').status_code == 200
+
+    db.session.expire_all()
+    assert stock(mango) == 2
+    assert Order.query.filter_by(buyer_id=buyer).one().quantity == 3
+    assert CartItem.query.count() == 0
+
+
+def test_cart_cannot_hold_more_than_the_stock(app, client, seller):
+    make_user('buyer')
+    mango = make_product(seller, 'Mango', quantity=2)
+    login(client, 'buyer')
+
+    client.post(f'/cart/add/{mango}', data={'quantity': 3})
+    db.session.expire_all()
+    assert stock(mango) == 2
+    assert CartItem.query.count() == 0
+
+
+def test_short_line_rolls_back_the_whole_cart(app, seller):
+    buyer = make_user('buyer')
+    mango = make_product(seller, 'Mango', quantity=5)
+    rice = make_product(seller, 'Rice', quantity=1)
+    unheld_line(buyer, mango, 2)
+    unheld_line(buyer, rice, 2)
+
+    with pytest.raises(OutOfStock, match='Rice'):
+        place_order(buyer)
+
+    assert (stock(mango), stock(rice)) == (5, 1)
+    assert Order.query.count() == 0
+    assert CartItem.query.filter_by(user_id=buyer).count() == 2
+
+
+def test_last_unit_goes_to_one_buyer_only(app, seller):
+    first, second = make_user('first'), make_user('second')
+    mango = make_product(seller, 'Mango', quantity=1)
+    unheld_line(first, mango, 1)
+    unheld_line(second, mango, 1)
+
+    assert len(place_order(first)) == 1
+    with pytest.raises(OutOfStock):
+        place_order(second)
+
+    assert stock(mango) == 0
+    assert Order.query.filter_by(product_id=mango).count() == 1
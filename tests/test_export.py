@@ -0,0 +1,48 @@
+import pytest
+
+from benchmarks.bench_export import download, seed
+from models import db
+
+ORDERS = 2500
+
+
+@pytest.fixture
+def seller_client(app, client):
+    app.config['EXPORT_BATCH_SIZE'] = 500
+    seed(ORDERS)
+    client.post('/login', data={'email': 'coop@example.com', 'password': 'pw'})
+    return client
+
+
+def quadruple_orders():
+    for _ in range(2):
+        db.session.execute(db.text(
+            'INSERT INTO orders (buyer_id, product_id, quantity, total_price, status,'
+            ' delivery_address, created_at) SELECT buyer_id, product_id, quantity,'
+            ' total_price, status, delivery_address, created_at FROM orders'
+        ))
+    db.session.commit()
+
+
+def warm_peak(client, url, headers):
+    download(client, url, headers)  # first run pays for SQL compilation and caches
+    _, _, size, peak, lines = download(client, url, headers)
+    return size, peak, lines
+
+
+@pytest.mark.parametrize('url, headers', [
+    ('/seller/orders/export?format=csv', None),
+    ('/seller/orders/export?format=json', None),
+    ('/seller/orders/export?format=csv', {'Accept-Encoding': 'gzip'}),
+])
+def test_export_memory_does_not_grow_with_orders(seller_client, url, headers):
+    size, peak, lines = warm_peak(seller_client, url, headers)
+    quadruple_orders()
+    big_size, big_peak, big_lines = warm_peak(seller_client, url, headers)
+
+    if 'csv' in url:  # counted after gunzip
+        assert (lines, big_lines) == (ORDERS + 1, 4 * ORDERS + 1)
+    else:
+        assert big_size > 3.5 * size
+    assert big_peak < 1.25 * peak + 256 * 1024
+    assert big_peak < 4 * 2 ** 20
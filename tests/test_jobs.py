@@ -0,0 +1,91 @@
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.smtp_standin import SMTPStandIn
+from checkout import place_order
+from conftest import make_product, make_user
+from jobs import backoff, run_once
+from models import db, CartItem, Job
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    with SMTPStandIn() as server:
+        monkeypatch.setenv('MAIL_SERVER', '127.0.0.1')
+        monkeypatch.setenv('MAIL_PORT', str(server.port))
+        monkeypatch.setenv('MAIL_USE_TLS', '0')
+        yield server
+
+
+@pytest.fixture
+def app(smtp, app):
+    app.extensions['mail'].suppress = False  # TESTING would otherwise drop the mail
+    return app
+
+
+def order(buyer_name):
+    seller = make_user(f'{buyer_name}-seller', role='seller')
+    buyer = make_user(buyer_name)
+    db.session.add(CartItem(user_id=buyer, product_id=make_product(seller, 'Mango'), quantity=2))
+    db.session.commit()
+    place_order(buyer)
+
+
+def closed_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_batch_is_delivered_over_one_connection(app, smtp):
+    order('ana')
+    order('ben')
+    assert run_once() == 2
+    assert sorted(to for m in smtp.messages for to in m['to']) == [
+        '<ana-seller@example.com>', '<ana@example.com>',
+        '<ben-seller@example.com>', '<ben@example.com>',
+    ]
+    assert smtp.connections == 1
+    assert {job.status for job in Job.query} == {'done'}
+    assert run_once() == 0
+
+
+def test_failed_delivery_is_retried_with_backoff(app, smtp):
+    mail = app.extensions['mail']
+    mail.port = closed_port()
+    order('ana')
+
+    before = datetime.utcnow()
+    assert run_once() == 1
+    job = Job.query.one()
+    assert (job.status, job.attempts) == ('queued', 1)
+    assert 'ConnectionRefusedError' in job.last_error
+    assert job.run_at >= before + timedelta(seconds=app.config['JOB_RETRY_BASE'])
+    assert run_once() == 0  # not due yet
+    assert smtp.messages == []
+
+    job.run_at = datetime.utcnow()
+    db.session.commit()
+    mail.port = smtp.port
+    assert run_once() == 1
+    assert (Job.query.one().status, len(smtp.messages)) == ('done', 2)
+
+
+def test_job_fails_for_good_after_max_attempts(app, smtp):
+    app.extensions['mail'].port = closed_port()
+    order('ana')
+    job_id = Job.query.one().id
+    for attempt in range(app.config['JOB_MAX_ATTEMPTS']):
+        db.session.execute(db.update(Job).where(Job.id == job_id).values(run_at=datetime.utcnow()))
+        db.session.commit()
+        assert run_once() == 1
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts) == ('failed', app.config['JOB_MAX_ATTEMPTS'])
+
+
+def test_backoff_doubles_up_to_the_cap(app):
+    base, cap = app.config['JOB_RETRY_BASE'], app.config['JOB_RETRY_MAX']
+    assert [backoff(n) for n in (1, 2, 3)] == [base, base * 2, base * 4]
+    assert backoff(50) == cap
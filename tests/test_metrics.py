@@ -0,0 +1,29 @@
+import pytest
+
+
+@pytest.fixture
+def tokens(app):
+    app.config.update(METRICS_TOKEN='m-secret', PROFILER_TOKEN='p-secret')
+
+
+def test_metrics_needs_the_token(tokens, client):
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 404
+    assert client.get('/metrics', headers={'Authorization': 'Bearer m-secret'}).status_code == 200
+
+
+def test_profiler_needs_the_token(tokens, client):
+    assert client.get('/debug/profile').status_code == 404
+    assert client.get('/debug/profile', headers={'X-Profiler-Token': 'wrong'}).status_code == 404
+    assert client.get('/debug/profile', headers={'X-Profiler-Token': 'p-secret'}).status_code == 200
+
+
+def test_non_ascii_tokens_are_refused_not_errors(tokens, client):
+    header = 'Bearer m-secr\xe9t'
+    assert client.get('/metrics', headers={'Authorization': header}).status_code == 404
+    assert client.get('/debug/profile', headers={'X-Profiler-Token': '\xe9'}).status_code == 404
+
+
+def test_nothing_is_exposed_without_tokens(app, client):
+    assert client.get('/metrics', headers={'Authorization': 'Bearer None'}).status_code == 404
+    assert client.get('/debug/profile', headers={'X-Profiler-Token': ''}).status_code == 404
@@ -0,0 +1,73 @@
+import pytest
+
+from conftest import login, make_product, make_user
+from models import db, Order, OrderStatusHistory
+from order_status import StatusChangeRejected, change_order_status
+
+
+@pytest.fixture
+def orders(app):
+    """Three Pending orders of seller's product and one of rival's."""
+    seller, rival = make_user('seller', role='seller'), make_user('rival', role='seller')
+    buyer = make_user('buyer')
+    ids = {}
+    for owner, name, count in ((seller, 'Mango', 3), (rival, 'Rice', 1)):
+        product = make_product(owner, name)
+        rows = [Order(buyer_id=buyer, product_id=product, quantity=1, total_price=10)
+                for _ in range(count)]
+        db.session.add_all(rows)
+        db.session.commit()
+        ids[owner] = [row.id for row in rows]
+    return seller, ids[seller], ids[rival]
+
+
+def statuses(order_ids):
+    db.session.expire_all()
+    return [db.session.get(Order, order_id).status for order_id in order_ids]
+
+
+def test_moves_every_order_and_records_history(orders):
+    seller, mine, _ = orders
+    assert change_order_status(seller, mine, 'Approved') == mine
+    assert statuses(mine) == ['Approved'] * 3
+    history = OrderStatusHistory.query.order_by(OrderStatusHistory.order_id).all()
+    assert [(h.order_id, h.from_status, h.to_status, h.changed_by) for h in history] == [
+        (order_id, 'Pending', 'Approved', seller) for order_id in mine
+    ]
+
+
+def test_partial_ownership_rejects_the_whole_batch(orders):
+    seller, mine, theirs = orders
+    with pytest.raises(StatusChangeRejected) as rejected:
+        change_order_status(seller, mine + theirs + [9999], 'Approved')
+    assert rejected.value.not_owned == sorted(theirs + [9999])
+    assert statuses(mine + theirs) == ['Pending'] * 4
+    assert OrderStatusHistory.query.count() == 0
+
+
+def test_skipping_a_step_is_rejected(orders):
+    seller, mine, _ = orders
+    change_order_status(seller, mine[:1], 'Approved')
+    with pytest.raises(StatusChangeRejected) as rejected:
+        change_order_status(seller, mine, 'Shipped')
+    assert rejected.value.wrong_status == {mine[1]: 'Pending', mine[2]: 'Pending'}
+    assert statuses(mine) == ['Approved', 'Pending', 'Pending']
+
+
+def test_json_api_reports_orders_that_are_not_yours(orders, client):
+    _, mine, theirs = orders
+    login(client, 'seller')
+    response = client.post('/seller/orders/status',
+                           json={'order_ids': mine + theirs, 'status': 'Approved'})
+    assert response.status_code == 403
+    assert response.json['not_owned'] == theirs
+    assert statuses(mine) == ['Pending'] * 3
+
+
+def test_json_api_rejects_a_status_that_is_not_a_string(orders, client):
+    _, mine, _ = orders
+    login(client, 'seller')
+    for status in (['x'], None, 3):
+        response = client.post('/seller/orders/status', json={'order_ids': mine, 'status': status})
+        assert response.status_code == 400
+    assert statuses(mine) == ['Pending'] * 3
@@ -0,0 +1,102 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from conftest import login, make_product, make_user
+from models import Product
+from pagination import decode_cursor, encode_cursor, paginate
+
+NEWEST_FIRST = [(Product.created_at, True), (Product.id, True)]
+
+
+def pages(app, query, per_page, cursor=None, direction='next_cursor'):
+    """Follow cursors from ``cursor`` to the end, returning each page's ids."""
+    seen = []
+    while True:
+        url = f'/?cursor={cursor}' if cursor else '/'
+        with app.test_request_context(url):
+            page = paginate(query, NEWEST_FIRST, per_page=per_page)
+        seen.append(([p.id for p in page], page))
+        cursor = getattr(page, direction)
+        if cursor is None:
+            return seen
+
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def test_cursor_round_trips_datetimes():
+    when = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor([when, 7], 'prev'), NEWEST_FIRST) == ([when, 7], 'prev')
+
+
+def test_bad_cursors_are_ignored():
+    when = datetime(2024, 5, 1)
+    assert decode_cursor('not base64!', NEWEST_FIRST) is None
+    assert decode_cursor(encode_cursor([when], 'next'), NEWEST_FIRST) is None  # wrong key count
+    assert decode_cursor(encode_cursor([when, 2], 'sideways'), NEWEST_FIRST) is None
+    # Values that don't fit their key's column type
+    for values in ([[1], 2], [None, None], [when, '2'], [when, 2.5], [7, 2], [when, True]):
+        assert decode_cursor(encode_cursor(values, 'next'), NEWEST_FIRST) is None, values
+    assert decode_cursor(raw_cursor({'k': [{'dt': 'noon'}, 2], 'd': 'next'}), NEWEST_FIRST) is None
+
+
+def test_empty_result_has_no_cursors(app):
+    with app.test_request_context('/'):
+        page = paginate(Product.query, NEWEST_FIRST, per_page=3)
+    assert list(page) == [] and page.next_cursor is None and page.prev_cursor is None
+
+
+def test_ties_on_created_at_are_neither_skipped_nor_repeated(app):
+    seller = make_user('seller', role='seller')
+    same_time = datetime(2024, 1, 1)
+    ids = [make_product(seller, f'P{i}', created_at=same_time) for i in range(7)]
+
+    walked = pages(app, Product.query, per_page=3)
+    assert [ids for ids, _ in walked] == [ids[6:3:-1], ids[3:0:-1], ids[0:1]]
+    assert walked[0][1].prev_cursor is None
+
+
+def test_exact_page_boundary_has_no_empty_last_page(app):
+    seller = make_user('seller', role='seller')
+    start = datetime(2024, 1, 1)
+    for i in range(6):
+        make_product(seller, f'P{i}', created_at=start + timedelta(minutes=i))
+
+    walked = pages(app, Product.query, per_page=3)
+    assert [len(ids) for ids, _ in walked] == [3, 3]
+    assert walked[-1][1].next_cursor is None
+
+
+def test_prev_cursor_returns_the_previous_page(app):
+    seller = make_user('seller', role='seller')
+    start = datetime(2024, 1, 1)
+    for i in range(8):
+        make_product(seller, f'P{i}', created_at=start + timedelta(minutes=i % 3))
+
+    forward = pages(app, Product.query, per_page=3)
+    backward = pages(app, Product.query, per_page=3, cursor=forward[-1][1].prev_cursor,
+                     direction='prev_cursor')
+    assert [ids for ids, _ in backward] == [ids for ids, _ in reversed(forward[:-1])]
+    assert backward[-1][1].next_cursor is not None
+
+
+def test_invalid_cursor_in_url_shows_the_first_page(app, client):
+    seller = make_user('seller', role='seller')
+    make_product(seller, 'Mango')
+    for cursor in ('garbage', raw_cursor({'k': [[1], 2], 'd': 'next'}),
+                   raw_cursor({'k': [None, None], 'd': 'prev'})):
+        response = client.get('/', query_string={'cursor': cursor})
+        assert response.status_code == 200
+        assert b'Mango' in response.data
+
+
+def test_tampered_cursor_on_order_lists(app, client):
+    make_user('seller', role='seller')
+    make_user('buyer')
+    cursor = raw_cursor({'k': [[1], {'a': 1}], 'd': 'next'})
+    for username, path in (('buyer', '/orders'), ('seller', '/seller/orders')):
+        login(client, username)
+        assert client.get(path, query_string={'cursor': cursor}).status_code == 200
+        client.get('/logout')
@@ -0,0 +1,57 @@
+import io
+
+from conftest import login, make_user
+from models import Product
+from product_import import NOT_UTF8, import_products
+
+
+def run(seller, data, fmt):
+    return import_products(seller, io.BytesIO(data), fmt, batch_size=2)
+
+
+def test_lines_that_are_not_utf8_fail_on_their_own(app):
+    seller = make_user('seller', role='seller')
+    data = ('name,description,price,quantity\n'
+            'Mango,sweet,10,5\n'
+            'Jalapeño,hot,12,3\n'
+            'Rice,"long\ngrain",40,8\n').encode('cp1252')
+    report = run(seller, data, 'csv')
+    assert (report.inserted, report.failed) == (2, 1)
+    assert report.errors == [{'line': 3, 'errors': [NOT_UTF8]}]
+    assert sorted(name for name, in Product.query.with_entities(Product.name)) == ['Mango', 'Rice']
+
+
+def test_utf8_with_bom_is_read(app):
+    seller = make_user('seller', role='seller')
+    data = '\ufeffname,description,price,quantity\nJalapeño,hot,12,3\n'.encode('utf-8')
+    assert run(seller, data, 'csv').inserted == 1
+    assert Product.query.one().name == 'Jalapeño'
+
+
+def test_json_lines(app):
+    seller = make_user('seller', role='seller')
+    data = ('{"name": "Mango", "description": "sweet", "price": 10, "quantity": 5}\n'
+            '{"name": "broken"\n').encode() + '{"name": "Ñ"}\n'.encode('cp1252')
+    report = run(seller, data, 'jsonl')
+    assert report.inserted == 1
+    assert report.errors == [{'line': 2, 'errors': ['not valid JSON']},
+                             {'line': 3, 'errors': [NOT_UTF8]}]
+
+
+def test_json_array_is_rejected_as_a_whole(app):
+    seller = make_user('seller', role='seller')
+    data = b'[\n{"name": "Mango", "description": "sweet", "price": 10, "quantity": 5}\n]\n'
+    report = run(seller, data, 'jsonl')
+    assert (report.inserted, report.failed) == (0, 1)
+    assert 'JSON array' in report.errors[0]['errors'][0]
+
+
+def test_upload_reports_instead_of_failing(app, client):
+    make_user('seller', role='seller')
+    login(client, 'seller')
+    data = 'name,description,price,quantity\nCafé,beans,100,2\n'.encode('cp1252')
+    response = client.post('/seller/import-products',
+                           data={'file': (io.BytesIO(data), 'products.csv')},
+                           headers={'Accept': 'application/json'})
+    assert response.status_code == 200
+    assert response.json['failed'] == 1
@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import login, make_product, make_user
+from models import db, CartItem, Order
+from querycount import assert_max_queries
+
+ROWS = 20
+
+
+@pytest.fixture
+def shop(app):
+    seller = make_user('seller', role='seller')
+    buyers = [make_user(f'buyer{i}') for i in range(ROWS)]
+    products = [make_product(seller, f'Product {i}') for i in range(ROWS)]
+    for product_id in products:
+        db.session.add(CartItem(user_id=buyers[0], product_id=product_id, quantity=1))
+    for buyer_id, product_id in zip(buyers, products):
+        db.session.add(Order(buyer_id=buyer_id, product_id=product_id, quantity=1, total_price=10))
+        db.session.add(Order(buyer_id=buyers[0], product_id=product_id, quantity=2, total_price=20))
+    db.session.commit()
+
+
+@pytest.mark.parametrize('username, path, text', [
+    ('buyer0', '/cart', 'Product 19'),
+    ('buyer0', '/orders', 'Product 19'),
+    ('seller', '/seller/orders', 'buyer19'),
+])
+def test_list_views_stay_within_their_query_budget(app, client, shop, username, path, text):
+    # ENFORCE_QUERY_BUDGETS defaults to app.testing: a view over its
+    # @query_budget raises AssertionError listing the statements.
+    login(client, username)
+    response = client.get(path)
+    assert response.status_code == 200
+    assert text in response.get_data(as_text=True)
+
+
+def test_assert_max_queries_catches_lazy_loads(app, shop):
+    db.session.expire_all()
+    with pytest.raises(AssertionError, match=f'{ROWS + 1} SQL statements executed'):
+        with assert_max_queries(2):
+            sum(item.product.price for item in CartItem.query.all())
@@ -0,0 +1,16 @@
+from models import db
+from queryplans import check_query_plans, hot_queries
+
+
+def test_hot_queries_use_an_index(app):
+    results = check_query_plans()
+    assert [name for name, _, _ in results] == list(hot_queries())
+    scans = {name: plan for name, ok, plan in results if not ok}
+    assert scans == {}
+
+
+def test_a_dropped_index_is_caught(app):
+    db.session.execute(db.text('DROP INDEX ix_orders_buyer_created'))
+    db.session.commit()
+    failed = [name for name, ok, _ in check_query_plans() if not ok]
+    assert 'buyer orders' in failed
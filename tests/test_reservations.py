@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from catalog_cache import catalog_version
+from conftest import login, make_product, make_user
+from models import db, CartItem
+from reservations import listing_changed, release_expired
+
+
+def version():
+    return catalog_version()['token']
+
+
+def listed(client, name):
+    return f'<h3>{name}</h3>' in client.get('/').get_data(as_text=True)
+
+
+def test_cart_changes_only_invalidate_when_stock_crosses_zero(app, client):
+    seller = make_user('seller', role='seller')
+    make_user('buyer')
+    mango = make_product(seller, 'Mango', quantity=3)
+    login(client, 'buyer')
+    assert listed(client, 'Mango')
+    before = version()
+
+    client.post(f'/cart/add/{mango}', data={'quantity': 2})
+    assert version() == before  # one unit left, still listed
+
+    client.post(f'/cart/add/{mango}', data={'quantity': 1})
+    sold_out = version()
+    assert sold_out != before
+    assert not listed(client, 'Mango')
+
+    item = CartItem.query.one().id
+    client.post(f'/cart/update/{item}', data={'action': 'decrease'})
+    assert version() != sold_out
+    assert listed(client, 'Mango')
+
+
+def test_sweeper_notices_products_coming_back(app):
+    seller, buyer = make_user('seller', role='seller'), make_user('buyer')
+    expired = datetime.utcnow() - timedelta(minutes=1)
+    mango = make_product(seller, 'Mango', quantity=0)
+    rice = make_product(seller, 'Rice', quantity=5)
+    db.session.add(CartItem(user_id=buyer, product_id=rice, quantity=1, reserved_until=expired))
+    db.session.commit()
+
+    assert release_expired() == 1
+    assert not listing_changed()  # Rice never left the listing
+
+    db.session.add(CartItem(user_id=buyer, product_id=mango, quantity=2, reserved_until=expired))
+    db.session.commit()
+    assert release_expired() == 1
+    assert listing_changed()
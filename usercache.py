@@ -0,0 +1,85 @@
+from flask import current_app
+
+from catalog_cache import LRUCache, SharedCache
+from images import variant_url
+from models import db, User
+
+
+class SessionUser:
+    """Read-only snapshot of the logged-in user, kept between requests.
+
+    Carries the fields templates, role checks and checkout read, so an
+    authenticated request does not need a ``users`` query. Code that changes
+    the user loads the ``User`` row itself and calls ``forget_user``.
+    """
+
+    __slots__ = (
+        'id', 'username', 'email', 'role', 'location', 'address',
+        'delivery_address', 'profile_image', 'background_image',
+    )
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(*(getattr(user, name) for name in cls.__slots__))
+
+    def snapshot(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def get_id(self):
+        return str(self.id)
+
+    def is_admin(self):
+        return self.role == 'admin'
+
+    def profile_image_url(self):
+        return variant_url(self.profile_image, 'avatar')
+
+    def background_image_url(self):
+        return variant_url(self.background_image, 'background')
+
+    def __eq__(self, other):
+        return isinstance(other, (SessionUser, User)) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<SessionUser {self.id} {self.username!r}>'
+
+
+def init_user_cache(app):
+    """Share snapshots between workers when the catalog cache is shared."""
+    ttl = app.config['USER_CACHE_TTL']
+    catalog = app.extensions.get('catalog_cache')
+    if isinstance(catalog, SharedCache):
+        backend = SharedCache(catalog.client, ttl=ttl, prefix='agrimarket:user:')
+    else:
+        backend = LRUCache(app.config['USER_CACHE_MAX_ENTRIES'], ttl=ttl)
+    app.extensions['user_cache'] = backend
+    return backend
+
+
+def load_session_user(user_id):
+    cache = current_app.extensions['user_cache']
+    key = f'user:{user_id}'
+    values = cache.get(key)
+    if values is not None:
+        return SessionUser(*values)
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    snapshot = SessionUser.from_user(user)
+    cache.set(key, snapshot.snapshot())
+    return snapshot
+
+
+def forget_user(user_id):
+    current_app.extensions['user_cache'].delete(f'user:{user_id}')